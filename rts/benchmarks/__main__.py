@@ -0,0 +1,96 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+
+"""
+Run the benchmarks, write their results and compare them with a baseline.
+
+    python -m benchmarks --only classification bucketing --output results.json
+"""
+
+import argparse
+import collections
+import sys
+
+from benchmarks import classification
+from benchmarks import si
+from benchmarks import timing
+
+BENCHMARKS = collections.OrderedDict(classification.BENCHMARKS + si.BENCHMARKS)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark classification and the SI calculation.")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="the benchmarks to run (default all)")
+    parser.add_argument('--samples', type=int, default=20000, help="sample trades per benchmark")
+    parser.add_argument('--si-trades', type=int, nargs='+', default=[1000000],
+                        help="numbers of trades for the end to end SI benchmark")
+    parser.add_argument('--si-batch', type=int, default=100000,
+                        help="generated trades, used over and over, for the end to end SI benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="repeats, of which the best is taken")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare the results with those in this JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="the fraction slower than the baseline which is a regression")
+    settings = parser.parse_args(arguments)
+
+    results = []
+    for name in settings.only or BENCHMARKS:
+        for item in BENCHMARKS[name](settings):
+            print("{name:64s} {ops:>10d} ops {per_op:12.3f} us/op".format(
+                name=item['name'], ops=item['ops'], per_op=item['seconds_per_op'] * 1e6))
+            sys.stdout.flush()
+            results.append(item)
+
+    if settings.output:
+        timing.save_results(settings.output, results, vars(settings))
+
+    if settings.baseline:
+        regressions = 0
+        print("\nCompared with {baseline}:".format(baseline=settings.baseline))
+        for name, baseline_figure, figure, ratio, regressed in timing.compare(
+                results, timing.load_results(settings.baseline), settings.tolerance):
+            regressions += regressed
+            print("{name:64s} {ratio:6.2f}x {flag}".format(
+                name=name, ratio=ratio, flag="REGRESSED" if regressed else ""))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+
+"""
+Benchmarks of classification against the RTS 2 Annex III taxonomy, maturity
+bucketing, sample generation, JSON output and RTS 23 table 2 look ups.
+"""
+
+import datetime
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import rts2_annex3
+import rts2_annex3_model
+import rts23_table2
+
+from benchmarks import timing
+
+TRIPLETS = [
+    ['OTHR', None, None],
+    ['PAPR', 'CBRD', None],
+    ['METL', 'PRME', 'GOLD'],
+    ['NRGY', 'COAL', None],
+]
+
+BUCKET_BASE_DATE = datetime.date(2018, 1, 3)
+
+BUCKET_TERMS = [
+    ('short', 30),
+    ('long', 900),
+    ('extrapolated', 365 * 30),
+]
+
+
+def classification_by_asset_class(settings):
+    """
+    classification_for() throughput for samples of each asset class in turn.
+    """
+    results = []
+    for asset_class in rts2_annex3.class_root.asset_classes:
+        random.seed(settings.seed)
+        samples = asset_class.make_test_samples(settings.samples)
+
+        def classify():
+            for sample in samples:
+                rts2_annex3.class_root.classification_for(sample)
+        results.append(timing.result(
+            'classification_for[{name}]'.format(name=asset_class.name),
+            len(samples),
+            timing.best_time(classify, settings.repeat)))
+    return results
+
+
+def bucket_criterion():
+    """
+    I return the first maturity bucket criterion with bounded buckets, so that long
+    terms run beyond them and make the taxonomy extrapolate more.
+    """
+    for sub_asset_class in rts2_annex3.class_root.all_sub_asset_classes():
+        for criterion in sub_asset_class.criteria:
+            if isinstance(criterion, rts2_annex3_model.MaturityBucketCriterion) \
+                    and not isinstance(criterion.bucket_ceilings[-1], rts2_annex3_model.UnboundedBucketCeiling):
+                return criterion
+    raise ValueError("The taxonomy has no bounded maturity bucket criterion")
+
+
+def option_for_dates(settings):
+    """
+    option_for_dates() for terms within the first bucket, within the last given
+    bucket and beyond all the given buckets.
+    """
+    root_option = bucket_criterion().root_option
+    results = []
+    for term_name, days in BUCKET_TERMS:
+        to_date = BUCKET_BASE_DATE + datetime.timedelta(days)
+        # Once, so that any extrapolated buckets exist before timing
+        root_option.option_for_dates(from_date=BUCKET_BASE_DATE, to_date=to_date)
+        ops = settings.samples
+
+        def find_option():
+            for _ in range(ops):
+                root_option.option_for_dates(from_date=BUCKET_BASE_DATE, to_date=to_date)
+        results.append(timing.result(
+            'option_for_dates[{term}]'.format(term=term_name),
+            ops,
+            timing.best_time(find_option, settings.repeat),
+            days=days))
+    return results
+
+
+def make_test_samples(settings):
+    def generate():
+        random.seed(settings.seed)
+        rts2_annex3.class_root.make_test_samples(settings.samples)
+    return [timing.result('make_test_samples', settings.samples, timing.best_time(generate, settings.repeat))]
+
+
+def as_json(settings):
+    random.seed(settings.seed)
+    classifications = list(rts2_annex3.class_root.classify_many(
+        rts2_annex3.class_root.make_test_samples(settings.samples)))
+
+    def serialize():
+        for classification in classifications:
+            classification.as_json()
+    return [timing.result('as_json', len(classifications), timing.best_time(serialize, settings.repeat))]
+
+
+def node_for_triplet(settings):
+    ops = settings.samples
+
+    def look_up():
+        for index in range(ops):
+            rts23_table2.root.node_for_triplet(TRIPLETS[index % len(TRIPLETS)])
+    return [timing.result('node_for_triplet', ops, timing.best_time(look_up, settings.repeat))]
+
+
+def cold_import(settings):
+    """
+    The time to import rts2_annex3, and so build the taxonomy, in a new interpreter.
+    """
+    script = ("import time; started = time.perf_counter(); import rts2_annex3; "
+              "print(time.perf_counter() - started)")
+    rts_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best = None
+    for _ in range(settings.repeat):
+        output = subprocess.check_output([sys.executable, '-c', script], cwd=rts_directory)
+        seconds = float(output.decode().split()[-1])
+        if best is None or seconds < best:
+            best = seconds
+    return [timing.result('cold_import', 1, best)]
+
+
+def memory_per_classification(settings):
+    """
+    The memory retained by each classification (not its subject), measured with
+    tracemalloc.  The seconds are those taken to classify with tracing on, so this is
+    compared with a baseline on its bytes.
+    """
+    random.seed(settings.seed)
+    samples = rts2_annex3.class_root.make_test_samples(settings.samples)
+    # Warm the taxonomy's own caches first so that they aren't counted
+    list(rts2_annex3.class_root.classify_many(samples))
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        classifications = list(rts2_annex3.class_root.classify_many(samples))
+        seconds = time.perf_counter() - started
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return [timing.result('memory_per_classification', len(classifications), seconds,
+                          bytes_per_classification=retained / len(classifications),
+                          compared_on='bytes_per_classification')]
+
+
+BENCHMARKS = [
+    ('classification', classification_by_asset_class),
+    ('bucketing', option_for_dates),
+    ('samples', make_test_samples),
+    ('json', as_json),
+    ('triplets', node_for_triplet),
+    ('import', cold_import),
+    ('memory', memory_per_classification),
+]
@@ -0,0 +1,116 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+
+"""
+The SI calculation end to end: classifying and aggregating trades, then reporting the
+SI status of each sub-class.  The trades are generated before the clock starts, as one
+batch which is fed to the calculation as many times as needed, so that neither the
+time to generate them nor the memory to hold millions of them is measured.
+"""
+
+import datetime
+import itertools
+import random
+import time
+
+import rts2_annex3
+import si_calculation
+
+from benchmarks import timing
+
+EEA_MICS = ['XLON', 'XPAR']
+
+FIRST_TRADE_DATE = datetime.date(2018, 1, 1)
+
+
+def generated_trades(number):
+    """
+    I generate number trades with what the SI calculation needs.
+    """
+    trades = rts2_annex3.class_root.make_test_samples(number)
+    for trade in trades:
+        trade.trade_date = FIRST_TRADE_DATE + datetime.timedelta(days=random.randrange(182))
+        trade.mic = random.choice(['XLON', 'XPAR', 'XOFF'])
+        trade.own_account = random.random() < 0.5
+        trade.client_order = random.random() < 0.5
+        trade.eur_notional = random.choice([1000000, 2000000, 5000000])
+    return trades
+
+
+def repeated_trades(batch, number):
+    """
+    I yield number trades, going round batch as many times as needed.
+    """
+    return itertools.islice(itertools.cycle(batch), number)
+
+
+def si_end_to_end(settings):
+    """
+    The SI calculation over each number of trades in settings.si_trades, taken from a
+    batch of settings.si_batch generated trades.  Runs this long are timed once.
+    """
+    random.seed(settings.seed)
+    generation_started = time.perf_counter()
+    batch = generated_trades(settings.si_batch)
+    generate_seconds = time.perf_counter() - generation_started
+    results = []
+    for number in settings.si_trades:
+        calculation = si_calculation.SICalculation(
+            rts2_annex3.class_root, EEA_MICS, si_calculation.SyntheticEUData(seed=settings.seed))
+        trades = repeated_trades(batch, number)
+        started = time.perf_counter()
+        calculation.add_trades(trades)
+        aggregated = time.perf_counter()
+        calculation.report_items()
+        reported = time.perf_counter()
+        results.append(timing.result(
+            'si_end_to_end[{number}]'.format(number=number),
+            number,
+            reported - started,
+            aggregate_seconds=aggregated - started,
+            report_seconds=reported - aggregated,
+            batch_size=len(batch),
+            batch_generate_seconds=generate_seconds,
+            sub_classes=len(set(calculation.sub_class_key(sub_class_id)
+                                for sub_class_id in calculation.aggregates))))
+    return results
+
+
+BENCHMARKS = [
+    ('si', si_end_to_end),
+]
@@ -0,0 +1,125 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+
+"""
+Timing, result and baseline comparison helpers for the benchmarks.
+
+A result is a dict with at least a 'name', the number of operations timed ('ops')
+and the best 'seconds' taken over the repeats.  Results are compared with a
+baseline by their seconds per operation, unless they name another of their figures
+as 'compared_on'; a memory benchmark is compared on its bytes, say.
+"""
+
+import collections
+import json
+import platform
+import sys
+import time
+
+
+def best_time(function, repeat=3):
+    """
+    I call function repeat times and return the fewest seconds it took.  The garbage
+    collector is left enabled since classification in production runs with it.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - started
+        if best is None or seconds < best:
+            best = seconds
+    return best
+
+
+def result(name, ops, seconds, **extra):
+    """
+    I return a result dict for ops operations done in seconds, with any extra values.
+    """
+    item = collections.OrderedDict([
+        ('name', name),
+        ('ops', ops),
+        ('seconds', seconds),
+        ('ops_per_second', ops / seconds if seconds else None),
+        ('seconds_per_op', seconds / ops if ops else None),
+    ])
+    item.update(extra)
+    return item
+
+
+def environment():
+    return collections.OrderedDict([
+        ('python', sys.version.split()[0]),
+        ('implementation', platform.python_implementation()),
+        ('platform', platform.platform()),
+        ('time', time.strftime('%Y-%m-%dT%H:%M:%S')),
+    ])
+
+
+def save_results(path, results, settings):
+    with open(path, 'w') as output:
+        json.dump(collections.OrderedDict([
+            ('environment', environment()),
+            ('settings', settings),
+            ('results', results),
+        ]), output, indent=4)
+
+
+def load_results(path):
+    with open(path) as results_file:
+        return json.load(results_file)['results']
+
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    I return a list of (name, baseline figure, figure, ratio, regressed) for each
+    result which is also in baseline, the figure being the seconds per op or the one
+    the result is compared_on.  A result has regressed if its figure is more than
+    tolerance (a fraction) above its baseline's.
+    """
+    baseline_by_name = dict((item['name'], item) for item in baseline)
+    comparisons = []
+    for item in results:
+        figure_name = item.get('compared_on', 'seconds_per_op')
+        baseline_item = baseline_by_name.get(item['name'])
+        if not baseline_item or not baseline_item.get(figure_name) or not item.get(figure_name):
+            continue
+        ratio = item[figure_name] / baseline_item[figure_name]
+        comparisons.append((item['name'], baseline_item[figure_name], item[figure_name], ratio,
+                            ratio > 1.0 + tolerance))
+    return comparisons
@@ -0,0 +1,332 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+
+"""
+Profiling classification without a profiler.
+
+A ClassificationProfiler, once enabled, wraps extend_classification() on each
+sub-asset class and each criterion (including the maturity bucket criteria chosen by
+metal type, energy type or equity parameter) of a taxonomy, and counts the calls, the
+time spent and the errors added, by asset class, sub-asset class and criterion type.
+
+The wrappers are set on the nodes themselves, not their classes, and disabling the
+profiler removes them, so a taxonomy which isn't being profiled runs exactly the code
+it always did.  Other tools, such as the tracer in classification_trace, wrap the same
+methods through install_wrapper() and remove_wrapper(), so they can be enabled and
+disabled in any order.  The counts can be written as a Prometheus text file (for the
+node exporter's textfile collector) or as a JSON snapshot.
+
+The maturity bucket criteria a metals, energy or equity parameter criterion delegates
+to are counted under their own criterion type, 'Composite/Delegated', but left out of
+totals since their time is already part of the composite's.
+
+    profiler = ClassificationProfiler(rts2_annex3.class_root).enable()
+    for classification in rts2_annex3.class_root.classify_many(trades):
+        ...
+    profiler.write_prometheus('/var/lib/node_exporter/rts2.prom')
+"""
+
+import collections
+import json
+import os
+import time
+
+
+DELEGATION_SEPARATOR = '/'
+
+
+def profiled_nodes(root):
+    """
+    I yield (labels, node) for each sub-asset class and criterion of root, where labels
+    is (asset class name, sub-asset class name, criterion type name), the criterion
+    type name being None for a sub-asset class.  The type name of a criterion which is
+    delegated to is prefixed by that of the criterion delegating to it.
+    """
+    for sub_asset_class in root.all_sub_asset_classes():
+        asset_class_name = sub_asset_class.parent.name
+        yield (asset_class_name, sub_asset_class.name, None), sub_asset_class
+        criteria = [(type(criterion).__name__, criterion) for criterion in sub_asset_class.criteria]
+        while criteria:
+            type_name, criterion = criteria.pop(0)
+            yield (asset_class_name, sub_asset_class.name, type_name), criterion
+            criteria.extend((type_name + DELEGATION_SEPARATOR + type(bucket_criterion).__name__, bucket_criterion)
+                            for bucket_criterion in criterion.bucket_criteria())
+
+
+def is_delegated(labels):
+    """
+    I answer if labels are those of a criterion delegated to by another criterion.
+    """
+    return labels[2] is not None and DELEGATION_SEPARATOR in labels[2]
+
+
+def install_wrapper(node, method_name, owner, make_wrapper):
+    """
+    I wrap node's method_name with make_wrapper(method) on behalf of owner.  The
+    wrappers of all owners are kept on the node and the method rebuilt from them, so
+    that each owner can remove its own wrapper without disturbing the others.
+    """
+    wrappers = node.__dict__.setdefault('_method_wrappers', {})
+    if method_name not in wrappers:
+        # Keep whatever was already set on the node itself to put back at the end
+        wrappers[method_name] = (node.__dict__.get(method_name), [])
+    wrappers[method_name][1].append((owner, make_wrapper))
+    rebuild_method(node, method_name)
+
+
+def remove_wrapper(node, method_name, owner):
+    wrappers = node.__dict__.get('_method_wrappers', {})
+    if method_name in wrappers:
+        original, owned = wrappers[method_name]
+        owned[:] = [(an_owner, make_wrapper) for (an_owner, make_wrapper) in owned if an_owner is not owner]
+        rebuild_method(node, method_name)
+
+
+def rebuild_method(node, method_name):
+    wrappers = node.__dict__['_method_wrappers']
+    original, owned = wrappers[method_name]
+    node.__dict__.pop(method_name, None)
+    if not owned:
+        del wrappers[method_name]
+        if not wrappers:
+            del node.__dict__['_method_wrappers']
+        if original is not None:
+            setattr(node, method_name, original)
+        return
+    method = original if original is not None else getattr(node, method_name)
+    for owner, make_wrapper in owned:
+        method = make_wrapper(method)
+    setattr(node, method_name, method)
+
+
+class ProfileCounts(object):
+    """
+    The calls, seconds and errors counted for one node, or one kind of node.
+    """
+    __slots__ = ('calls', 'seconds', 'errors')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.errors = 0
+
+    def as_dict(self):
+        return collections.OrderedDict([
+            ('calls', self.calls),
+            ('seconds', self.seconds),
+            ('errors', self.errors),
+        ])
+
+
+class ClassificationProfiler(object):
+    """
+    I count the work done classifying with the taxonomy root.  Counts are kept per
+    (asset class, sub-asset class, criterion type), where a criterion type of None
+    is the sub-asset class as a whole.
+    """
+    def __init__(self, root, clock=time.perf_counter):
+        self.root = root
+        self.clock = clock
+        self.counts = collections.defaultdict(ProfileCounts)
+        self._wrapped = []
+
+    @property
+    def enabled(self):
+        return bool(self._wrapped)
+
+    def enable(self):
+        """
+        I wrap every profiled node of my root.  Nodes added to the taxonomy afterwards
+        are only profiled if I am disabled and enabled again.
+        """
+        if not self.enabled:
+            for labels, node in profiled_nodes(self.root):
+                install_wrapper(node, 'extend_classification', self,
+                                lambda method, labels=labels: self.wrapper_for(labels, method))
+                self._wrapped.append(node)
+        return self
+
+    def disable(self):
+        """
+        I remove my wrappers, leaving the counts as they are.
+        """
+        for node in self._wrapped:
+            remove_wrapper(node, 'extend_classification', self)
+        self._wrapped = []
+        return self
+
+    def reset(self):
+        self.counts.clear()
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+    def wrapper_for(self, labels, extend_classification):
+        counts = self.counts[labels]
+        clock = self.clock
+
+        def profiled_extend_classification(classification):
+            errors_before = len(classification.errors)
+            started = clock()
+            try:
+                return extend_classification(classification)
+            finally:
+                counts.seconds += clock() - started
+                counts.calls += 1
+                counts.errors += len(classification.errors) - errors_before
+        return profiled_extend_classification
+
+    def totals_by(self, *fields):
+        """
+        I return an OrderedDict of ProfileCounts summed over the labels other than
+        fields, some of 'asset_class', 'sub_asset_class' and 'criterion_type'.  Only
+        the sub-asset classes themselves are summed when criterion_type isn't a field,
+        since their time includes that of their criteria, and delegated criteria are
+        never summed, since their time is included in that of their delegating criteria.
+        """
+        positions = [LABEL_NAMES.index(field) for field in fields]
+        totals = collections.OrderedDict()
+        for labels, counts in sorted(self.counts.items(), key=sort_key):
+            if (2 not in positions and labels[2] is not None) or is_delegated(labels):
+                continue
+            key = tuple(labels[position] for position in positions)
+            total = totals.get(key)
+            if total is None:
+                total = totals[key] = ProfileCounts()
+            total.calls += counts.calls
+            total.seconds += counts.seconds
+            total.errors += counts.errors
+        return totals
+
+    def snapshot(self):
+        """
+        I return my counts as a JSON friendly dict, with the slowest first.
+        """
+        rows = []
+        for labels, counts in sorted(self.counts.items(), key=lambda item: -item[1].seconds):
+            row = collections.OrderedDict(zip(LABEL_NAMES, labels))
+            row['delegated'] = is_delegated(labels)
+            row.update(counts.as_dict())
+            rows.append(row)
+        return collections.OrderedDict([
+            ('time', time.time()),
+            ('enabled', self.enabled),
+            ('nodes', rows),
+        ])
+
+    def write_json(self, path):
+        write_atomically(path, json.dumps(self.snapshot(), indent=4))
+
+    def prometheus_text(self, prefix='rts2_classification'):
+        """
+        I return my counts in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric, help_text, kind, value_of in PROMETHEUS_METRICS:
+            name = prefix + '_' + metric
+            lines.append('# HELP {name} {help_text}'.format(name=name, help_text=help_text))
+            lines.append('# TYPE {name} {kind}'.format(name=name, kind=kind))
+            for labels, counts in sorted(self.counts.items(), key=sort_key):
+                lines.append('{name}{{{labels}}} {value}'.format(
+                    name=name,
+                    labels=prometheus_labels(labels),
+                    value=repr(value_of(counts))))
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, prefix='rts2_classification'):
+        """
+        I write my counts to path, replacing it in one step so a collector never reads
+        half a file.
+        """
+        write_atomically(path, self.prometheus_text(prefix=prefix))
+
+
+LABEL_NAMES = ('asset_class', 'sub_asset_class', 'criterion_type')
+
+PROMETHEUS_METRICS = [
+    ('calls_total', 'Calls of extend_classification().', 'counter',
+     lambda counts: counts.calls),
+    ('seconds_total', 'Seconds spent in extend_classification().', 'counter',
+     lambda counts: counts.seconds),
+    ('errors_total', 'Classification errors added by extend_classification().', 'counter',
+     lambda counts: counts.errors),
+]
+
+
+def sort_key(item):
+    return tuple('' if label is None else label for label in item[0])
+
+
+def prometheus_labels(labels):
+    """
+    I return the Prometheus label set for labels, with sub_asset_class as the
+    criterion type of the sub-asset class itself.
+    """
+    values = list(labels)
+    if values[2] is None:
+        values[2] = 'SubAssetClass'
+    return ','.join(
+        '{name}="{value}"'.format(
+            name=name,
+            value=value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(LABEL_NAMES, values))
+
+
+def write_atomically(path, text):
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'w') as output:
+        output.write(text)
+    os.replace(temporary_path, path)
+
+
+if __name__ == "__main__":
+    import sys
+    import rts2_annex3
+
+    root = rts2_annex3.class_root
+    samples = root.make_test_samples(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
+    with ClassificationProfiler(root) as profiler:
+        for classification in root.classify_many(samples):
+            pass
+    for (asset_class_name, sub_asset_class_name), counts in profiler.totals_by('asset_class', 'sub_asset_class').items():
+        print('{seconds:9.4f}s {calls:8d} calls {errors:6d} errors  {asset_class} / {sub_asset_class}'.format(
+            seconds=counts.seconds, calls=counts.calls, errors=counts.errors,
+            asset_class=asset_class_name, sub_asset_class=sub_asset_class_name))
@@ -0,0 +1,268 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+
+"""
+Tracing the classification of a sample of trades.
+
+A ClassificationTracer, once enabled, records the decision path of every Nth trade
+classified by a taxonomy, of any trade whose classification took longer than a given
+time and of any trade whose classification has errors: the asset class and sub-asset
+class found, the option or maturity bucket each criterion selected, or the error it
+met, and the time taken by each step.  Traces are kept in a ring buffer of bounded
+size, which can be dumped as JSON Lines, for example when the process receives SIGUSR1.
+
+Like the profiler in classification_profile, the tracer wraps the taxonomy's nodes
+themselves, through the same install_wrapper(), and removes its wrappers when
+disabled.  A trade is only known to be slow or in error once it has been classified,
+so while the tracer is enabled the steps of every classification are noted, cheaply,
+as they happen, and kept only for the trades which are traced.  The times in a trace
+are those of the classification itself, cold caches and all.
+
+    tracer = ClassificationTracer(rts2_annex3.class_root, sample_every=10000, slow_seconds=0.001)
+    tracer.enable().install_signal_handler('/tmp/rts2_traces.jsonl')
+"""
+
+import collections
+import json
+import os
+import signal
+import time
+
+import rts2_annex3_model
+from classification_profile import install_wrapper, profiled_nodes, remove_wrapper
+
+
+def option_text(option):
+    """
+    I return the text of a selected option: its value, or the name of its bucket.
+    """
+    if isinstance(option, rts2_annex3_model.ValueOption):
+        return option.value
+    if isinstance(option, rts2_annex3_model.DateBucketOption):
+        return option.name()
+    return option.full_name()
+
+
+class ClassificationTracer(object):
+    """
+    I trace one in sample_every classifications made by root (none if sample_every is
+    None), every classification taking slow_seconds or more (none if slow_seconds is
+    None) and, if trace_errors, every classification with errors, keeping the last
+    capacity traces.
+    """
+    def __init__(self, root, sample_every=1000, slow_seconds=None, trace_errors=True, capacity=1000,
+                 clock=time.perf_counter):
+        self.root = root
+        self.sample_every = sample_every
+        self.slow_seconds = slow_seconds
+        self.trace_errors = trace_errors
+        self.clock = clock
+        self.ring = collections.deque(maxlen=capacity)
+        self.classified_count = 0
+        self._steps = None
+        self._depth = 0
+        self._wrapped = []
+
+    @property
+    def enabled(self):
+        return bool(self._wrapped)
+
+    def enable(self):
+        if not self.enabled:
+            install_wrapper(self.root, 'classification_for', self, self.traced_classification_for)
+            self._wrapped.append((self.root, 'classification_for'))
+            nodes = [('asset class', asset_class.name, asset_class) for asset_class in self.root.asset_classes]
+            for labels, node in profiled_nodes(self.root):
+                if labels[2] is None:
+                    nodes.append(('sub-asset class', node.name, node))
+                else:
+                    nodes.append(('criterion', node.full_name(), node))
+            for step, name, node in nodes:
+                install_wrapper(node, 'extend_classification', self,
+                                lambda method, step=step, name=name, node=node:
+                                self.wrapper_for(step, name, node, method))
+                self._wrapped.append((node, 'extend_classification'))
+        return self
+
+    def disable(self):
+        for node, method_name in self._wrapped:
+            remove_wrapper(node, method_name, self)
+        self._wrapped = []
+        return self
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+    def traced_classification_for(self, classification_for):
+        def tracing_classification_for(subject, accessor=rts2_annex3_model.ATTRIBUTE_ACCESSOR):
+            self.classified_count += 1
+            steps = self._steps = []
+            self._depth = 0
+            started = self.clock()
+            try:
+                classification = classification_for(subject, accessor=accessor)
+            finally:
+                self._steps = None
+            seconds = self.clock() - started
+            reason = self.reason_for(seconds, classification)
+            if reason:
+                self.record(reason, seconds, classification, steps)
+            return classification
+        return tracing_classification_for
+
+    def reason_for(self, seconds, classification):
+        """
+        I return why a classification taking seconds should be traced, or None.
+        """
+        if self.sample_every and self.classified_count % self.sample_every == 0:
+            return 'sampled'
+        if self.slow_seconds is not None and seconds >= self.slow_seconds:
+            return 'slow'
+        if self.trace_errors and classification.has_errors():
+            return 'error'
+        return None
+
+    def wrapper_for(self, step, name, node, extend_classification):
+        """
+        I return extend_classification wrapped to note, as a list, the step, the name and
+        node, the depth, the numbers of options and errors before and after and the
+        time taken.  The list is only made into a trace step if the trade is traced.
+        """
+        def tracing_extend_classification(classification):
+            steps = self._steps
+            if steps is None:
+                return extend_classification(classification)
+            noted = [step, name, node, self._depth, len(classification.options), len(classification.errors),
+                     None, None, None]
+            steps.append(noted)
+            self._depth += 1
+            started = self.clock()
+            try:
+                return extend_classification(classification)
+            finally:
+                noted[6] = len(classification.options)
+                noted[7] = len(classification.errors)
+                noted[8] = self.clock() - started
+                self._depth -= 1
+        return tracing_extend_classification
+
+    @staticmethod
+    def outcome(node, options, errors):
+        """
+        I describe what node did, given the options and errors added while it ran: the
+        error it met, the option it (or the criterion it delegated to) selected, or,
+        for an asset class or sub-asset class, that it was found.  Errors met below
+        node are described in the steps below it.
+        """
+        errors = [error for error in errors if error.node is node]
+        if errors:
+            return 'error: ' + '; '.join(str(error) for error in errors)
+        if isinstance(node, rts2_annex3_model.Criterion) and options:
+            return option_text(options[-1])
+        return 'found'
+
+    def trace_steps(self, classification, steps):
+        trace_steps = []
+        for step, name, node, depth, options_before, errors_before, options_after, errors_after, seconds in steps:
+            trace_steps.append(collections.OrderedDict([
+                ('step', step),
+                ('name', name),
+                ('depth', depth),
+                ('outcome', self.outcome(
+                    node,
+                    classification.options[options_before:options_after],
+                    classification.errors[errors_before:errors_after])),
+                ('seconds', seconds),
+            ]))
+        return trace_steps
+
+    def record(self, reason, seconds, classification, steps):
+        self.ring.append(collections.OrderedDict([
+            ('time', time.time()),
+            ('reason', reason),
+            ('seconds', seconds),
+            ('asset_class_name', classification.subject_value('asset_class_name')),
+            ('sub_asset_class_name', classification.subject_value('sub_asset_class_name')),
+            ('errors', classification.error_messages()),
+            ('steps', self.trace_steps(classification, steps)),
+        ]))
+
+    def traces(self):
+        return list(self.ring)
+
+    def clear(self):
+        self.ring.clear()
+
+    def dump(self, stream):
+        """
+        I write my traces, oldest first, to stream as JSON Lines.
+        """
+        for trace in self.traces():
+            stream.write(json.dumps(trace, default=str) + '\n')
+
+    def dump_to(self, path):
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'w') as output:
+            self.dump(output)
+        os.replace(temporary_path, path)
+
+    def install_signal_handler(self, path, signal_number=None):
+        """
+        I dump my traces to path whenever the process receives signal_number, SIGUSR1
+        by default (so not on Windows).
+        """
+        if signal_number is None:
+            signal_number = signal.SIGUSR1
+        signal.signal(signal_number, lambda number, frame: self.dump_to(path))
+        return self
+
+
+if __name__ == "__main__":
+    import sys
+    import rts2_annex3
+
+    root = rts2_annex3.class_root
+    samples = root.make_test_samples(10000)
+    samples[0].sub_asset_class_name = 'No such sub-asset class'
+    with ClassificationTracer(root, sample_every=2500, slow_seconds=0.0005, capacity=5) as tracer:
+        for classification in root.classify_many(samples):
+            pass
+    tracer.dump(sys.stdout)
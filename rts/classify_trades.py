@@ -0,0 +1,230 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+"""
+A command line tool which classifies a file of trades against the RTS 2 Annex III
+taxonomy and writes each trade back out with its sub-class ID, sub-class key and
+any classification errors.  For example:
+
+    python classify_trades.py trades.csv classified.parquet --workers 8
+
+Trades are read and classified a chunk at a time, the chunks being shared among a
+pool of worker processes.  The sub-class IDs are small integers assigned in the
+order the sub-classes are first met in the file, so they are only meaningful
+within one output file; the sub-class key is the canonical identity.
+"""
+
+import argparse
+import collections
+import multiprocessing
+import sys
+import time
+
+import rts2_annex3_model
+import trade_files
+
+CLASSIFIED_COLUMNS = [
+    ('sub_class_id', int),
+    ('sub_class_key', str),
+    ('errors', str),
+]
+
+ERROR_SUMMARY_SIZE = 10
+
+
+def classify_chunk(chunk):
+    """
+    I classify a chunk of rows, answering a (sub-class key, errors) pair for each row,
+    the errors being (code, message) pairs.  I run in the worker processes, so I import
+    the taxonomy for myself.
+    """
+    import rts2_annex3
+    root = rts2_annex3.class_root
+    names, rows = chunk
+    return [(classification.sub_class_key(),
+             [(error.code, str(error)) for error in classification.errors])
+            for classification
+            in root.classify_many(rows, accessor=rts2_annex3_model.ColumnAccessor(names))]
+
+
+class ClassificationRun(object):
+    """
+    I classify the trades in one file and write them to another, keeping the counts
+    needed to report on the run.
+    """
+
+    def __init__(self, input_path, output_path, workers=1, chunk_size=trade_files.DEFAULT_CHUNK_SIZE,
+                 input_format=None, output_format=None):
+        import rts2_annex3
+        self.input_path = input_path
+        self.output_path = output_path
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.input_format = input_format
+        self.output_format = output_format
+        self.schema = rts2_annex3.class_root.subject_attributes()
+        self.sub_class_ids = dict()
+        self.row_count = 0
+        self.error_row_count = 0
+        self.error_counts = collections.Counter()
+        self.error_examples = dict()
+        self.elapsed_seconds = 0.0
+
+    def sub_class_id_for(self, sub_class_key):
+        if sub_class_key is None:
+            return None
+        sub_class_id = self.sub_class_ids.get(sub_class_key)
+        if sub_class_id is None:
+            sub_class_id = len(self.sub_class_ids)
+            self.sub_class_ids[sub_class_key] = sub_class_id
+        return sub_class_id
+
+    def run(self):
+        """
+        At most two chunks per worker are in flight at any time, so memory use is bounded
+        however large the input file is.  Results are written in input order.
+        """
+        start_time = time.time()
+        reader = trade_files.reader_for(
+            self.input_path,
+            columns=self.schema,
+            file_format=self.input_format,
+            chunk_size=self.chunk_size)
+        pool = multiprocessing.Pool(self.workers) if self.workers > 1 else None
+        pending = collections.deque()
+        writer = None
+        try:
+            for rows in reader:
+                if writer is None:
+                    writer = self.writer_for(reader)
+                chunk = (reader.names, rows)
+                if pool:
+                    pending.append((rows, pool.apply_async(classify_chunk, (chunk,))))
+                    if len(pending) >= 2 * self.workers:
+                        waiting_rows, async_result = pending.popleft()
+                        self.write_chunk(writer, waiting_rows, async_result.get())
+                else:
+                    self.write_chunk(writer, rows, classify_chunk(chunk))
+            while pending:
+                waiting_rows, async_result = pending.popleft()
+                self.write_chunk(writer, waiting_rows, async_result.get())
+            if writer is None:
+                writer = self.writer_for(reader)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+            if writer:
+                writer.close()
+        self.elapsed_seconds = time.time() - start_time
+        return self
+
+    def writer_for(self, reader):
+        """
+        The output has the columns of the input, known once it has been read from, and
+        then the classification.  An empty input may not even name its columns, and then
+        the output has those of the taxonomy, so there is always a file with a schema.
+        """
+        columns = reader.columns if reader.names is not None else list(self.schema)
+        return trade_files.writer_for(
+            self.output_path,
+            columns + CLASSIFIED_COLUMNS,
+            file_format=self.output_format,
+            chunk_size=self.chunk_size)
+
+    def write_chunk(self, writer, rows, chunk_results):
+        for row, (sub_class_key, errors) in zip(rows, chunk_results):
+            if errors:
+                self.error_row_count += 1
+                for code, message in errors:
+                    self.error_counts[code] += 1
+                    self.error_examples.setdefault(code, message)
+            row.extend([self.sub_class_id_for(sub_class_key), sub_class_key,
+                        '; '.join(message for (code, message) in errors)])
+            writer.write_row(row)
+        self.row_count += len(rows)
+
+    @property
+    def rows_per_second(self):
+        if not self.elapsed_seconds:
+            return 0.0
+        return self.row_count / self.elapsed_seconds
+
+    def report(self):
+        lines = [
+            'Classified {rows} trades into {sub_classes} sub-classes in {seconds:.1f}s '
+            '({rate:,.0f} trades per second).'.format(
+                rows=self.row_count,
+                sub_classes=len(self.sub_class_ids),
+                seconds=self.elapsed_seconds,
+                rate=self.rows_per_second),
+            '{errors} trades could not be classified.'.format(errors=self.error_row_count),
+        ]
+        for code, count in self.error_counts.most_common(ERROR_SUMMARY_SIZE):
+            lines.append('  {count:>10} x {code}, e.g. {example}'.format(
+                count=count, code=code, example=self.error_examples[code]))
+        return '\n'.join(lines)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Classify a file of trades against the RTS 2 Annex III taxonomy.")
+    parser.add_argument('input_path', help="a .csv, .jsonl or .parquet file of trades")
+    parser.add_argument('output_path', help="where to write the classified trades (.csv, .jsonl or .parquet)")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                        help="the number of worker processes (default: one per CPU)")
+    parser.add_argument('--chunk-size', type=int, default=trade_files.DEFAULT_CHUNK_SIZE,
+                        help="the number of trades read, classified and written at a time")
+    parser.add_argument('--input-format', choices=sorted(trade_files.READERS),
+                        help="the input format, if not given by the file extension")
+    parser.add_argument('--output-format', choices=sorted(trade_files.WRITERS),
+                        help="the output format, if not given by the file extension")
+    args = parser.parse_args(arguments)
+
+    run = ClassificationRun(
+        input_path=args.input_path,
+        output_path=args.output_path,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        input_format=args.input_format,
+        output_format=args.output_format,
+    ).run()
+    sys.stderr.write(run.report() + '\n')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+"""
+A local reference store of the EU figures published by the regulator for each RTS 2
+sub-class: whether it is liquid, the count and EUR notional sum of all EU trades and
+the average daily notional amount (ADNA).  These are the denominators of the SI tests.
+
+Rows are keyed by the canonical sub-class key (see Classification.sub_class_key()).
+The figures are held in numpy arrays, one per column, with a dict from key to row,
+so single lookups are O(1) and a whole set of classified aggregates can be joined
+with one fancy-indexing operation per column.
+
+The published file is loaded once from CSV and can be saved as a directory of .npy
+files and a key list, which later runs load memory-mapped:
+
+    store = EUReferenceStore.from_csv('eu_sub_classes.csv')
+    store.save('eu_reference')
+    ...
+    store = EUReferenceStore.load('eu_reference')
+    calculation = SICalculation(class_root, eea_mics, store)
+"""
+
+import csv
+import io
+import os
+
+import numpy
+
+import si_calculation
+
+KEYS_FILE = 'sub_class_keys.txt'
+
+# The numeric columns and their types.  The CSV file has these after sub_class_key.
+COLUMNS = [
+    ('is_liquid', numpy.bool_),
+    ('eu_trade_count', numpy.int64),
+    ('eu_notional_sum', numpy.float64),
+    ('adna', numpy.float64),
+]
+
+TRUE_TEXTS = frozenset(['1', 'true', 'yes', 'y', 't'])
+
+
+def parse_flag(text):
+    return text.strip().lower() in TRUE_TEXTS
+
+
+class EUReferenceStore(object):
+    """
+    I hold the EU figures for a set of sub-classes, one row per sub-class key.  I can
+    be given to an SICalculation as its EU data.
+    """
+
+    def __init__(self, sub_class_keys, arrays):
+        self.sub_class_keys = list(sub_class_keys)
+        self.rows = dict((sub_class_key, row) for row, sub_class_key in enumerate(self.sub_class_keys))
+        if len(self.rows) != len(self.sub_class_keys):
+            raise ValueError('The EU reference data has more than one row for some sub-classes')
+        self.arrays = arrays
+        for name, dtype in COLUMNS:
+            if len(arrays[name]) != len(self.sub_class_keys):
+                raise ValueError('The EU reference column {name} has {count} rows, not {expected}'.format(
+                    name=name, count=len(arrays[name]), expected=len(self.sub_class_keys)))
+
+    def __len__(self):
+        return len(self.sub_class_keys)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        I make a store from rows of (sub_class_key, is_liquid, eu_trade_count,
+        eu_notional_sum, adna).
+        """
+        rows = list(rows)
+        columns = list(zip(*rows)) if rows else [()] * (len(COLUMNS) + 1)
+        arrays = dict((name, numpy.array(columns[index + 1], dtype=dtype))
+                      for index, (name, dtype) in enumerate(COLUMNS))
+        return cls(columns[0], arrays)
+
+    @classmethod
+    def from_csv(cls, path_or_stream):
+        """
+        I read a CSV file with a header row naming sub_class_key and the COLUMNS, in
+        any order.  Other columns are ignored.
+        """
+        stream = open(path_or_stream, newline='') if isinstance(path_or_stream, str) else path_or_stream
+        try:
+            reader = csv.reader(stream)
+            header = next(reader)
+            indexes = [header.index(name) for name in ['sub_class_key'] + [name for name, _ in COLUMNS]]
+            columns = [[] for _ in indexes]
+            for row in reader:
+                if row:
+                    for column, index in zip(columns, indexes):
+                        column.append(row[index])
+        finally:
+            if stream is not path_or_stream:
+                stream.close()
+        arrays = dict()
+        for (name, dtype), texts in zip(COLUMNS, columns[1:]):
+            if dtype is numpy.bool_:
+                arrays[name] = numpy.array([parse_flag(text) for text in texts], dtype=dtype)
+            else:
+                arrays[name] = numpy.array(texts, dtype=numpy.float64).astype(dtype)
+        return cls(columns[0], arrays)
+
+    def save(self, directory):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with io.open(os.path.join(directory, KEYS_FILE), 'w', encoding='utf-8') as keys_file:
+            for sub_class_key in self.sub_class_keys:
+                keys_file.write(sub_class_key)
+                keys_file.write('\n')
+        for name, _ in COLUMNS:
+            numpy.save(os.path.join(directory, name + '.npy'), numpy.asarray(self.arrays[name]))
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        I load a store saved by save().  The columns are memory-mapped unless mmap_mode
+        is None, so only the pages which are used are read.
+        """
+        with io.open(os.path.join(directory, KEYS_FILE), encoding='utf-8') as keys_file:
+            sub_class_keys = keys_file.read().splitlines()
+        arrays = dict((name, numpy.load(os.path.join(directory, name + '.npy'), mmap_mode=mmap_mode))
+                      for name, _ in COLUMNS)
+        return cls(sub_class_keys, arrays)
+
+    def row_for(self, sub_class_key):
+        return self.rows.get(sub_class_key)
+
+    def rows_for(self, sub_class_keys):
+        """
+        I return an array of the rows of sub_class_keys, with -1 for keys I don't have.
+        """
+        rows = self.rows
+        return numpy.fromiter((rows.get(sub_class_key, -1) for sub_class_key in sub_class_keys),
+                              dtype=numpy.int64, count=len(sub_class_keys))
+
+    def eu_data_for(self, sub_class_key, aggregate=None):
+        row = self.rows.get(sub_class_key)
+        if row is None:
+            return None
+        return si_calculation.EUSubClassData(
+            is_liquid=bool(self.arrays['is_liquid'][row]),
+            eu_trade_count=int(self.arrays['eu_trade_count'][row]),
+            eu_notional_sum=float(self.arrays['eu_notional_sum'][row]))
+
+    def adna_for(self, sub_class_key):
+        row = self.rows.get(sub_class_key)
+        if row is None:
+            return None
+        return float(self.arrays['adna'][row])
+
+    def join(self, sub_class_keys):
+        """
+        I join a sequence of sub-class keys, for example those of a set of classified
+        aggregates, to my figures.  I answer a dict of a boolean 'found' array and an
+        array for each of my COLUMNS, aligned with sub_class_keys.  Rows not found
+        have zero figures.
+        """
+        rows = self.rows_for(sub_class_keys)
+        found = rows >= 0
+        joined = dict(found=found)
+        for name, dtype in COLUMNS:
+            column = numpy.zeros(len(rows), dtype=dtype)
+            column[found] = numpy.asarray(self.arrays[name])[rows[found]]
+            joined[name] = column
+        return joined
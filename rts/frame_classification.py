@@ -0,0 +1,305 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+"""
+Classification of a whole pandas DataFrame of trades at once.
+
+Rather than classifying trade by trade, the frame is grouped by asset class and
+sub-asset class and each group is classified column by column: arbitrary values are
+turned into categorical codes, discrete values are looked up once per distinct value
+and maturity buckets are assigned with a binary search over the bucket end dates for
+each distinct start date.  Each distinct combination of options is then classified
+just once.  Rows which fail any criterion are passed to the ordinary classifier so
+that their errors are exactly those it would report.
+"""
+
+import collections
+import datetime
+
+import numpy
+import pandas
+
+import rts2_annex3_model
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+UNBOUNDED_DAYS = numpy.iinfo(numpy.int64).max
+GROUP_COLUMNS = ['asset_class_name', 'sub_asset_class_name']
+
+
+class OptionCodes(object):
+    """
+    I give each option (or None, for a failure) of one criterion a small integer code.
+    """
+
+    def __init__(self):
+        self.options = []
+        self._codes = dict()
+
+    def code_for(self, option):
+        if option is None:
+            return -1
+        code = self._codes.get(id(option))
+        if code is None:
+            code = len(self.options)
+            self._codes[id(option)] = code
+            self.options.append(option)
+        return code
+
+
+def _column(frame, name, positions):
+    """
+    I return the rows at positions of a column, with missing values as None, as a
+    trade without the attribute would give, rather than NaN.
+    """
+    if name in frame.columns:
+        series = frame[name].iloc[positions]
+        if series.dtype.kind != 'M' and series.hasnans:
+            series = series.astype(object).where(series.notna(), None)
+        return series
+    return pandas.Series([None] * len(positions), dtype=object)
+
+
+def _day_numbers(series):
+    """
+    I turn a column of dates into days since 1970, as floats with missing dates as NaN.
+    """
+    dates = pandas.to_datetime(series, errors='coerce').to_numpy(dtype='datetime64[D]')
+    days = dates.astype(numpy.int64).astype(numpy.float64)
+    days[numpy.isnat(dates)] = numpy.nan
+    return days
+
+
+def _days(a_date):
+    return a_date.toordinal() - EPOCH_ORDINAL
+
+
+def value_codes(criterion, frame, positions, codes):
+    values = _column(frame, criterion.selector, positions)
+    if isinstance(criterion, rts2_annex3_model.ArbitraryValueCriterion):
+        value_indexes, uniques = pandas.factorize(values.astype(str))
+        options = [criterion.option_for_value(value) for value in uniques]
+    else:
+        value_indexes, uniques = pandas.factorize(values)
+        options = [criterion.concrete_options.get(value) for value in uniques]
+    lookup = numpy.array([codes.code_for(option) for option in options] + [-1], dtype=numpy.int64)
+    return lookup[value_indexes]
+
+
+def bucket_codes(criterion, frame, positions, codes):
+    """
+    For each distinct start date I extend the chain of buckets far enough to cover the
+    latest end date, then place every end date with one searchsorted() call.
+    """
+    (from_name, _), (to_name, _) = criterion.subject_attributes()
+    from_days = _day_numbers(_column(frame, from_name, positions))
+    to_days = _day_numbers(_column(frame, to_name, positions))
+    result = numpy.full(len(positions), -1, dtype=numpy.int64)
+    valid = ~numpy.isnan(from_days) & ~numpy.isnan(to_days) & (to_days >= from_days)
+    for from_day in numpy.unique(from_days[valid]):
+        rows = numpy.flatnonzero(valid & (from_days == from_day))
+        row_to_days = to_days[rows]
+        latest_to_day = row_to_days.max()
+        from_date = datetime.date.fromordinal(int(from_day) + EPOCH_ORDINAL)
+        option = criterion.root_option
+        options = []
+        end_days = []
+        while True:
+            end_date = option.ceiling.end_date_from(base_date=from_date)
+            options.append(option)
+            end_days.append(UNBOUNDED_DAYS if end_date is None else _days(end_date))
+            if end_days[-1] >= latest_to_day:
+                break
+            option = option.get_next_bucket_option()
+        lookup = numpy.array([codes.code_for(an_option) for an_option in options], dtype=numpy.int64)
+        result[rows] = lookup[numpy.searchsorted(numpy.array(end_days, dtype='float64'), row_to_days, side='left')]
+    return result
+
+
+def composite_codes(criterion, frame, positions, codes):
+    """
+    Criteria such as MetalsMaturityBucketCriterion choose a bucket criterion by the value
+    of one attribute, so I split the rows by that value and bucket each part.
+    """
+    (selector, _) = criterion.subject_attributes()[0]
+    value_indexes, uniques = pandas.factorize(_column(frame, selector, positions))
+    result = numpy.full(len(positions), -1, dtype=numpy.int64)
+    for index, value in enumerate(uniques):
+        bucket_criterion = criterion.bucket_criterion_for(value)
+        if bucket_criterion is not None:
+            rows = numpy.flatnonzero(value_indexes == index)
+            result[rows] = bucket_codes(bucket_criterion, frame, positions[rows], codes)
+    return result
+
+
+BUCKET_CRITERIA = (
+    rts2_annex3_model.BucketedTermOfUnderlyingCriterion,
+    rts2_annex3_model.SwapMaturityBucketCriterion,
+    rts2_annex3_model.OptionMaturityBucketCriterion,
+    rts2_annex3_model.MaturityBucketCriterion,
+)
+
+COMPOSITE_CRITERIA = (
+    rts2_annex3_model.MetalsMaturityBucketCriterion,
+    rts2_annex3_model.EnergyMaturityBucketCriterion,
+    rts2_annex3_model.EquityParameterMaturityBucketCriterion,
+)
+
+
+def criterion_codes(criterion, frame, positions, codes):
+    if isinstance(criterion, (rts2_annex3_model.ArbitraryValueCriterion,
+                              rts2_annex3_model.DescreteValueCriterion)):
+        return value_codes(criterion, frame, positions, codes)
+    if isinstance(criterion, BUCKET_CRITERIA):
+        return bucket_codes(criterion, frame, positions, codes)
+    if isinstance(criterion, COMPOSITE_CRITERIA):
+        return composite_codes(criterion, frame, positions, codes)
+    return None
+
+
+class FrameClassifier(object):
+
+    def __init__(self, root):
+        self.root = root
+
+    def classify(self, frame):
+        row_count = len(frame)
+        self._frame = frame
+        self._row_columns = None
+        self._ids = numpy.full(row_count, -1, dtype=numpy.int64)
+        self._keys = numpy.full(row_count, None, dtype=object)
+        self._errors = numpy.full(row_count, '', dtype=object)
+        self._classification_count = 0
+        group_frame = pandas.DataFrame({name: _column(frame, name, numpy.arange(row_count)).to_numpy()
+                                        for name in GROUP_COLUMNS})
+        groups = group_frame.groupby(GROUP_COLUMNS, sort=False, dropna=False).indices
+        for (asset_class_name, sub_asset_class_name), positions in groups.items():
+            self.classify_group(frame, asset_class_name, sub_asset_class_name, positions)
+        return pandas.DataFrame({
+            'sub_class_id': self._ids,
+            'sub_class_key': pandas.Categorical(self._keys),
+            'errors': self._errors,
+        }, index=frame.index)
+
+    def classify_group(self, frame, asset_class_name, sub_asset_class_name, positions):
+        asset_class = self.root.asset_class_by_name(asset_class_name)
+        sub_asset_class = asset_class.sub_asset_class_by_name(sub_asset_class_name) if asset_class else None
+        if sub_asset_class is None:
+            # No such asset class or sub-asset class, or an asset class with no
+            # sub-asset classes; either way the first row speaks for them all.
+            # The same is true of a sub-asset class with no criteria, below.
+            self.classify_like_first_row(frame, positions)
+            return
+        criteria = sub_asset_class.criteria
+        coders = [OptionCodes() for _ in criteria]
+        columns = []
+        for criterion, codes in zip(criteria, coders):
+            criterion_result = criterion_codes(criterion, frame, positions, codes)
+            if criterion_result is None:
+                self.classify_rows(frame, positions)
+                return
+            columns.append(criterion_result)
+        if not columns:
+            self.classify_like_first_row(frame, positions)
+            return
+        code_matrix = numpy.column_stack(columns)
+        failed = (code_matrix < 0).any(axis=1)
+        self.classify_rows(frame, positions[failed])
+        good_positions = positions[~failed]
+        if not len(good_positions):
+            return
+        combinations, inverse = numpy.unique(code_matrix[~failed], axis=0, return_inverse=True)
+        ids = numpy.empty(len(combinations), dtype=numpy.int64)
+        keys = []
+        for index, combination in enumerate(combinations):
+            options = [codes.options[code] for codes, code in zip(coders, combination)]
+            classification = rts2_annex3_model.Classification(
+                root=self.root, sub_asset_class=sub_asset_class, options=options)
+            ids[index] = self.root.sub_class_id_for(classification)
+            keys.append(classification.sub_class_key())
+        inverse = inverse.reshape(-1)
+        self._ids[good_positions] = ids[inverse]
+        self._keys[good_positions] = numpy.array(keys, dtype=object)[inverse]
+
+    def row_subjects(self, positions):
+        """
+        I return rows of my frame as dicts, with timestamps turned back into dates, for
+        the ordinary classifier.  The columns are taken out of the frame only once.
+        """
+        if self._row_columns is None:
+            self._row_columns = collections.OrderedDict()
+            for name in self._frame.columns:
+                series = self._frame[name]
+                if series.dtype.kind == 'M':
+                    values = numpy.array([None if value is pandas.NaT else value.date() for value in series],
+                                         dtype=object)
+                else:
+                    values = series.to_numpy(dtype=object, copy=True)
+                    values[pandas.isna(values)] = None
+                self._row_columns[name] = values
+        names = list(self._row_columns)
+        columns = [values[positions] for values in self._row_columns.values()]
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+    def classify_like_first_row(self, frame, positions):
+        (subject,) = self.row_subjects(positions[:1])
+        classification = self.root.classification_for(subject, accessor=rts2_annex3_model.MappingAccessor())
+        self.record(positions, classification)
+
+    def classify_rows(self, frame, positions):
+        if not len(positions):
+            return
+        accessor = rts2_annex3_model.MappingAccessor()
+        for position, subject in zip(positions, self.row_subjects(positions)):
+            self.record([position], self.root.classification_for(subject, accessor=accessor))
+
+    def record(self, positions, classification):
+        sub_class_id = self.root.sub_class_id_for(classification)
+        self._ids[positions] = -1 if sub_class_id is None else sub_class_id
+        self._keys[positions] = classification.sub_class_key()
+        self._errors[positions] = '; '.join(classification.error_messages())
+
+
+def classify_frame(frame, root=None):
+    """
+    I classify every row of frame, a DataFrame with a column for each attribute the
+    trades carry, and return a DataFrame with the same index and three columns:
+    sub_class_id (an int, -1 where the row could not be classified), sub_class_key (a
+    categorical of the canonical sub-class keys) and errors (a string, empty if none).
+    """
+    if root is None:
+        import rts2_annex3
+        root = rts2_annex3.class_root
+    return FrameClassifier(root).classify(frame)
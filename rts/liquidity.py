@@ -0,0 +1,208 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+"""
+The quantitative liquidity assessment of RTS 2 sub-classes.
+
+A sub-class has a liquid market if its average daily notional amount (ADNA) and its
+average daily number of trades are at least those of the LiquidityCriteria of its
+sub-asset class.  The averages are over the trading days of the assessment period,
+not just the days on which the sub-class traded.  The qualitative criteria are text
+and are not assessed here.
+
+Trades are added a day at a time, each day touching only the totals of the
+sub-classes traded that day, and the whole set of sub-classes is assessed at once
+with numpy.  Fed the EU trade stream this gives the figures which the regulator
+publishes; fed one firm's trades it gives that firm's view.
+
+    assessment = LiquidityAssessment(class_root, trading_days(first_date, last_date, holidays))
+    for trade_date, trades in trades_by_day:
+        assessment.add_day(trade_date, trades)
+    statuses = assessment.assess()
+    reference_data = EUReferenceStore.from_rows(assessment.reference_rows())
+"""
+
+import datetime
+
+import numpy
+
+
+def trading_days(first_date, last_date, holidays=()):
+    """
+    I return the sorted list of weekdays from first_date to last_date inclusive which
+    are not holidays.
+    """
+    holidays = frozenset(holidays)
+    days = []
+    day = first_date
+    while day <= last_date:
+        if day.weekday() < 5 and day not in holidays:
+            days.append(day)
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def liquidity_criteria_for(classification):
+    """
+    I return the LiquidityCriteria of the sub-asset class of classification, or None if
+    there are none.  SFPs and securitised derivatives have no sub-asset classes, and so
+    no liquidity criteria, and are not assessable.
+    """
+    sub_asset_class = classification.sub_asset_class
+    thresholds = sub_asset_class and sub_asset_class.thresholds
+    return thresholds and thresholds.liquidity_criteria
+
+
+class LiquidityStatus(object):
+    __slots__ = ('is_liquid', 'adna', 'average_daily_trades')
+
+    def __init__(self, is_liquid, adna, average_daily_trades):
+        self.is_liquid = is_liquid
+        self.adna = adna
+        self.average_daily_trades = average_daily_trades
+
+
+class LiquidityAssessment(object):
+    """
+    I hold the trade count and notional sum of each sub-class, keyed by sub-class key,
+    over the trading days of an assessment period.  Trades must carry eur_notional as
+    well as the attributes needed for classification.
+    """
+
+    def __init__(self, root, trading_days):
+        self.root = root
+        self.trading_days = sorted(trading_days)
+        self.sub_class_keys = []
+        self.trade_counts = []
+        self.notional_sums = []
+        self.last_date = None
+        self._rows_by_key = dict()
+        self._rows_by_id = dict()
+        self._criteria_by_key = dict()
+
+    def row_for(self, classification):
+        sub_class_id = self.root.sub_class_id_for(classification)
+        if sub_class_id is None:
+            return None
+        row = self._rows_by_id.get(sub_class_id)
+        if row is None:
+            sub_class_key = classification.sub_class_key()
+            row = self._rows_by_key.get(sub_class_key)
+            if row is None:
+                row = self._rows_by_key[sub_class_key] = len(self.sub_class_keys)
+                self.sub_class_keys.append(sub_class_key)
+                self.trade_counts.append(0)
+                self.notional_sums.append(0)
+                self._criteria_by_key[sub_class_key] = liquidity_criteria_for(classification)
+            self._rows_by_id[sub_class_id] = row
+        return row
+
+    def add_day(self, trade_date, trades, accessor=None, names=None):
+        if self.last_date is not None and trade_date < self.last_date:
+            raise ValueError('Trades for {date} are earlier than those already added, for {last_date}'.format(
+                date=trade_date, last_date=self.last_date))
+        self.last_date = trade_date
+        trade_counts = self.trade_counts
+        notional_sums = self.notional_sums
+        for classification in self.root.classify_many(trades, accessor=accessor, names=names):
+            row = self.row_for(classification)
+            if row is not None:
+                trade_counts[row] += 1
+                notional_sums[row] += abs(classification.subject_value('eur_notional'))
+        return self
+
+    def number_of_trading_days(self, as_of=None):
+        """
+        I return the number of trading days up to and including as_of, by default the
+        last day added.
+        """
+        as_of = as_of or self.last_date
+        if as_of is None:
+            return 0
+        return sum(1 for day in self.trading_days if day <= as_of)
+
+    def criteria_arrays(self):
+        """
+        I return arrays of the ADNA and average daily trades thresholds of each row,
+        NaN where a sub-class has no liquidity criteria (or not that criterion).
+        """
+        adna_floors = numpy.full(len(self.sub_class_keys), numpy.nan)
+        trades_floors = numpy.full(len(self.sub_class_keys), numpy.nan)
+        for row, sub_class_key in enumerate(self.sub_class_keys):
+            criteria = self._criteria_by_key[sub_class_key]
+            if criteria:
+                if criteria.average_daily_notional_amount is not None:
+                    adna_floors[row] = criteria.average_daily_notional_amount.amount
+                if criteria.average_daily_number_of_trades is not None:
+                    trades_floors[row] = criteria.average_daily_number_of_trades
+        return adna_floors, trades_floors
+
+    def assess_arrays(self, as_of=None):
+        """
+        I return aligned arrays, one element per key of sub_class_keys: whether each
+        sub-class is liquid, whether it could be assessed, its ADNA and its average
+        daily trades.  A sub-class with no liquidity criteria is not assessable and
+        is not liquid.
+        """
+        days = self.number_of_trading_days(as_of) or 1
+        adna = numpy.array(self.notional_sums, dtype=numpy.float64) / days
+        average_daily_trades = numpy.array(self.trade_counts, dtype=numpy.float64) / days
+        adna_floors, trades_floors = self.criteria_arrays()
+        assessable = ~(numpy.isnan(adna_floors) & numpy.isnan(trades_floors))
+        is_liquid = assessable \
+            & (numpy.isnan(adna_floors) | (adna >= adna_floors)) \
+            & (numpy.isnan(trades_floors) | (average_daily_trades >= trades_floors))
+        return is_liquid, assessable, adna, average_daily_trades
+
+    def assess(self, as_of=None):
+        """
+        I return a dict of sub-class key to LiquidityStatus for the assessable
+        sub-classes.
+        """
+        is_liquid, assessable, adna, average_daily_trades = self.assess_arrays(as_of)
+        return dict((sub_class_key, LiquidityStatus(bool(is_liquid[row]), adna[row], average_daily_trades[row]))
+                    for row, sub_class_key in enumerate(self.sub_class_keys)
+                    if assessable[row])
+
+    def reference_rows(self, as_of=None):
+        """
+        I return rows of (sub_class_key, is_liquid, trade_count, notional_sum, adna), as
+        EUReferenceStore.from_rows() takes them.
+        """
+        is_liquid, assessable, adna, average_daily_trades = self.assess_arrays(as_of)
+        return [(sub_class_key, bool(is_liquid[row]), self.trade_counts[row], self.notional_sums[row], adna[row])
+                for row, sub_class_key in enumerate(self.sub_class_keys)]
@@ -2882,6 +2882,9 @@ class_root.append(
     )
 )
 
+# The taxonomy is complete, so criterion numbers and names can be fixed
+class_root.freeze()
+
 
 # Below this point are a set of initial crude tests which will be removed once equivalent tests have
 # been added to the unit test suite.
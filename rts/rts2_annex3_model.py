@@ -33,11 +33,17 @@ __author__ = "Bruce Badger"
 __copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
 __license__ = "BSD-3-Clause"
 
+import bisect
 import datetime
 import calendar
 import collections
+import collections.abc
+import io
+import itertools
 import random
 import json
+import re
+import sys
 
 import rts23_table2
 
@@ -45,6 +51,147 @@ import locale
 locale.setlocale(locale.LC_ALL, '')
 
 
+# Classification error codes.  Errors are recorded as a code, the node which found the
+# error and the offending values, and only formatted as text when asked for, so that
+# a feed of millions of bad trades costs little more than a feed of good ones.
+NO_ASSET_CLASS = 'no_asset_class'
+NO_SUB_ASSET_CLASS = 'no_sub_asset_class'
+VALUE_EXCEPTION = 'value_exception'
+NO_VALUE = 'no_value'
+BAD_VALUE = 'bad_value'
+BAD_TERM_BUCKET = 'bad_term_bucket'
+BAD_SWAP_MATURITY_BUCKET = 'bad_swap_maturity_bucket'
+BAD_OPTION_MATURITY_BUCKET = 'bad_option_maturity_bucket'
+BAD_METALS_MATURITY_BUCKET = 'bad_metals_maturity_bucket'
+NO_ENERGY_TYPE = 'no_energy_type'
+BAD_ENERGY_MATURITY_BUCKET = 'bad_energy_maturity_bucket'
+NO_EQUITY_PARAMETER_BUCKETING = 'no_equity_parameter_bucketing'
+BAD_MATURITY_BUCKET = 'bad_maturity_bucket'
+
+# The text of each error, formatted with the node as node and the values in order, is
+# the text each error had before errors were codes.  But an accessor answers None for
+# a value which is missing, so a missing value and a value of None are now the same: a
+# discrete value criterion reports no value (not the bad value None), the energy
+# maturity buckets no energy type, and an arbitrary value criterion takes the value
+# None, as it always did for a None attribute, rather than raising VALUE_EXCEPTION.
+ERROR_FORMATS = {
+    NO_ASSET_CLASS: "RTS 2 has no Asset Class named '{0}'.",
+    NO_SUB_ASSET_CLASS: "Asset class '{node.name}' has no Sub-asset Class named '{0}'.",
+    VALUE_EXCEPTION: "{node.__class__} exception: {0}",
+    NO_VALUE: "{node.__class__.__name__} got no value.  Should be one of [{node.allowed_values_text}].",
+    BAD_VALUE: "{node.__class__.__name__} got bad value: {0}.  Should be one of [{node.allowed_values_text}].",
+    BAD_TERM_BUCKET: "Bad term bucket. Dates: from_date={0}, to_date={1}.",
+    BAD_SWAP_MATURITY_BUCKET: "Bad swap maturity bucket. Dates: from_date={0}, to_date={1}.",
+    BAD_OPTION_MATURITY_BUCKET: "Bad option maturity bucket. Dates: from_date={0}, to_date={1}.",
+    BAD_METALS_MATURITY_BUCKET: "Bad metals maturity bucket.  Metal type: {0}. Dates: from_date={1}, to_date={2}.",
+    NO_ENERGY_TYPE: "Bad energy maturity bucket.  Subject has no energy type.",
+    BAD_ENERGY_MATURITY_BUCKET: "Bad energy maturity bucket.  Energy type: {0}. Dates: from_date={1}, to_date={2}.",
+    NO_EQUITY_PARAMETER_BUCKETING: "{node.__class__.__name__} error - no bucketing for parameter: {0}.  "
+                                   "Must be one of: [{node.allowed_values_text}].",
+    BAD_MATURITY_BUCKET: "Bad maturity bucket dates: from_date={0}, to_date={1}.",
+}
+
+
+class ClassificationError(collections.namedtuple('ClassificationError', ['code', 'node', 'values'])):
+    """
+    I am one reason a subject could not be classified.  My text is made when I am
+    converted to a string.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return ERROR_FORMATS[self.code].format(*self.values, node=self.node)
+
+
+def error_counts(classifications, by_node=False):
+    """
+    I count the errors of classifications by code, or by (code, node) if by_node.
+    """
+    counts = collections.Counter()
+    for classification in classifications:
+        if classification.has_errors():
+            for error in classification.errors:
+                counts[(error.code, error.node) if by_node else error.code] += 1
+    return counts
+
+
+def dates_are_sane(from_date, to_date):
+    """
+    I check dates as a date bucket criterion needs them: both dates, in order.
+    """
+    return isinstance(from_date, datetime.date) and isinstance(to_date, datetime.date) and from_date <= to_date
+
+
+def object_size(an_object):
+    """
+    I return the size of an_object with its attribute dict and the strings, numbers
+    and dates it holds, but not the other objects it refers to.
+    """
+    size = sys.getsizeof(an_object)
+    attributes = getattr(an_object, '__dict__', None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+        for value in attributes.values():
+            if isinstance(value, (str, bytes, int, float, datetime.date)):
+                size += sys.getsizeof(value)
+    return size
+
+
+def deep_size(an_object, seen=None):
+    """
+    I return the size of an_object and everything it refers to, counting each object
+    once and not following references to taxonomy nodes, which are reported in their
+    own right.
+    """
+    seen = set() if seen is None else seen
+    size = 0
+    pending = [an_object]
+    while pending:
+        item = pending.pop()
+        if item is None or id(item) in seen or isinstance(item, TaxonomyNode):
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(item)
+        elif hasattr(item, '__dict__'):
+            pending.append(item.__dict__)
+    return size
+
+
+def options_memory(concrete_options):
+    """
+    I return the memory of a criterion's dict of value options, as retained_memory() does.
+    """
+    size = sys.getsizeof(concrete_options)
+    for value, option in concrete_options.items():
+        size += sys.getsizeof(value) + object_size(option)
+    return [('concrete options', len(concrete_options), size)]
+
+
+def bucket_memory(root_option, given_buckets):
+    """
+    I return the memory of the linked list of bucket options starting at root_option,
+    as retained_memory() does, separating the buckets made from the given ceilings from
+    those extrapolated beyond them.
+    """
+    if root_option is None:
+        return []
+    counts = [0, 0]
+    sizes = [0, 0]
+    bucket_option = root_option
+    while bucket_option is not None:
+        extrapolated = int(counts[0] >= given_buckets)
+        counts[extrapolated] += 1
+        sizes[extrapolated] += object_size(bucket_option) + object_size(bucket_option.ceiling)
+        bucket_option = bucket_option.next_bucket_option
+    return [('maturity buckets', counts[0], sizes[0]),
+            ('extrapolated maturity buckets', counts[1], sizes[1])]
+
+
 class SampleTrade(object):
     """
     This class is used by the test data generation code.  The classes
@@ -54,6 +201,57 @@ class SampleTrade(object):
     pass
 
 
+class AttributeAccessor(object):
+    """
+    An accessor is the strategy used to get named values from a subject (a trade).
+    I am the default accessor, for subjects which are objects with attributes.
+    """
+
+    def value(self, subject, name):
+        return getattr(subject, name, None)
+
+
+class MappingAccessor(object):
+    """
+    I get values from subjects which are mappings, such as dicts or the rows from
+    csv.DictReader, so they need not be copied into objects to be classified.
+    """
+
+    def value(self, subject, name):
+        return subject.get(name)
+
+
+class ColumnAccessor(object):
+    """
+    I get values from subjects which are sequences, such as the rows from csv.reader
+    or a DB-API cursor, using a map of column names to indexes built once for the batch.
+    """
+
+    def __init__(self, names):
+        self._indexes = dict((name, index) for (index, name) in enumerate(names))
+
+    def value(self, subject, name):
+        index = self._indexes.get(name)
+        if index is None or index >= len(subject):
+            return None
+        return subject[index]
+
+
+ATTRIBUTE_ACCESSOR = AttributeAccessor()
+
+
+def accessor_for(subject, names=None):
+    """
+    I choose an accessor for a batch of subjects like subject.  If column names are
+    given the subjects are taken to be sequences of values in that order.
+    """
+    if names is not None:
+        return ColumnAccessor(names)
+    if isinstance(subject, collections.abc.Mapping):
+        return MappingAccessor()
+    return ATTRIBUTE_ACCESSOR
+
+
 class TaxonomyNode(object):
     """
     This class defines the API which much be implemented by all nodes.
@@ -61,6 +259,30 @@ class TaxonomyNode(object):
     and children.  Handy for presenting the taxonomy as a tree.
     """
 
+    _json_fragment = None
+
+    def display(self, prefix=""):
+        stream = io.StringIO()
+        self.write_display(stream, prefix)
+        return stream.getvalue()
+
+    def write_display(self, stream, prefix=""):
+        """
+        I write my part of the taxonomy dump to stream, a file-like object, so that the
+        dump of the whole tree is written in one pass rather than built up as a string.
+        """
+        raise NotImplementedError('write_display() must be implemented in concrete subclass {my_class}'
+                                  .format(my_class=type(self)))
+
+    def json_fragment(self):
+        """
+        I return the members of my classification dictionary as they appear in its JSON,
+        without the braces.  The taxonomy doesn't change once built, so I make this once.
+        """
+        if self._json_fragment is None:
+            self._json_fragment = json.dumps(self.classification_dict())[1:-1]
+        return self._json_fragment
+
     @property
     def name(self):
         raise NotImplementedError('name() must be implemented in concrete subclass {my_class}'
@@ -126,12 +348,33 @@ class TaxonomyNode(object):
         raise NotImplementedError('init_sample() must be implemented in concrete subclass {my_class}'
                           .format(my_class=type(self)))
 
+    def subject_attributes(self):
+        """
+        I return a list of (attribute name, type) pairs naming the values a subject (a
+        trade) must carry to be classified by me or any of my children.  The order is
+        the taxonomy order and each name appears once, so the list can be used as a
+        stable column schema for files of trades.
+        """
+        attributes = collections.OrderedDict([
+            ('asset_class_name', str),
+            ('sub_asset_class_name', str),
+        ])
+        for child in self.children:
+            attributes.update(child.subject_attributes())
+        return list(attributes.items())
+
 
 class TaxonomyRoot(TaxonomyNode):
 
     def __init__(self, version_id, asset_classes=None):
         self.version_id = version_id
+        self._version_json_fragment = None
         self._asset_classes = []
+        self._sub_class_ids = dict()
+        self._sub_class_identities = []
+        self._sub_class_ids_by_key = dict()
+        self._keyed_sub_class_count = 0
+        self._validation_index = None
         given_asset_classes = asset_classes or []
         self._asset_classes.extend(given_asset_classes)
 
@@ -150,17 +393,219 @@ class TaxonomyRoot(TaxonomyNode):
         """
         return self.classification_for(subject)
 
-    def classification_for(self, subject):
-        classification = Classification(subject=subject, root=self)
-        asset_class = self.asset_class_by_name(subject.asset_class_name)
+    def classification_for(self, subject, accessor=ATTRIBUTE_ACCESSOR):
+        classification = Classification(subject=subject, root=self, accessor=accessor)
+        asset_class_name = classification.subject_value('asset_class_name')
+        asset_class = self.asset_class_by_name(asset_class_name)
         if asset_class:
             asset_class.extend_classification(classification)
         else:
-            classification.errors.append("RTS 2 has no Asset Class named '{asset_class_name}'.".format(
-                asset_class_name=subject.asset_class_name
-            ))
+            classification.add_error(NO_ASSET_CLASS, self, asset_class_name)
         return classification
 
+    def classify_many(self, subjects, accessor=None, names=None):
+        """
+        I answer the classification of each of subjects in turn.  Subjects may be objects,
+        mappings or, if column names are given, sequences such as tuples.  Unless an
+        accessor is given I choose one from the first subject and use it for them all.
+        """
+        subjects = iter(subjects)
+        if accessor is None:
+            first_subject = next(subjects, None)
+            if first_subject is None:
+                return
+            accessor = accessor_for(first_subject, names=names)
+            subjects = itertools.chain([first_subject], subjects)
+        for subject in subjects:
+            yield self.classification_for(subject, accessor=accessor)
+
+    def validation_index(self):
+        """
+        I return a dict of asset class name to a dict of sub-asset class name to sub-asset
+        class, made once, for validation.
+        """
+        if self._validation_index is None:
+            self._validation_index = dict(
+                (asset_class.name, dict((sub_asset_class.name, sub_asset_class)
+                                        for sub_asset_class in asset_class.sub_asset_classes))
+                for asset_class in self.asset_classes)
+        return self._validation_index
+
+    def validate(self, subject, accessor=ATTRIBUTE_ACCESSOR):
+        """
+        I check that subject could be classified, without classifying it, and return the
+        codes of the errors found (see ERROR_FORMATS), or an empty list if there are
+        none.  I check everything classification would and am stricter in two ways:
+        every criterion must find a value, and dates must be dates.
+        """
+        sub_asset_classes = self.validation_index().get(accessor.value(subject, 'asset_class_name'))
+        if sub_asset_classes is None:
+            return [NO_ASSET_CLASS]
+        if not sub_asset_classes:
+            return []
+        sub_asset_class = sub_asset_classes.get(accessor.value(subject, 'sub_asset_class_name'))
+        if sub_asset_class is None:
+            return [NO_SUB_ASSET_CLASS]
+        codes = []
+        for criterion in sub_asset_class.criteria:
+            code = criterion.validate(subject, accessor)
+            if code is not None:
+                codes.append(code)
+        return codes
+
+    def validate_many(self, subjects, accessor=None, names=None):
+        """
+        I answer a (passed, error codes) pair for each of subjects in turn, choosing an
+        accessor as classify_many() does.  This is much quicker than classification, so
+        can be used to reject a bad file before it is classified.
+        """
+        subjects = iter(subjects)
+        if accessor is None:
+            first_subject = next(subjects, None)
+            if first_subject is None:
+                return
+            accessor = accessor_for(first_subject, names=names)
+            subjects = itertools.chain([first_subject], subjects)
+        for subject in subjects:
+            codes = self.validate(subject, accessor)
+            yield not codes, codes
+
+    def sub_class_id_for(self, classification):
+        """
+        I return a small integer which identifies the RTS 2 sub-class of classification
+        within this process, or None if the classification has errors.  IDs are handed
+        out in the order sub-classes are first met, so they are not stable between runs;
+        the sub-class key is the canonical, stable identity.
+        """
+        if classification.errors:
+            return None
+        identity = classification.sub_class_identity()
+        sub_class_id = self._sub_class_ids.get(identity)
+        if sub_class_id is None:
+            sub_class_id = len(self._sub_class_identities)
+            self._sub_class_ids[identity] = sub_class_id
+            self._sub_class_identities.append(identity)
+        return sub_class_id
+
+    def sub_class_id_for_key(self, sub_class_key):
+        """
+        I return the sub-class ID for a sub-class key, as sub_class_id_for() would for a
+        classification with that key, so that sub-classes met only as keys, for example
+        in the partial results of another process, share IDs with those classified here.
+        """
+        sub_class_id = self._sub_class_ids_by_key.get(sub_class_key)
+        if sub_class_id is None:
+            # Key the IDs handed out since last time, then look again
+            for keyed_id in range(self._keyed_sub_class_count, len(self._sub_class_identities)):
+                self._sub_class_ids_by_key[self.sub_class_for_id(keyed_id).sub_class_key()] = keyed_id
+            self._keyed_sub_class_count = len(self._sub_class_identities)
+            sub_class_id = self._sub_class_ids_by_key.get(sub_class_key)
+        if sub_class_id is None:
+            sub_class_id = self.sub_class_id_for(self.classification_for_key(sub_class_key))
+        return sub_class_id
+
+    def classification_for_key(self, sub_class_key):
+        """
+        I return a Classification, with no subject, rebuilt from a sub-class key.  I raise
+        a ValueError if the key is not that of a sub-class of this taxonomy.
+        """
+        classification_dict = json.loads(sub_class_key, object_pairs_hook=collections.OrderedDict)
+        asset_class = self.asset_class_by_name(classification_dict.get('Asset class'))
+        if asset_class is None:
+            raise ValueError("No asset class for sub-class key: {key}".format(key=sub_class_key))
+        classification = Classification(root=self)
+        classification.asset_class = asset_class
+        if 'Sub-asset class' in classification_dict:
+            sub_asset_class = asset_class.sub_asset_class_by_name(classification_dict['Sub-asset class'])
+            if sub_asset_class is None:
+                raise ValueError("No sub-asset class for sub-class key: {key}".format(key=sub_class_key))
+            classification.sub_asset_class = sub_asset_class
+            for criterion in sub_asset_class.criteria:
+                option = criterion.option_for_key(classification_dict)
+                if option is None:
+                    raise ValueError("No option of {criterion} for sub-class key: {key}".format(
+                        criterion=criterion.full_name(), key=sub_class_key))
+                classification.options.append(option)
+        if classification.as_json() != sub_class_key:
+            raise ValueError("Sub-class key is not that of this taxonomy: {key}".format(key=sub_class_key))
+        return classification
+
+    def sub_class_ids(self):
+        """
+        I return the sub-class IDs I have handed out so far.
+        """
+        return range(len(self._sub_class_identities))
+
+    def sub_class_for_id(self, sub_class_id):
+        """
+        I return a Classification, with no subject, for a sub-class ID I handed out.
+        """
+        identity = self._sub_class_identities[sub_class_id]
+        classification = Classification(root=self, sub_asset_class=identity[1], options=list(identity[2:]))
+        classification.asset_class = identity[0]
+        return classification
+
+    def freeze(self):
+        """
+        I am called once the taxonomy is complete to fix anything which depends on the
+        shape of the tree, such as criterion numbers.
+        """
+        for sub_asset_class in self.all_sub_asset_classes():
+            for criterion in sub_asset_class.criteria:
+                criterion.freeze()
+        return self
+
+    def version_json_fragment(self):
+        if self._version_json_fragment is None:
+            self._version_json_fragment = json.dumps({'RTS2 version': self.version_id})[1:-1]
+        return self._version_json_fragment
+
+    def thresholds_for(self, classification, adna=None, is_liquid=True):
+        """
+        I return the ThresholdTable which applies to a classified trade: the non-liquid
+        table if the sub-class is not liquid, otherwise the liquid table for the band
+        of the sub-class's average daily notional amount (ADNA, in EUR), if the liquid
+        tables are banded.  I return None where RTS 2 gives no table.
+        """
+        sub_asset_class = classification.sub_asset_class
+        if sub_asset_class is None or sub_asset_class.thresholds is None:
+            return None
+        return sub_asset_class.thresholds.table_for(adna, is_liquid)
+
+    def memory_report(self):
+        """
+        I return a list of dicts, largest first, of the memory retained by my caches and
+        by each sub-asset class's thresholds and criteria: the value options each
+        criterion has made and the maturity buckets, given and extrapolated, of each
+        date criterion.  Sizes are in bytes and approximate, being the sum of
+        sys.getsizeof() of the objects each component holds.
+        """
+        rows = []
+
+        def add(component, items, size, sub_asset_class=None, criterion=None):
+            rows.append(collections.OrderedDict([
+                ('component', component),
+                ('asset_class', sub_asset_class.parent.name if sub_asset_class else None),
+                ('sub_asset_class', sub_asset_class.name if sub_asset_class else None),
+                ('criterion', criterion.full_name() if criterion else None),
+                ('items', items),
+                ('bytes', size),
+            ]))
+
+        seen = set()
+        add('sub-class ID cache', len(self._sub_class_ids), deep_size(self._sub_class_ids, seen))
+        add('sub-class identity cache', len(self._sub_class_identities), deep_size(self._sub_class_identities, seen))
+        add('sub-class key cache', len(self._sub_class_ids_by_key), deep_size(self._sub_class_ids_by_key, seen))
+        add('validation index', len(self._validation_index or ()), deep_size(self._validation_index, seen))
+        for sub_asset_class in self.all_sub_asset_classes():
+            if sub_asset_class.thresholds is not None:
+                add('thresholds', 1, deep_size(sub_asset_class.thresholds), sub_asset_class)
+            for criterion in sub_asset_class.criteria:
+                for component, items, size in criterion.retained_memory():
+                    add(component, items, size, sub_asset_class, criterion)
+        rows.sort(key=lambda row: -row['bytes'])
+        return rows
+
     def asset_class_by_name(self, asset_class_name):
         return next((asset_class
                      for asset_class
@@ -170,13 +615,16 @@ class TaxonomyRoot(TaxonomyNode):
 
     def append(self, asset_class):
         self._asset_classes.append(asset_class)
+        self._validation_index = None
 
-    def display(self, prefix=""):
-        target = "The set of all Asset Classes:"
+    def write_display(self, stream, prefix="", thresholds=False):
+        """
+        If thresholds is true the thresholds of each sub-asset class are written too.
+        """
+        stream.write("The set of all Asset Classes:")
         for asset_class in self._asset_classes:
-            target += "\n"
-            target += asset_class.display(prefix=prefix+'- ')
-        return target
+            stream.write("\n")
+            asset_class.write_display(stream, prefix=prefix+'- ', thresholds=thresholds)
 
     @property
     def parent(self):
@@ -220,16 +668,12 @@ class AssetClass(TaxonomyNode):
     def extend_classification(self, classification):
         classification.asset_class = self
         if self.children:
-            sub_asset_class = self.sub_asset_class_by_name(classification.subject.sub_asset_class_name)
+            sub_asset_class = self.sub_asset_class_by_name(classification.subject_value('sub_asset_class_name'))
             if sub_asset_class:
                 sub_asset_class.extend_classification(classification)
             else:
-                classification.errors.append(
-                    "Asset class '{asset_class_name}' has no Sub-asset Class named '{sub_asset_class_name}'.".format(
-                        asset_class_name=self.name,
-                        sub_asset_class_name=classification.subject.sub_asset_class_name
-                    )
-                )
+                classification.add_error(
+                    NO_SUB_ASSET_CLASS, self, classification.subject_value('sub_asset_class_name'))
         return classification
 
     def sub_asset_class_by_name(self, sub_asset_class_name):
@@ -245,14 +689,13 @@ class AssetClass(TaxonomyNode):
     def path_name(self):
         return "\n" + self.full_name()
 
-    def display(self, prefix=""):
-        target = prefix + self.full_name()
+    def write_display(self, stream, prefix="", thresholds=False):
+        stream.write(prefix + self.full_name())
         if self.description:
-            target += "\n" + self.description
+            stream.write("\n" + self.description)
         for sub_asset_class in self.sub_asset_classes:
-            target += "\n"
-            target += sub_asset_class.display(prefix=prefix+'- ')
-        return target
+            stream.write("\n")
+            sub_asset_class.write_display(stream, prefix=prefix+'- ', thresholds=thresholds)
 
     def classification_dict(self):
         return {'Asset class': self.name}
@@ -337,12 +780,24 @@ class SubAssetClass(TaxonomyNode):
     def path_name(self):
         return self.parent.path_name() + "\n" + self.full_name()
 
-    def display(self, prefix):
-        target = prefix + self.full_name()
+    def write_display(self, stream, prefix="", thresholds=False):
+        stream.write(prefix + self.full_name())
         for criterion in self.criteria:
-            target += "\n"
-            target += criterion.display(prefix=prefix+'- ')
-        return target
+            stream.write("\n")
+            criterion.write_display(stream, prefix=prefix+'- ')
+        if thresholds:
+            self.write_thresholds(stream, prefix=prefix+'- ')
+
+    def write_thresholds(self, stream, prefix=""):
+        """
+        I write my liquidity criteria and thresholds, as ThresholdSpecification.summary_string()
+        has them, a line at a time after a newline.
+        """
+        if self.thresholds is None:
+            stream.write("\n" + prefix + "No thresholds")
+            return
+        for line in self.thresholds.summary_string().splitlines():
+            stream.write("\n" + prefix + line)
 
     def classification_dict(self):
         return {'Sub-asset class': self.name}
@@ -382,8 +837,10 @@ class Classification(object):
     problems are noted in the errors dictionary.
     """
 
-    def __init__(self, subject=None, root=None, sub_asset_class=None, options=None):
+    def __init__(self, subject=None, root=None, sub_asset_class=None, options=None,
+                 accessor=ATTRIBUTE_ACCESSOR):
         self._subject = subject
+        self._accessor = accessor
         self._root = root
         self._asset_class = None
         self._sub_asset_class = sub_asset_class
@@ -398,6 +855,12 @@ class Classification(object):
     def root(self):
         return self._root
 
+    def subject_value(self, name):
+        """
+        I return the value named name from my subject, or None if it has no such value.
+        """
+        return self._accessor.value(self._subject, name)
+
     @property
     def asset_class(self):
         """
@@ -433,10 +896,25 @@ class Classification(object):
 
     @property
     def errors(self):
+        """
+        My errors are ClassificationErrors.  See error_messages() for their text.
+        """
         if self._errors is None:
             self._errors = []
         return self._errors
 
+    def has_errors(self):
+        return bool(self._errors)
+
+    def add_error(self, code, node, *values):
+        self.errors.append(ClassificationError(code, node, values))
+
+    def error_codes(self):
+        return [error.code for error in self.errors]
+
+    def error_messages(self):
+        return [str(error) for error in self.errors]
+
     def full_name(self):
         full_name_string = self.sub_asset_class.path_name()
         full_name_string += "\n Segmentation criteria options:"
@@ -459,14 +937,51 @@ class Classification(object):
         for option in self.options:
             target_dict.update(option.classification_dict())
         if self.errors:
-            target_dict['errors'] = str(self.errors)
+            target_dict['errors'] = str(self.error_messages())
         return target_dict
         
     def as_json(self,  indent=None):
+        """
+        Without indentation or errors my JSON is a join of the JSON fragments of the
+        parts of my classification, each made just once, which is the same text as
+        dumping my classification dictionary but much quicker.
+        """
+        if indent is None and not self.errors:
+            fragments = []
+            if self.root:
+                fragments.append(self.root.version_json_fragment())
+            if self.asset_class:
+                fragments.append(self.asset_class.json_fragment())
+            if self.sub_asset_class:
+                fragments.append(self.sub_asset_class.json_fragment())
+            for option in self.options:
+                fragments.append(option.json_fragment())
+            return '{' + ', '.join(fragment for fragment in fragments if fragment) + '}'
         return json.dumps(self.classification_dict(),  indent=indent)
 
+    def sub_class_identity(self):
+        """
+        I return a hashable tuple of the taxonomy objects which make up my classification.
+        Options are shared, so two classifications of the same sub-class have equal
+        identities, and comparing these is much cheaper than comparing JSON keys.
+        """
+        return (self.asset_class, self.sub_asset_class) + tuple(self.options)
+
+    def sub_class_key(self):
+        """
+        I return the canonical key of my RTS 2 sub-class, which is the JSON form of my
+        classification dictionary, or None if my subject could not be classified.
+        """
+        if self.errors:
+            return None
+        return self.as_json()
+
 
 class Criterion(TaxonomyNode):
+    _criterion_number = None
+    _criterion_name = None
+    _description_name = None
+
     def __init__(self, description):
         self._description = description
         self._parent = None
@@ -499,19 +1014,82 @@ class Criterion(TaxonomyNode):
         raise NotImplementedError('selector() must be implemented in concrete subclass {my_class}'
                                   .format(my_class=type(self)))
 
-    def subject_value(self, subject):
-        return getattr(subject, self.selector, None)
+    def validate(self, subject, accessor):
+        """
+        I return the code of the error classifying subject would meet with me, or None.
+        """
+        if accessor.value(subject, self.selector) is None:
+            return NO_VALUE
+        return None
+
+    def subject_attributes(self):
+        """
+        Most criteria read just one value, named by my selector, from a subject.
+        """
+        return [(self.selector, str)]
 
     @property
     def criterion_number(self):
-        return self.parent.criterion_number_for(self)
+        if self._criterion_number is None:
+            return self.parent.criterion_number_for(self)
+        return self._criterion_number
 
     @property
     def criterion_name(self):
-        return 'Segmentation criterion {n}'.format(n=self.criterion_number)
+        if self._criterion_name is None:
+            return 'Segmentation criterion {n}'.format(n=self.criterion_number)
+        return self._criterion_name
+
+    @property
+    def description_name(self):
+        """
+        The key of my description in a classification dictionary.
+        """
+        if self._description_name is None:
+            return self.criterion_name + " description"
+        return self._description_name
 
-    def display(self, prefix):
-        return prefix + self.full_name()
+    def freeze(self):
+        """
+        Once the taxonomy is complete my number, and so my name, can't change, so I
+        work them out once here rather than every time an option is serialized.
+        """
+        self._criterion_number = self.parent.criterion_number_for(self)
+        self._criterion_name = 'Segmentation criterion {n}'.format(n=self._criterion_number)
+        self._description_name = self._criterion_name + " description"
+
+    def write_display(self, stream, prefix=""):
+        stream.write(prefix + self.full_name())
+
+    def bucket_groups(self):
+        """
+        I return a list of (group name, root DateBucketOption) pairs for the maturity
+        buckets below me.  Most criteria have none.
+        """
+        return []
+
+    def bucket_criteria(self):
+        """
+        I return the criteria I delegate to, one of which is chosen by a value of the
+        subject.  Most criteria delegate to none.
+        """
+        return []
+
+    def retained_memory(self):
+        """
+        I return a list of (component, items, bytes) for what I have made and kept while
+        classifying, such as value options and maturity buckets.  Most criteria keep
+        nothing.
+        """
+        return []
+
+    def option_for_key(self, classification_dict):
+        """
+        I return my option named in classification_dict, the dictionary of a sub-class
+        key, or None if there is none.
+        """
+        raise NotImplementedError('option_for_key() must be implemented in concrete subclass {my_class}'
+                                  .format(my_class=type(self)))
 
     def full_name(self):
         return '{criterion_name} - {criterion_description}'.format(
@@ -553,20 +1131,31 @@ class ArbitraryValueCriterion(Criterion):
         super(ArbitraryValueCriterion, self).__init__(description)
         self.concrete_options = dict()
 
+    def option_for_value(self, value):
+        """
+        I return the option for value, making it the first time value is seen.
+        """
+        this_value = str(value)
+        if this_value not in self.concrete_options:
+            new_option = ValueOption(criterion=self, value=this_value)
+            self.concrete_options[this_value] = new_option
+        return self.concrete_options[this_value]
+
+    def retained_memory(self):
+        return options_memory(self.concrete_options)
+
+    def option_for_key(self, classification_dict):
+        value = classification_dict.get(self.criterion_name)
+        if value is None:
+            return None
+        return self.option_for_value(value)
+
     def extend_classification(self, classification):
         try:
-            this_value = str(self.subject_value(classification.subject))
-            if this_value not in self.concrete_options:
-                new_option = ValueOption(criterion=self, value=this_value)
-                self.concrete_options[this_value] = new_option
-            this_option= self.concrete_options[this_value]
+            this_option = self.option_for_value(classification.subject_value(self.selector))
             classification.options.append(this_option)
         except AttributeError as ex:
-            classification.errors.append('{my_class} exception: {exception_string}'.format(
-                my_class=type(self),
-                exception_string=str(ex),
-                )
-            )
+            classification.add_error(VALUE_EXCEPTION, self, str(ex))
         return classification
 
     def init_sample(self,  sample):
@@ -594,24 +1183,36 @@ class DescreteValueCriterion(Criterion):
         raise NotImplementedError('allowed_values() must be implemented in concrete subclass {my_class}'
                                   .format(my_class=type(self)))
 
+    def retained_memory(self):
+        if self._concrete_options is None:
+            return []
+        return options_memory(self._concrete_options)
+
+    def option_for_key(self, classification_dict):
+        return self.concrete_options.get(classification_dict.get(self.criterion_name))
+
+    @property
+    def allowed_values_text(self):
+        return ", ".join(self.concrete_options)
+
+    def validate(self, subject, accessor):
+        value = accessor.value(subject, self.selector)
+        if value is None:
+            return NO_VALUE
+        if value not in self.concrete_options:
+            return BAD_VALUE
+        return None
+
     def extend_classification(self, classification):
         try:
-            try:
-                this_value = self.subject_value(classification.subject)
-            except (AttributeError):
-                classification.errors.append('{my_class} got no value.  Should be one of [{good_values}].'.format(
-                    my_class=type(self).__name__,
-                    good_values=", ".join(self.concrete_options),
-                ))
+            this_value = classification.subject_value(self.selector)
+            if this_value is None:
+                classification.add_error(NO_VALUE, self)
                 return classification
             this_option = self.concrete_options[this_value]
             classification.options.append(this_option)
         except (KeyError) as ex:
-            classification.errors.append('{my_class} got bad value: {value}.  Should be one of [{good_values}].'.format(
-                my_class=type(self).__name__,
-                value=self.subject_value(classification.subject),
-                good_values=", ".join(self.concrete_options),
-            ))
+            classification.add_error(BAD_VALUE, self, classification.subject_value(self.selector))
         return classification
         
     def init_sample(self,  sample):
@@ -635,11 +1236,10 @@ class ValueOption(CriterionOption):
             value=self.value)
 
     def classification_dict(self):
-        criterion_name = self.parent.criterion_name
-        description_name = criterion_name + " description"
+        criterion = self.parent
         target_dict = collections.OrderedDict()
-        target_dict[description_name] = self.parent.description
-        target_dict[criterion_name] = self.value
+        target_dict[criterion.description_name] = criterion.description
+        target_dict[criterion.criterion_name] = self.value
         return target_dict
 
 
@@ -971,22 +1571,33 @@ class BucketedTermOfUnderlyingCriterion(Criterion):
     def extend_classification(self, classification):
         try:
             option = self.root_option.option_for_dates(
-                classification.subject.term_from_date,
-                classification.subject.term_to_date)
+                classification.subject_value('term_from_date'),
+                classification.subject_value('term_to_date'))
             if option:
                 classification.options.append(option)
             else:
                 raise KeyError
         except KeyError as _:
-            classification.errors.append(
-                'Bad term bucket. '
-                'Dates: from_date={from_date}, to_date={to_date}.'.format(
-                    from_date=classification.subject.term_from_date,
-                    to_date=classification.subject.term_to_date,
-                )
-            )
+            classification.add_error(
+                BAD_TERM_BUCKET, self,
+                classification.subject_value('term_from_date'),
+                classification.subject_value('term_to_date'))
         return classification
 
+    def retained_memory(self):
+        return bucket_memory(self._root_option, len(self.bucket_ceilings))
+
+    def option_for_key(self, classification_dict):
+        return self.root_option.option_for_name(classification_dict.get(self.criterion_name))
+
+    def validate(self, subject, accessor):
+        if dates_are_sane(accessor.value(subject, 'term_from_date'), accessor.value(subject, 'term_to_date')):
+            return None
+        return BAD_TERM_BUCKET
+
+    def subject_attributes(self):
+        return [('term_from_date', datetime.date), ('term_to_date', datetime.date)]
+
     def init_sample(self,  sample):
         sample.term_from_date = datetime.date.today()
         delta_days = random.choice([30,  90,  180,  365,  1000])
@@ -1013,22 +1624,33 @@ class SwapMaturityBucketCriterion(Criterion):
     def extend_classification(self, classification):
         try:
             option = self.root_option.option_for_dates(
-                classification.subject.swap_from_date,
-                classification.subject.swap_to_date)
+                classification.subject_value('swap_from_date'),
+                classification.subject_value('swap_to_date'))
             if option:
                 classification.options.append(option)
             else:
                 raise KeyError
         except KeyError as _:
-            classification.errors.append(
-                'Bad swap maturity bucket. '
-                'Dates: from_date={from_date}, to_date={to_date}.'.format(
-                    from_date=classification.subject.swap_from_date,
-                    to_date=classification.subject.swap_to_date,
-                )
-            )
+            classification.add_error(
+                BAD_SWAP_MATURITY_BUCKET, self,
+                classification.subject_value('swap_from_date'),
+                classification.subject_value('swap_to_date'))
         return classification
 
+    def retained_memory(self):
+        return bucket_memory(self._root_option, len(self.bucket_ceilings))
+
+    def option_for_key(self, classification_dict):
+        return self.root_option.option_for_name(classification_dict.get(self.criterion_name))
+
+    def validate(self, subject, accessor):
+        if dates_are_sane(accessor.value(subject, 'swap_from_date'), accessor.value(subject, 'swap_to_date')):
+            return None
+        return BAD_SWAP_MATURITY_BUCKET
+
+    def subject_attributes(self):
+        return [('swap_from_date', datetime.date), ('swap_to_date', datetime.date)]
+
     def init_sample(self,  sample):
         sample.swap_from_date = datetime.date.today()
         delta_days = random.choice([30,  90,  180,  365,  1000])
@@ -1055,22 +1677,33 @@ class OptionMaturityBucketCriterion(Criterion):
     def extend_classification(self, classification):
         try:
             option = self.root_option.option_for_dates(
-                classification.subject.option_from_date,
-                classification.subject.option_to_date)
+                classification.subject_value('option_from_date'),
+                classification.subject_value('option_to_date'))
             if option:
                 classification.options.append(option)
             else:
                 raise KeyError
         except KeyError:
-            classification.errors.append(
-                'Bad option maturity bucket. '
-                'Dates: from_date={from_date}, to_date={to_date}.'.format(
-                    from_date=classification.subject.from_date,
-                    to_date=classification.subject.to_date,
-                )
-            )
+            classification.add_error(
+                BAD_OPTION_MATURITY_BUCKET, self,
+                classification.subject_value('from_date'),
+                classification.subject_value('to_date'))
         return classification
 
+    def retained_memory(self):
+        return bucket_memory(self._root_option, len(self.bucket_ceilings))
+
+    def option_for_key(self, classification_dict):
+        return self.root_option.option_for_name(classification_dict.get(self.criterion_name))
+
+    def validate(self, subject, accessor):
+        if dates_are_sane(accessor.value(subject, 'option_from_date'), accessor.value(subject, 'option_to_date')):
+            return None
+        return BAD_OPTION_MATURITY_BUCKET
+
+    def subject_attributes(self):
+        return [('option_from_date', datetime.date), ('option_to_date', datetime.date)]
+
     def init_sample(self,  sample):
         sample.option_from_date = datetime.date.today()
         delta_days = random.choice([30,  90,  180,  365,  1000])
@@ -1098,23 +1731,61 @@ class MetalsMaturityBucketCriterion(Criterion):
         """
         metal_type = 'Unknown'
         try:
-            metal_type = classification.subject.metal_type
+            metal_type = classification.subject_value('metal_type')
             bucket_criterion = self._options[metal_type]
             bucket_criterion.extend_classification(classification)
         except KeyError:
-            classification.errors.append(
-                'Bad metals maturity bucket.  Metal type: {metal_type}. '
-                'Dates: from_date={from_date}, to_date={to_date}.'.format(
-                    metal_type=metal_type,
-                    from_date=classification.subject.from_date,
-                    to_date=classification.subject.to_date,
-                )
-            )
+            classification.add_error(
+                BAD_METALS_MATURITY_BUCKET, self,
+                metal_type,
+                classification.subject_value('from_date'),
+                classification.subject_value('to_date'))
         return classification
 
+    def validate(self, subject, accessor):
+        bucket_criterion = self._options.get(accessor.value(subject, 'metal_type'))
+        if bucket_criterion is None:
+            return BAD_METALS_MATURITY_BUCKET
+        return bucket_criterion.validate(subject, accessor)
+
+    def bucket_criterion_for(self, metal_type):
+        """
+        I return the maturity bucket criterion for metal_type, or None if there is none.
+        """
+        return self._options.get(metal_type)
+
+    def subject_attributes(self):
+        """
+        I read the metal type, then whatever my selected bucket criterion reads.
+        """
+        attributes = collections.OrderedDict([('metal_type', str)])
+        for bucket_criterion in self._options.values():
+            attributes.update(bucket_criterion.subject_attributes())
+        return list(attributes.items())
+
     def init_sample(self,  sample):
         random.choice(list(self._options.values())).init_sample(sample)
 
+    def bucket_criteria(self):
+        return list(self._options.values())
+
+    def retained_memory(self):
+        return [(bucket_name + ' ' + component, items, size)
+                for bucket_name, bucket_criterion in self._options.items()
+                for component, items, size in bucket_criterion.retained_memory()]
+
+    def option_for_key(self, classification_dict):
+        description = classification_dict.get(self.description_name)
+        for bucket_criterion in self._options.values():
+            if bucket_criterion.description == description:
+                return bucket_criterion.option_for_key(classification_dict)
+        return None
+
+    def freeze(self):
+        super(MetalsMaturityBucketCriterion, self).freeze()
+        for bucket_criterion in self._options.values():
+            bucket_criterion.freeze()
+
     def criterion_number_for(self, criterion):
         """
         I delegate this to my parent since I represent the Segmentation number here, not criterion.
@@ -1122,13 +1793,16 @@ class MetalsMaturityBucketCriterion(Criterion):
         if criterion.parent == self:
             return self.parent.criterion_number_for(self)
 
-    def display(self, prefix):
-        target = super(MetalsMaturityBucketCriterion, self).display(prefix=prefix)
+    def write_display(self, stream, prefix=""):
+        super(MetalsMaturityBucketCriterion, self).write_display(stream, prefix=prefix)
         segment_prefix = prefix + '- '
         for (bucket_name, bucket_criterion) in self._options.items():
-            target += '\n' + segment_prefix + 'Maturity buckets for "' + bucket_name + '"\n'
-            target += bucket_criterion.root_option.display(prefix=segment_prefix + '- ')
-        return target
+            stream.write('\n' + segment_prefix + 'Maturity buckets for "' + bucket_name + '"\n')
+            bucket_criterion.root_option.write_display(stream, prefix=segment_prefix + '- ')
+
+    def bucket_groups(self):
+        return [(bucket_name, bucket_criterion.root_option)
+                for (bucket_name, bucket_criterion) in self._options.items()]
 
 
 class EnergyMaturityBucketCriterion(Criterion):
@@ -1165,32 +1839,70 @@ class EnergyMaturityBucketCriterion(Criterion):
         Energy type must be one of the Subproduct vales of NRGY in RTS 23
         """
         try:
-            try:
-                # TODO: Use the energy type criteria to try to get the value ... and return None
-                energy_type = classification.subject.energy_type
-            except (AttributeError):
-                classification.errors.append(
-                    'Bad energy maturity bucket.  Subject has no energy type.')
+            energy_type = classification.subject_value('energy_type')
+            if energy_type is None:
+                classification.add_error(NO_ENERGY_TYPE, self)
                 return classification
             bucket_key = self.bucket_map[energy_type]
             bucket_criterion = self._options[bucket_key]
             bucket_criterion.extend_classification(classification)
         except KeyError:
-            classification.errors.append(
-                'Bad energy maturity bucket.  Energy type: {energy_type}. '
-                'Dates: from_date={from_date}, to_date={to_date}.'.format(
-                    energy_type=classification.subject.energy_type,
-                    from_date=classification.subject.from_date,
-                    to_date=classification.subject.to_date,
-                )
-            )
+            classification.add_error(
+                BAD_ENERGY_MATURITY_BUCKET, self,
+                classification.subject_value('energy_type'),
+                classification.subject_value('from_date'),
+                classification.subject_value('to_date'))
         return classification
 
+    def validate(self, subject, accessor):
+        energy_type = accessor.value(subject, 'energy_type')
+        if energy_type is None:
+            return NO_ENERGY_TYPE
+        bucket_criterion = self.bucket_criterion_for(energy_type)
+        if bucket_criterion is None:
+            return BAD_ENERGY_MATURITY_BUCKET
+        return bucket_criterion.validate(subject, accessor)
+
+    def bucket_criterion_for(self, energy_type):
+        """
+        I return the maturity bucket criterion for energy_type, or None if there is none.
+        """
+        return self._options.get(self.bucket_map.get(energy_type))
+
+    def subject_attributes(self):
+        """
+        I read the energy type, then whatever my selected bucket criterion reads.
+        """
+        attributes = collections.OrderedDict([('energy_type', str)])
+        for bucket_criterion in self._options.values():
+            attributes.update(bucket_criterion.subject_attributes())
+        return list(attributes.items())
+
     def init_sample(self,  sample):
         sample.from_date = datetime.date.today()
         delta_days = random.choice([30,  90,  180,  365,  1000])
         sample.to_date = sample.from_date + datetime.timedelta(delta_days)
 
+    def bucket_criteria(self):
+        return list(self._options.values())
+
+    def retained_memory(self):
+        return [(bucket_name + ' ' + component, items, size)
+                for bucket_name, bucket_criterion in self._options.items()
+                for component, items, size in bucket_criterion.retained_memory()]
+
+    def option_for_key(self, classification_dict):
+        description = classification_dict.get(self.description_name)
+        for bucket_criterion in self._options.values():
+            if bucket_criterion.description == description:
+                return bucket_criterion.option_for_key(classification_dict)
+        return None
+
+    def freeze(self):
+        super(EnergyMaturityBucketCriterion, self).freeze()
+        for bucket_criterion in self._options.values():
+            bucket_criterion.freeze()
+
     def criterion_number_for(self, criterion):
         """
         I delegate this to my parent since I represent the Segmentation number here, not criterion.
@@ -1198,13 +1910,16 @@ class EnergyMaturityBucketCriterion(Criterion):
         if criterion.parent == self:
             return self.parent.criterion_number_for(self)
 
-    def display(self, prefix):
-        target = super(EnergyMaturityBucketCriterion, self).display(prefix=prefix)
+    def write_display(self, stream, prefix=""):
+        super(EnergyMaturityBucketCriterion, self).write_display(stream, prefix=prefix)
         segment_prefix = prefix + '- '
         for (bucket_name, bucket_criterion) in self._options.items():
-            target += '\n' + segment_prefix + 'Maturity buckets for "' + bucket_name + '"\n'
-            target += bucket_criterion.root_option.display(prefix=segment_prefix + '- ')
-        return target
+            stream.write('\n' + segment_prefix + 'Maturity buckets for "' + bucket_name + '"\n')
+            bucket_criterion.root_option.write_display(stream, prefix=segment_prefix + '- ')
+
+    def bucket_groups(self):
+        return [(bucket_name, bucket_criterion.root_option)
+                for (bucket_name, bucket_criterion) in self._options.items()]
 
 
 class EquityParameterMaturityBucketCriterion(Criterion):
@@ -1216,21 +1931,62 @@ class EquityParameterMaturityBucketCriterion(Criterion):
             criterion.parent = self
 
     def extend_classification(self, classification):
-        bucket_criterion = self._options.get(classification.subject.equity_parameter, None)
+        bucket_criterion = self.bucket_criterion_for(classification.subject_value('equity_parameter'))
         if bucket_criterion:
             bucket_criterion.extend_classification(classification)
         else:
-            classification.errors.append("{my_class} error - no bucketing for parameter: {parameter}.  "
-                                         "Must be one of: [{good_values}].".format(
-                my_class=type(self).__name__,
-                parameter=classification.subject.equity_parameter,
-                good_values=", ".join(self._options.keys()),
-            ))
+            classification.add_error(
+                NO_EQUITY_PARAMETER_BUCKETING, self, classification.subject_value('equity_parameter'))
         return classification
 
+    def validate(self, subject, accessor):
+        bucket_criterion = self.bucket_criterion_for(accessor.value(subject, 'equity_parameter'))
+        if bucket_criterion is None:
+            return NO_EQUITY_PARAMETER_BUCKETING
+        return bucket_criterion.validate(subject, accessor)
+
+    @property
+    def allowed_values_text(self):
+        return ", ".join(self._options.keys())
+
+    def bucket_criterion_for(self, equity_parameter):
+        """
+        I return the maturity bucket criterion for equity_parameter, or None if there is none.
+        """
+        return self._options.get(equity_parameter)
+
+    def subject_attributes(self):
+        """
+        I read the equity parameter, then whatever my selected bucket criterion reads.
+        """
+        attributes = collections.OrderedDict([('equity_parameter', str)])
+        for bucket_criterion in self._options.values():
+            attributes.update(bucket_criterion.subject_attributes())
+        return list(attributes.items())
+
     def init_sample(self,  sample):
         random.choice(list(self._options.values())).init_sample(sample)
 
+    def bucket_criteria(self):
+        return list(self._options.values())
+
+    def retained_memory(self):
+        return [(bucket_name + ' ' + component, items, size)
+                for bucket_name, bucket_criterion in self._options.items()
+                for component, items, size in bucket_criterion.retained_memory()]
+
+    def option_for_key(self, classification_dict):
+        description = classification_dict.get(self.description_name)
+        for bucket_criterion in self._options.values():
+            if bucket_criterion.description == description:
+                return bucket_criterion.option_for_key(classification_dict)
+        return None
+
+    def freeze(self):
+        super(EquityParameterMaturityBucketCriterion, self).freeze()
+        for bucket_criterion in self._options.values():
+            bucket_criterion.freeze()
+
     def criterion_number_for(self, criterion=None):
         """
         I delegate this to my parent since I represent the Segmentation number here, not criterion.
@@ -1238,13 +1994,16 @@ class EquityParameterMaturityBucketCriterion(Criterion):
         if criterion.parent == self:
             return self.parent.criterion_number_for(self)
 
-    def display(self, prefix):
-        target = super(EquityParameterMaturityBucketCriterion, self).display(prefix=prefix)
+    def write_display(self, stream, prefix=""):
+        super(EquityParameterMaturityBucketCriterion, self).write_display(stream, prefix=prefix)
         segment_prefix = prefix + '- '
         for (bucket_name, bucket_criterion) in self._options.items():
-            target += '\n' + segment_prefix + 'Maturity buckets for "' + bucket_name + '"\n'
-            target += bucket_criterion.root_option.display(prefix=segment_prefix + '- ')
-        return target
+            stream.write('\n' + segment_prefix + 'Maturity buckets for "' + bucket_name + '"\n')
+            bucket_criterion.root_option.write_display(stream, prefix=segment_prefix + '- ')
+
+    def bucket_groups(self):
+        return [(bucket_name, bucket_criterion.root_option)
+                for (bucket_name, bucket_criterion) in self._options.items()]
 
 
 class MaturityBucketCriterion(Criterion):
@@ -1264,29 +2023,74 @@ class MaturityBucketCriterion(Criterion):
             self._root_option = new_root
         return self._root_option
 
-    def display(self, prefix):
-        target = super(MaturityBucketCriterion, self).display(prefix=prefix)
-        target += self.description + "\n"
-        target += self.root_option.display(prefix=prefix+'- ')
-        return target
+    def write_display(self, stream, prefix=""):
+        super(MaturityBucketCriterion, self).write_display(stream, prefix=prefix)
+        stream.write(self.description + "\n")
+        self.root_option.write_display(stream, prefix=prefix+'- ')
+
+    def bucket_groups(self):
+        return [(None, self.root_option)]
 
     def extend_classification(self, classification):
-        option = self.root_option.option_for(classification.subject)
+        option = self.root_option.option_for_dates(
+            from_date=classification.subject_value('from_date'),
+            to_date=classification.subject_value('to_date'),
+        )
         if option:
             classification.options.append(option)
         else:
-            classification.errors.append('Bad maturity bucket dates: from_date={from_date}, to_date={to_date}.'.format(
-                from_date=classification.subject.from_date,
-                to_date=classification.subject.to_date,
-            ))
+            classification.add_error(
+                BAD_MATURITY_BUCKET, self,
+                classification.subject_value('from_date'),
+                classification.subject_value('to_date'))
         return classification
 
+    def retained_memory(self):
+        return bucket_memory(self._root_option, len(self.bucket_ceilings))
+
+    def option_for_key(self, classification_dict):
+        return self.root_option.option_for_name(classification_dict.get(self.criterion_name))
+
+    def validate(self, subject, accessor):
+        if dates_are_sane(accessor.value(subject, 'from_date'), accessor.value(subject, 'to_date')):
+            return None
+        return BAD_MATURITY_BUCKET
+
+    def subject_attributes(self):
+        return [('from_date', datetime.date), ('to_date', datetime.date)]
+
     def init_sample(self,  sample):
         sample.from_date = datetime.date.today()
         delta_days = random.choice([30,  90,  180,  365,  1000])
         sample.to_date = sample.from_date + datetime.timedelta(delta_days)
 
 
+def bucket_names_for_ceilings(bucket_ceilings):
+    """
+    I return the names of the maturity buckets made from bucket_ceilings, as the
+    DateBucketOptions made from them would name themselves, followed, if the last
+    ceiling is bounded and a step beyond it can be worked out, by the rule for the
+    buckets extrapolated beyond them.  Unlike walking the buckets, this doesn't depend
+    on what has been classified so far.
+    """
+    names = []
+    previous_ceiling = None
+    for ceiling in bucket_ceilings:
+        names.append('Maturity bucket {bucket_number}: {floor}{ceiling}'.format(
+            bucket_number=len(names) + 1,
+            floor=previous_ceiling.ceiling_string() + " to " if previous_ceiling else "Zero to ",
+            ceiling=ceiling.ceiling_string()))
+        previous_ceiling = ceiling
+    if len(bucket_ceilings) > 1 \
+            and not isinstance(bucket_ceilings[-1], UnboundedBucketCeiling) \
+            and type(bucket_ceilings[-2]) == type(bucket_ceilings[-1]):
+        step = type(bucket_ceilings[-1])(bucket_ceilings[-1].periods - bucket_ceilings[-2].periods)
+        names.append('Maturity bucket {bucket_number} onwards: each {step} more than the last'.format(
+            bucket_number=len(bucket_ceilings) + 1,
+            step=step.ceiling_string()))
+    return names
+
+
 class MaturityBucketCeiling(object):
 
     def __init__(self, periods, description=None):
@@ -1464,6 +2268,12 @@ class UnboundedBucketCeiling(MaturityBucketCeiling):
         return None
 
 
+# A sub-class key may name a maturity bucket which hasn't been extrapolated yet, but keys
+# can come from files, so I only extrapolate buckets for one whose ceiling is within this
+# many years.  Buckets already extrapolated by classification are found anyway.
+MAX_KEYED_MATURITY_YEARS = 100
+
+
 class DateBucketOption(object):
     def __init__(self, parent, bucket_ceilings, previous_bucket_option=None):
         """
@@ -1485,6 +2295,7 @@ class DateBucketOption(object):
         else:
             self._next_bucket_option = None
         self._end_date = None
+        self._json_fragment = None
 
     @property
     def parent(self):
@@ -1542,22 +2353,47 @@ class DateBucketOption(object):
         )
 
     def display(self, prefix=""):
-        target = prefix + self.name()
-        if self.next_bucket_option:
-            target += "\n" + self.next_bucket_option.display(prefix=prefix)
-        return target
+        stream = io.StringIO()
+        self.write_display(stream, prefix)
+        return stream.getvalue()
+
+    def write_display(self, stream, prefix=""):
+        """
+        I write the names of myself and the buckets after me, one per line.
+        """
+        for bucket_option in self.bucket_options():
+            if bucket_option is not self:
+                stream.write("\n")
+            stream.write(prefix + bucket_option.name())
+
+    def bucket_options(self):
+        """
+        I answer myself and the buckets which follow me in the list, walking the list
+        rather than recursing down it.
+        """
+        bucket_option = self
+        while bucket_option is not None:
+            yield bucket_option
+            bucket_option = bucket_option.next_bucket_option
 
     def classification_dict(self):
         """
         I return the a dictionary containing my attributes of the sub class.
         """
-        criterion_name = self.parent.criterion_name
-        description_name = criterion_name + " description"
+        criterion = self.parent
         target_dict = collections.OrderedDict()
-        target_dict[description_name] = self.parent.description
-        target_dict[criterion_name] = self.name()
+        target_dict[criterion.description_name] = criterion.description
+        target_dict[criterion.criterion_name] = self.name()
         return target_dict
 
+    def json_fragment(self):
+        """
+        As TaxonomyNode.json_fragment(), which I am not.
+        """
+        if self._json_fragment is None:
+            self._json_fragment = json.dumps(self.classification_dict())[1:-1]
+        return self._json_fragment
+
     def option_for_dates(self, from_date, to_date):
         # print(str(self.full_name()))
         # print(">>From" + str(from_date) + ", to: " + str(to_date))
@@ -1584,6 +2420,29 @@ class DateBucketOption(object):
             to_date=subject.to_date,
         )
 
+    def option_for_name(self, name):
+        """
+        I return the bucket, me or one after me, with name, extrapolating buckets as
+        needed, or None if there is none.  I don't extrapolate buckets with ceilings beyond
+        MAX_KEYED_MATURITY_YEARS, so a name far beyond that, which classification hasn't
+        reached, gets None rather than growing the list.
+        """
+        match = re.match(r'Maturity bucket (\d+):', name or '')
+        if match is None:
+            return None
+        today = datetime.date.today()
+        horizon = YearBucketCeiling(MAX_KEYED_MATURITY_YEARS).end_date_from(base_date=today)
+        bucket_option = self
+        for _ in range(int(match.group(1)) - 1):
+            if bucket_option.next_bucket_option is None:
+                end_date = bucket_option.ceiling.end_date_from(base_date=today)
+                if end_date is None or end_date >= horizon:
+                    return None
+            bucket_option = bucket_option.get_next_bucket_option()
+        if bucket_option.name() == name:
+            return bucket_option
+        return None
+
     def get_next_bucket_option(self):
         """
         This is the more assertive way of asking for the next bucket.  If I currently
@@ -1617,6 +2476,38 @@ class ThresholdSpecification(object):
         self.liquidity_criteria = liquidity_criteria
         self.liquid_thresholds = liquid_thresholds or []
         self.non_liquid_thresholds = non_liquid_thresholds
+        self._adna_floors = None
+        self._banded_tables = None
+
+    def banding(self):
+        """
+        I return the integer ADNA floors of my liquid tables in ascending order, and
+        the tables in the same order.  These are worked out once, when first needed.
+        """
+        if self._adna_floors is None:
+            banded = sorted(
+                (table for table in self.liquid_thresholds if table.adna_floor is not None),
+                key=lambda table: table.adna_floor.amount)
+            self._banded_tables = banded
+            self._adna_floors = [table.adna_floor.amount for table in banded]
+        return self._adna_floors, self._banded_tables
+
+    def table_for(self, adna=None, is_liquid=True):
+        """
+        I pick the table by bisecting the ADNA floors, so the band whose floor is the
+        highest not above adna is chosen.  adna may be a number or a SumOfMoney.
+        """
+        if not is_liquid:
+            return self.non_liquid_thresholds
+        adna_floors, banded_tables = self.banding()
+        if not adna_floors:
+            return self.liquid_thresholds[0] if self.liquid_thresholds else None
+        if adna is None:
+            raise ValueError("The liquid thresholds are banded by ADNA, so an ADNA is needed.")
+        index = bisect.bisect_right(adna_floors, getattr(adna, 'amount', adna)) - 1
+        if index < 0:
+            return None
+        return banded_tables[index]
 
     def summary_string(self):
         target_string = "ThresholdSpecification:"
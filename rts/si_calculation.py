@@ -0,0 +1,620 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+"""
+The Systematic Internaliser (SI) calculation for derivatives.  See Article 15 (page 39)
+of Brussels, 25.4.2016 C(2016) 2398 final for the three tests, a, b and c:
+https://ec.europa.eu/transparency/regdoc/rep/3/2016/EN/3-2016-2398-EN-F1-1.PDF
+
+The tests are applied to each RTS 2 sub-class and focus on the count and notional sum
+of the trades which are OTC (not done on a recognised EEA venue), on the firm's own
+account and in response to a client order.  Here these are called SI-trades.
+
+a. If the sub-class is liquid
+   - and the count of SI-trades >= 2.5% of the EU trade count
+   - and the average weekly number of SI-trades >= 1
+b. If the sub-class is not liquid
+   - and the average weekly number of SI-trades >= 1
+c. If the sum of EUR notional of SI-trades is
+   - >= 25% of the notional of all trades of the LEI in the sub-class
+   - or >= 1% of the EU trade notional
+
+Each trade is classified once and folded into a small aggregate for its sub-class, so
+the trades themselves are never kept.  Trades may be objects, mappings or sequences
+(see TaxonomyRoot.classify_many()) and must carry, as well as the attributes needed
+for classification: trade_date, mic, own_account, client_order and eur_notional (and
+lei for a MultiLEISICalculation).
+"""
+
+import collections
+import json
+import random
+
+SI_LIQUID_TEST = "SI - (a) Liquid instrument test"
+SI_NON_LIQUID_TEST = "SI - (b) Non-liquid instrument test"
+SI_NOTIONAL_SIZE_TEST = "SI - (c) Notional size test"
+
+# The codes answered by si_status_codes(), indexes into SI_STATUSES
+NOT_SI = 0
+SI_LIQUID = 1
+SI_NON_LIQUID = 2
+SI_NOTIONAL_SIZE = 3
+SI_STATUSES = [None, SI_LIQUID_TEST, SI_NON_LIQUID_TEST, SI_NOTIONAL_SIZE_TEST]
+
+
+def week_number(a_date):
+    """
+    I return the number of the week (Monday to Sunday, as ISO weeks) containing a_date,
+    counting from the first week of year 1, so that week numbers can be subtracted
+    across year ends.
+    """
+    return (a_date.toordinal() - 1) // 7
+
+
+def si_status_codes(is_liquid, trade_count, eu_trade_count, avg_weekly_trades,
+                    notional_sum, lei_notional_sum, eu_notional_sum):
+    """
+    I am the SI tests of SICalculation.si_status() over aligned arrays, one element
+    per sub-class, answering an array of status codes (see SI_STATUSES).  The tests
+    are applied in the same order, so a sub-class which passes more than one gets
+    the code of the first.  This needs numpy, which is only imported when I am used.
+    """
+    import numpy
+    is_liquid = numpy.asarray(is_liquid, dtype=bool)
+    trade_count = numpy.asarray(trade_count)
+    avg_weekly_trades = numpy.asarray(avg_weekly_trades)
+    notional_sum = numpy.asarray(notional_sum)
+    frequent = avg_weekly_trades >= 1
+    liquid_test = is_liquid & (trade_count >= 0.025 * numpy.asarray(eu_trade_count)) & frequent
+    non_liquid_test = ~is_liquid & frequent
+    notional_size_test = (notional_sum >= 0.25 * numpy.asarray(lei_notional_sum)) \
+        | (notional_sum >= 0.01 * numpy.asarray(eu_notional_sum))
+    return numpy.select(
+        [liquid_test, non_liquid_test, notional_size_test],
+        [SI_LIQUID, SI_NON_LIQUID, SI_NOTIONAL_SIZE],
+        default=NOT_SI).astype(numpy.int8)
+
+
+class SubClassAggregate(object):
+    """
+    I hold the counts and sums for one sub-class.  The trade_count and notional_sum are
+    for the SI-trades only; the lei_ figures are for all the trades of the LEI.
+    """
+
+    __slots__ = ('trade_count', 'notional_sum', 'lei_trade_count', 'lei_notional_sum')
+
+    def __init__(self):
+        self.trade_count = 0
+        self.notional_sum = 0
+        self.lei_trade_count = 0
+        self.lei_notional_sum = 0
+
+    def add_trade(self, eur_notional, is_si_trade):
+        notional = abs(eur_notional)
+        self.lei_trade_count += 1
+        self.lei_notional_sum += notional
+        if is_si_trade:
+            self.trade_count += 1
+            self.notional_sum += notional
+
+    def add(self, other):
+        self.trade_count += other.trade_count
+        self.notional_sum += other.notional_sum
+        self.lei_trade_count += other.lei_trade_count
+        self.lei_notional_sum += other.lei_notional_sum
+
+    def subtract(self, other):
+        self.trade_count -= other.trade_count
+        self.notional_sum -= other.notional_sum
+        self.lei_trade_count -= other.lei_trade_count
+        self.lei_notional_sum -= other.lei_notional_sum
+
+    def is_empty(self):
+        return not self.lei_trade_count
+
+
+class EUSubClassData(object):
+    """
+    The figures for one sub-class which are published by the regulator: whether the
+    sub-class is liquid, and the count and EUR notional sum of all EU trades.
+    """
+
+    __slots__ = ('is_liquid', 'eu_trade_count', 'eu_notional_sum')
+
+    def __init__(self, is_liquid, eu_trade_count, eu_notional_sum):
+        self.is_liquid = is_liquid
+        self.eu_trade_count = eu_trade_count
+        self.eu_notional_sum = eu_notional_sum
+
+
+class EUDataTable(object):
+    """
+    I hold EU data in memory, keyed by sub-class key.
+    """
+
+    def __init__(self, eu_data_by_key=None):
+        self._eu_data_by_key = dict(eu_data_by_key or {})
+
+    def add(self, sub_class_key, eu_sub_class_data):
+        self._eu_data_by_key[sub_class_key] = eu_sub_class_data
+
+    def eu_data_for(self, sub_class_key, aggregate=None):
+        return self._eu_data_by_key.get(sub_class_key)
+
+
+class SyntheticEUData(object):
+    """
+    I make up EU data from our own aggregates, for examples and tests, in the way the
+    SI calculation notebook does.  Real EU data comes from the regulator.
+    """
+
+    def __init__(self, seed=None):
+        self._random = random.Random(seed)
+
+    def eu_data_for(self, sub_class_key, aggregate=None):
+        trade_count = aggregate.trade_count
+        notional_sum = aggregate.notional_sum
+        eu_trade_count = trade_count * 40 + self._random.choice([trade_count * -1, trade_count])
+        if notional_sum:
+            eu_notional_sum = notional_sum * 100 + self._random.choice([notional_sum * -1, notional_sum])
+        else:
+            eu_notional_sum = 1
+        return EUSubClassData(
+            is_liquid=self._random.random() < 0.5,
+            eu_trade_count=eu_trade_count,
+            eu_notional_sum=eu_notional_sum)
+
+
+class SIPartial(object):
+    """
+    I am the aggregates of a part of an LEI's trades, for example one shard of trades
+    split by date, book or desk, keyed by sub-class key so that I can be pickled and
+    passed between processes.  Merging is associative and commutative, so partials
+    may be merged in any grouping and any order and give the same result.
+    """
+
+    def __init__(self):
+        self.aggregates = dict()
+        self.first_week = None
+        self.last_week = None
+        self.trade_count = 0
+        self.unclassified_count = 0
+
+    def add_aggregate(self, sub_class_key, other_aggregate):
+        aggregate = self.aggregates.get(sub_class_key)
+        if aggregate is None:
+            aggregate = self.aggregates[sub_class_key] = SubClassAggregate()
+        aggregate.add(other_aggregate)
+
+    def add_weeks(self, first_week, last_week):
+        if first_week is None:
+            return
+        if self.first_week is None or first_week < self.first_week:
+            self.first_week = first_week
+        if self.last_week is None or last_week > self.last_week:
+            self.last_week = last_week
+
+    def merge(self, other):
+        """
+        I add other into myself, and return myself so that I can be used with reduce().
+        """
+        for sub_class_key, aggregate in other.aggregates.items():
+            self.add_aggregate(sub_class_key, aggregate)
+        self.add_weeks(other.first_week, other.last_week)
+        self.trade_count += other.trade_count
+        self.unclassified_count += other.unclassified_count
+        return self
+
+
+class SICalculation(object):
+    """
+    I run the SI calculation for the trades of one LEI.  Trades are added in one pass,
+    in any number of batches, and each is reduced to a sub-class ID and an update of
+    that sub-class's aggregate.  The week range needed for the weekly averages is
+    tracked as the trades go by.
+    """
+
+    def __init__(self, root, eea_mics, eu_data):
+        self.root = root
+        self.eea_mics = frozenset(eea_mics)
+        self._eu_data = eu_data
+        self.aggregates = dict()
+        self.first_week = None
+        self.last_week = None
+        self.trade_count = 0
+        self.unclassified_count = 0
+        self._eu_data_by_id = dict()
+        self._eu_data_period = None
+        self._sub_class_keys = dict()
+
+    @property
+    def eu_data(self):
+        return self._eu_data
+
+    @eu_data.setter
+    def eu_data(self, eu_data):
+        """
+        New EU data, for example for a new period, replaces any I have looked up.
+        """
+        self._eu_data = eu_data
+        self._eu_data_by_id = dict()
+        self._eu_data_period = None
+
+    def add_trades(self, trades, accessor=None, names=None):
+        for classification in self.root.classify_many(trades, accessor=accessor, names=names):
+            self.add_classified_trade(classification)
+        return self
+
+    def add_classified_trade(self, classification):
+        self.trade_count += 1
+        sub_class_id = self.root.sub_class_id_for(classification)
+        if sub_class_id is None:
+            self.unclassified_count += 1
+            return
+        week = week_number(classification.subject_value('trade_date'))
+        if self.first_week is None or week < self.first_week:
+            self.first_week = week
+        if self.last_week is None or week > self.last_week:
+            self.last_week = week
+        is_si_trade = classification.subject_value('mic') not in self.eea_mics \
+            and classification.subject_value('own_account') \
+            and classification.subject_value('client_order')
+        self.add_to_aggregates(sub_class_id, week, classification.subject_value('eur_notional'), is_si_trade)
+
+    def add_to_aggregates(self, sub_class_id, week, eur_notional, is_si_trade):
+        aggregate = self.aggregates.get(sub_class_id)
+        if aggregate is None:
+            aggregate = self.aggregates[sub_class_id] = SubClassAggregate()
+        aggregate.add_trade(eur_notional, is_si_trade)
+        self._eu_data_by_id.pop(sub_class_id, None)
+
+    def add_week_aggregate(self, sub_class_id, sub_class_key, week, week_aggregate):
+        """
+        I add the already aggregated trades of one sub-class in one week, for example as
+        read back from an SIAggregateStore.  The sub-class ID need not come from my
+        root, but then it must not be mixed with IDs which do.
+        """
+        self._sub_class_keys[sub_class_id] = sub_class_key
+        if self.first_week is None or week < self.first_week:
+            self.first_week = week
+        if self.last_week is None or week > self.last_week:
+            self.last_week = week
+        aggregate = self.aggregates.get(sub_class_id)
+        if aggregate is None:
+            aggregate = self.aggregates[sub_class_id] = SubClassAggregate()
+        aggregate.add(week_aggregate)
+        self._eu_data_by_id.pop(sub_class_id, None)
+        self.trade_count += week_aggregate.lei_trade_count
+
+    def partial(self):
+        partial = SIPartial()
+        for sub_class_id, aggregate in self.aggregates.items():
+            partial.add_aggregate(self.sub_class_key(sub_class_id), aggregate)
+        partial.add_weeks(self.first_week, self.last_week)
+        partial.trade_count = self.trade_count
+        partial.unclassified_count = self.unclassified_count
+        return partial
+
+    def add_partial(self, partial):
+        """
+        I add the aggregates of a partial, under the sub-class IDs my root has for their
+        keys, so they mix safely with those of trades I classify myself.
+        """
+        for sub_class_key, other_aggregate in partial.aggregates.items():
+            sub_class_id = self.root.sub_class_id_for_key(sub_class_key)
+            self._sub_class_keys[sub_class_id] = sub_class_key
+            aggregate = self.aggregates.get(sub_class_id)
+            if aggregate is None:
+                aggregate = self.aggregates[sub_class_id] = SubClassAggregate()
+            aggregate.add(other_aggregate)
+            self._eu_data_by_id.pop(sub_class_id, None)
+        if partial.first_week is not None:
+            if self.first_week is None or partial.first_week < self.first_week:
+                self.first_week = partial.first_week
+            if self.last_week is None or partial.last_week > self.last_week:
+                self.last_week = partial.last_week
+        self.trade_count += partial.trade_count
+        self.unclassified_count += partial.unclassified_count
+        return self
+
+    @property
+    def number_of_weeks(self):
+        if self.first_week is None:
+            return 0
+        return self.last_week - self.first_week + 1
+
+    def sub_class_key(self, sub_class_id):
+        sub_class_key = self._sub_class_keys.get(sub_class_id)
+        if sub_class_key is None:
+            sub_class_key = self.root.sub_class_for_id(sub_class_id).sub_class_key()
+            self._sub_class_keys[sub_class_id] = sub_class_key
+        return sub_class_key
+
+    def classification_dict(self, sub_class_id):
+        """
+        The sub-class key is the JSON form of the classification dictionary, so I can
+        recreate the dictionary from the key alone.
+        """
+        return json.loads(self.sub_class_key(sub_class_id), object_pairs_hook=collections.OrderedDict)
+
+    def eu_data_for(self, sub_class_id):
+        """
+        I look up the EU data for a sub-class just once per period, the weeks my trades
+        span, since synthetic EU data is random.  EU data may depend on the period and
+        is given the sub-class's aggregate, so I look it up again when the period changes,
+        as trades are added or a rolling window moves, and when the aggregate changes.
+        """
+        period = (self.first_week, self.last_week)
+        if period != self._eu_data_period:
+            self._eu_data_by_id = dict()
+            self._eu_data_period = period
+        eu_data = self._eu_data_by_id.get(sub_class_id)
+        if eu_data is None:
+            eu_data = self.eu_data.eu_data_for(self.sub_class_key(sub_class_id), self.aggregates[sub_class_id])
+            self._eu_data_by_id[sub_class_id] = eu_data
+        return eu_data
+
+    def avg_weekly_trades(self, sub_class_id):
+        return self.aggregates[sub_class_id].trade_count / self.number_of_weeks
+
+    def si_status(self, sub_class_id):
+        """
+        This is the SI calculation for one sub-class.  It's quite simple once everything
+        is aggregated.  Note that these are the rules for derivatives trades only.
+        Sub-classes with no EU data cannot be tested and have no status.
+        """
+        aggregate = self.aggregates[sub_class_id]
+        eu_data = self.eu_data_for(sub_class_id)
+        if eu_data is None:
+            return None
+        avg_weekly_trades = self.avg_weekly_trades(sub_class_id)
+        if eu_data.is_liquid \
+                and aggregate.trade_count >= (0.025 * eu_data.eu_trade_count) \
+                and avg_weekly_trades >= 1:
+            return SI_LIQUID_TEST
+        if not eu_data.is_liquid \
+                and avg_weekly_trades >= 1:
+            return SI_NON_LIQUID_TEST
+        if aggregate.notional_sum >= (0.25 * aggregate.lei_notional_sum) \
+                or aggregate.notional_sum >= (0.01 * eu_data.eu_notional_sum):
+            return SI_NOTIONAL_SIZE_TEST
+        return None
+
+    def si_statuses(self):
+        """
+        I return a dict of sub-class ID to SI status for the sub-classes we are an SI for.
+        """
+        statuses = dict()
+        for sub_class_id in self.aggregates:
+            status = self.si_status(sub_class_id)
+            if status:
+                statuses[sub_class_id] = status
+        return statuses
+
+    def si_status_code_array(self):
+        """
+        I answer an array of my sub-class IDs and an aligned array of their SI status
+        codes, found with si_status_codes().  Sub-classes with no EU data get NOT_SI.
+        EU data which can join a list of sub-class keys to arrays of its figures in one
+        go, as an EUReferenceStore can, is used that way rather than key by key.
+        """
+        import numpy
+        sub_class_ids = list(self.aggregates)
+        aggregates = [self.aggregates[sub_class_id] for sub_class_id in sub_class_ids]
+        if hasattr(self.eu_data, 'join'):
+            eu_arrays = self.eu_data.join([self.sub_class_key(sub_class_id) for sub_class_id in sub_class_ids])
+            has_eu_data = eu_arrays['found']
+        else:
+            eu_data = [self.eu_data_for(sub_class_id) for sub_class_id in sub_class_ids]
+            has_eu_data = numpy.array([each is not None for each in eu_data], dtype=bool)
+            eu_data = [each or EUSubClassData(False, 0, 0) for each in eu_data]
+            eu_arrays = dict(
+                is_liquid=numpy.array([each.is_liquid for each in eu_data], dtype=bool),
+                eu_trade_count=numpy.array([each.eu_trade_count for each in eu_data], dtype=numpy.float64),
+                eu_notional_sum=numpy.array([each.eu_notional_sum for each in eu_data], dtype=numpy.float64))
+        number_of_weeks = self.number_of_weeks or 1
+        trade_count = numpy.array([aggregate.trade_count for aggregate in aggregates], dtype=numpy.float64)
+        codes = si_status_codes(
+            is_liquid=eu_arrays['is_liquid'],
+            trade_count=trade_count,
+            eu_trade_count=eu_arrays['eu_trade_count'],
+            avg_weekly_trades=trade_count / number_of_weeks,
+            notional_sum=numpy.array([aggregate.notional_sum for aggregate in aggregates], dtype=numpy.float64),
+            lei_notional_sum=numpy.array(
+                [aggregate.lei_notional_sum for aggregate in aggregates], dtype=numpy.float64),
+            eu_notional_sum=eu_arrays['eu_notional_sum'])
+        codes[~has_eu_data] = NOT_SI
+        return numpy.array(sub_class_ids, dtype=numpy.int64), codes
+
+    def sub_class_report(self, sub_class_id, status):
+        aggregate = self.aggregates[sub_class_id]
+        eu_data = self.eu_data_for(sub_class_id)
+        return [
+            'Status: {status}.'.format(status=status),
+            dict(
+                trade_count=aggregate.trade_count,
+                notional_sum=aggregate.notional_sum,
+                avg_weekly_trades=self.avg_weekly_trades(sub_class_id),
+                eu_trade_count=eu_data.eu_trade_count,
+                eu_notional_sum=eu_data.eu_notional_sum,
+                lei_notional_sum=aggregate.lei_notional_sum,
+            ),
+            self.classification_dict(sub_class_id),
+        ]
+
+    def report_items(self):
+        statuses = self.si_statuses()
+        report_items = [
+            'This LEI is an SI for {si_count} of {all_count} '
+            'sub classes traded over {weeks} weeks.'.format(
+                si_count=len(statuses),
+                all_count=len(self.aggregates),
+                weeks=self.number_of_weeks)]
+        for sub_class_id, status in statuses.items():
+            report_items.append(self.sub_class_report(sub_class_id, status))
+        return report_items
+
+    def report(self):
+        return json.dumps(self.report_items(), indent=4)
+
+
+class RollingSICalculation(SICalculation):
+    """
+    I run the SI calculation over a rolling look-back window of weeks, day by day.
+
+    As well as the totals per sub-class I keep an aggregate per sub-class per week.
+    Adding a day of trades touches only the aggregates of those trades, and expiring
+    a week subtracts its aggregates from the totals, so the cost of each step depends
+    on the size of the change and not on the length of the history.  SI statuses are
+    recomputed only for the sub-classes which have changed since they were last asked
+    for, unless the window has moved, which may change every sub-class's weekly
+    average and EU data, or the EU data has been replaced.
+    """
+
+    def __init__(self, root, eea_mics, eu_data, window_weeks=26):
+        super(RollingSICalculation, self).__init__(root, eea_mics, eu_data)
+        self.window_weeks = window_weeks
+        self.weekly_aggregates = dict()
+        self._changed_sub_class_ids = set()
+        self._statuses = dict()
+        self._status_period = None
+
+    @SICalculation.eu_data.setter
+    def eu_data(self, eu_data):
+        SICalculation.eu_data.fset(self, eu_data)
+        self._status_period = None
+
+    def add_to_aggregates(self, sub_class_id, week, eur_notional, is_si_trade):
+        super(RollingSICalculation, self).add_to_aggregates(sub_class_id, week, eur_notional, is_si_trade)
+        week_aggregates = self.weekly_aggregates.get(week)
+        if week_aggregates is None:
+            week_aggregates = self.weekly_aggregates[week] = dict()
+        aggregate = week_aggregates.get(sub_class_id)
+        if aggregate is None:
+            aggregate = week_aggregates[sub_class_id] = SubClassAggregate()
+        aggregate.add_trade(eur_notional, is_si_trade)
+        self._changed_sub_class_ids.add(sub_class_id)
+
+    def add_week_aggregate(self, sub_class_id, sub_class_key, week, week_aggregate):
+        super(RollingSICalculation, self).add_week_aggregate(sub_class_id, sub_class_key, week, week_aggregate)
+        week_aggregates = self.weekly_aggregates.get(week)
+        if week_aggregates is None:
+            week_aggregates = self.weekly_aggregates[week] = dict()
+        aggregate = week_aggregates.get(sub_class_id)
+        if aggregate is None:
+            aggregate = week_aggregates[sub_class_id] = SubClassAggregate()
+        aggregate.add(week_aggregate)
+        self._changed_sub_class_ids.add(sub_class_id)
+
+    def add_day(self, trades, trade_date, accessor=None, names=None):
+        """
+        I add a day of trades, then drop any weeks which have left the window ending on
+        trade_date.
+        """
+        self.add_trades(trades, accessor=accessor, names=names)
+        self.expire_weeks_before(week_number(trade_date) - self.window_weeks + 1)
+        return self
+
+    def expire_weeks_before(self, first_week):
+        for week in [week for week in self.weekly_aggregates if week < first_week]:
+            for sub_class_id, week_aggregate in self.weekly_aggregates.pop(week).items():
+                aggregate = self.aggregates[sub_class_id]
+                aggregate.subtract(week_aggregate)
+                if aggregate.is_empty():
+                    del self.aggregates[sub_class_id]
+                self._eu_data_by_id.pop(sub_class_id, None)
+                self._changed_sub_class_ids.add(sub_class_id)
+        if self.weekly_aggregates:
+            self.first_week = min(self.weekly_aggregates)
+            self.last_week = max(self.weekly_aggregates)
+        else:
+            self.first_week = self.last_week = None
+
+    def changed_sub_class_ids(self):
+        return set(self._changed_sub_class_ids)
+
+    def si_statuses(self):
+        period = (self.first_week, self.last_week)
+        if period != self._status_period:
+            self._changed_sub_class_ids.update(self.aggregates)
+            self._changed_sub_class_ids.update(self._statuses)
+            self._status_period = period
+        for sub_class_id in self._changed_sub_class_ids:
+            status = self.si_status(sub_class_id) if sub_class_id in self.aggregates else None
+            if status:
+                self._statuses[sub_class_id] = status
+            else:
+                self._statuses.pop(sub_class_id, None)
+        self._changed_sub_class_ids.clear()
+        return dict(self._statuses)
+
+
+class MultiLEISICalculation(object):
+    """
+    I run the SI calculation for every LEI of a group in one pass over the trades.
+    Each trade is classified once and its aggregate updated in the SICalculation of
+    its LEI, taken from the trade's lei attribute.  Sub-class IDs are shared between
+    the LEIs since they all come from the same root.
+    """
+
+    def __init__(self, root, eea_mics, eu_data):
+        self.root = root
+        self.eea_mics = frozenset(eea_mics)
+        self.eu_data = eu_data
+        self.calculations = dict()
+
+    def calculation_for(self, lei):
+        calculation = self.calculations.get(lei)
+        if calculation is None:
+            calculation = self.calculations[lei] = SICalculation(self.root, self.eea_mics, self.eu_data)
+        return calculation
+
+    def add_trades(self, trades, accessor=None, names=None):
+        for classification in self.root.classify_many(trades, accessor=accessor, names=names):
+            self.add_classified_trade(classification)
+        return self
+
+    def add_classified_trade(self, classification):
+        self.calculation_for(classification.subject_value('lei')).add_classified_trade(classification)
+
+    def leis(self):
+        return sorted(self.calculations, key=str)
+
+    def partials(self):
+        return dict((lei, calculation.partial()) for lei, calculation in self.calculations.items())
+
+    def reports(self):
+        return dict((lei, calculation.report()) for lei, calculation in self.calculations.items())
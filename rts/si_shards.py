@@ -0,0 +1,113 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+"""
+Running the SI calculation as map-reduce over shards of trades.
+
+Each shard, for example the trades of one date, book or desk, is classified and
+aggregated in a worker process into an SIPartial.  Partials are keyed by sub-class
+key, not by the sub-class IDs of the worker's process, and merge associatively and
+commutatively, so they are merged as they arrive, in whatever order, into one
+SICalculation which reports just as a single pass over all the trades would.
+
+The reports of the LEIs of a MultiLEISICalculation can likewise be produced in
+parallel, each worker being passed an LEI's partial.
+"""
+
+import functools
+import multiprocessing
+
+import si_calculation
+
+
+def shard_partial(shard):
+    """
+    I classify and aggregate one shard of trades in a worker process, so I import the
+    taxonomy for myself.
+    """
+    import rts2_annex3
+    eea_mics, trades, names = shard
+    calculation = si_calculation.SICalculation(rts2_annex3.class_root, eea_mics, eu_data=None)
+    return calculation.add_trades(trades, names=names).partial()
+
+
+def merged_partial(shards, eea_mics, workers=None, names=None):
+    """
+    I answer the merge of the partials of each shard.  Shards are sequences of trades
+    (see TaxonomyRoot.classify_many(); names are needed if the trades are sequences)
+    and must be picklable when workers is more than one.
+    """
+    work = ((eea_mics, trades, names) for trades in shards)
+    if workers == 1:
+        partials = map(shard_partial, work)
+        return functools.reduce(si_calculation.SIPartial.merge, partials, si_calculation.SIPartial())
+    pool = multiprocessing.Pool(workers)
+    try:
+        partials = pool.imap_unordered(shard_partial, work)
+        return functools.reduce(si_calculation.SIPartial.merge, partials, si_calculation.SIPartial())
+    finally:
+        pool.close()
+        pool.join()
+
+
+def sharded_calculation(root, shards, eea_mics, eu_data, workers=None, names=None):
+    calculation = si_calculation.SICalculation(root, eea_mics, eu_data)
+    return calculation.add_partial(merged_partial(shards, eea_mics, workers=workers, names=names))
+
+
+def lei_report_items(work):
+    import rts2_annex3
+    lei, partial, eea_mics, eu_data = work
+    calculation = si_calculation.SICalculation(rts2_annex3.class_root, eea_mics, eu_data)
+    return lei, calculation.add_partial(partial).report_items()
+
+
+def lei_reports(multi_lei_calculation, workers=None):
+    """
+    I answer a dict of LEI to the report items of its SI calculation, the LEIs being
+    reported on in a pool of worker processes.  The EU data must be picklable.
+    """
+    work = [(lei, partial, multi_lei_calculation.eea_mics, multi_lei_calculation.eu_data)
+            for lei, partial in multi_lei_calculation.partials().items()]
+    if workers == 1:
+        return dict(map(lei_report_items, work))
+    pool = multiprocessing.Pool(workers)
+    try:
+        return dict(pool.imap_unordered(lei_report_items, work))
+    finally:
+        pool.close()
+        pool.join()
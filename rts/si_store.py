@@ -0,0 +1,199 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+"""
+A local SQLite store of the weekly aggregates behind the SI calculation.
+
+Each daily run ingests only that day's trades.  They are classified and folded into
+one aggregate per sub-class per week, and those are added to what is already on disk,
+so the look-back window is read back as a few rows per sub-class per week rather than
+as six months of raw trades.
+
+Sub-class IDs from TaxonomyRoot.sub_class_id_for() last only as long as the process,
+so the store keeps its own IDs, allocated once per sub-class key in the sub_class
+table, and the aggregates are keyed by that ID and the week number (see
+si_calculation.week_number(); weeks run Monday to Sunday, as ISO weeks).
+
+    store = SIAggregateStore('si.sqlite', class_root, eea_mics)
+    store.ingest_day(trade_date, trades)
+    calculation = store.window_calculation(eu_data, trade_date, window_weeks=26)
+    print(calculation.report())
+"""
+
+import sqlite3
+
+import si_calculation
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sub_class (
+    sub_class_id INTEGER PRIMARY KEY,
+    sub_class_key TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS weekly_aggregate (
+    sub_class_id INTEGER NOT NULL REFERENCES sub_class (sub_class_id),
+    week INTEGER NOT NULL,
+    trade_count INTEGER NOT NULL,
+    notional_sum REAL NOT NULL,
+    lei_trade_count INTEGER NOT NULL,
+    lei_notional_sum REAL NOT NULL,
+    PRIMARY KEY (sub_class_id, week)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS weekly_aggregate_week ON weekly_aggregate (week);
+CREATE TABLE IF NOT EXISTS ingested_day (
+    trade_date TEXT PRIMARY KEY,
+    trade_count INTEGER NOT NULL,
+    unclassified_count INTEGER NOT NULL
+);
+"""
+
+ADD_WEEK_AGGREGATE = """
+INSERT INTO weekly_aggregate (
+    sub_class_id, week, trade_count, notional_sum, lei_trade_count, lei_notional_sum)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (sub_class_id, week) DO UPDATE SET
+    trade_count = trade_count + excluded.trade_count,
+    notional_sum = notional_sum + excluded.notional_sum,
+    lei_trade_count = lei_trade_count + excluded.lei_trade_count,
+    lei_notional_sum = lei_notional_sum + excluded.lei_notional_sum
+"""
+
+SELECT_WEEK_AGGREGATES = """
+SELECT weekly_aggregate.sub_class_id, sub_class.sub_class_key, week,
+    trade_count, notional_sum, lei_trade_count, lei_notional_sum
+FROM weekly_aggregate JOIN sub_class USING (sub_class_id)
+WHERE week BETWEEN ? AND ?
+"""
+
+
+class SIAggregateStore(object):
+    """
+    I keep the weekly SI aggregates of one LEI in a SQLite database at path (which may
+    be ':memory:').  Each trade date may be ingested only once, so that a daily job
+    which is re-run cannot count the same trades twice.
+    """
+
+    def __init__(self, path, root, eea_mics):
+        self.path = path
+        self.root = root
+        self.eea_mics = frozenset(eea_mics)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def is_ingested(self, trade_date):
+        row = self.connection.execute(
+            'SELECT 1 FROM ingested_day WHERE trade_date = ?', (trade_date.isoformat(),)).fetchone()
+        return row is not None
+
+    def ingested_dates(self):
+        return [row[0] for row in self.connection.execute(
+            'SELECT trade_date FROM ingested_day ORDER BY trade_date')]
+
+    def ingest_day(self, trade_date, trades, accessor=None, names=None):
+        """
+        I classify and aggregate the trades of trade_date, then add the aggregates to
+        the store in one transaction.  I return the number of trades ingested.
+        """
+        if self.is_ingested(trade_date):
+            raise ValueError('Trades for {date} have already been ingested'.format(date=trade_date))
+        calculation = si_calculation.RollingSICalculation(self.root, self.eea_mics, eu_data=None)
+        calculation.add_trades(trades, accessor=accessor, names=names)
+        with self.connection:
+            rows = list()
+            for week, week_aggregates in calculation.weekly_aggregates.items():
+                for sub_class_id, aggregate in week_aggregates.items():
+                    rows.append((
+                        self.store_id_for(calculation.sub_class_key(sub_class_id)),
+                        week,
+                        aggregate.trade_count,
+                        aggregate.notional_sum,
+                        aggregate.lei_trade_count,
+                        aggregate.lei_notional_sum))
+            self.connection.executemany(ADD_WEEK_AGGREGATE, rows)
+            self.connection.execute(
+                'INSERT INTO ingested_day (trade_date, trade_count, unclassified_count) VALUES (?, ?, ?)',
+                (trade_date.isoformat(), calculation.trade_count, calculation.unclassified_count))
+        return calculation.trade_count
+
+    def store_id_for(self, sub_class_key):
+        """
+        I return the store's ID for a sub-class key, allocating one if it is new.
+        """
+        self.connection.execute(
+            'INSERT OR IGNORE INTO sub_class (sub_class_key) VALUES (?)', (sub_class_key,))
+        return self.connection.execute(
+            'SELECT sub_class_id FROM sub_class WHERE sub_class_key = ?', (sub_class_key,)).fetchone()[0]
+
+    def add_to_calculation(self, calculation, first_week, last_week):
+        for row in self.connection.execute(SELECT_WEEK_AGGREGATES, (first_week, last_week)):
+            store_id, sub_class_key, week = row[:3]
+            aggregate = si_calculation.SubClassAggregate()
+            aggregate.trade_count, aggregate.notional_sum, \
+                aggregate.lei_trade_count, aggregate.lei_notional_sum = row[3:]
+            calculation.add_week_aggregate(store_id, sub_class_key, week, aggregate)
+        return calculation
+
+    def calculation(self, eu_data, first_week, last_week):
+        """
+        I return an SICalculation over the stored weeks from first_week to last_week
+        inclusive.  Its sub-class IDs are the store's IDs, not those of the root.
+        """
+        calculation = si_calculation.SICalculation(self.root, self.eea_mics, eu_data)
+        return self.add_to_calculation(calculation, first_week, last_week)
+
+    def window_calculation(self, eu_data, end_date, window_weeks=26):
+        """
+        I return an SICalculation over the window_weeks ending with the week of end_date.
+        """
+        last_week = si_calculation.week_number(end_date)
+        return self.calculation(eu_data, last_week - window_weeks + 1, last_week)
+
+    def expire_weeks_before(self, first_week):
+        """
+        I delete the aggregates of weeks before first_week, once they can no longer
+        fall in any window, to keep the store small.
+        """
+        with self.connection:
+            self.connection.execute('DELETE FROM weekly_aggregate WHERE week < ?', (first_week,))
@@ -0,0 +1,158 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+"""
+A fast check of a trade's size against the SSTI (size specific to the instrument)
+and LIS (large in scale) thresholds of its RTS 2 sub-class, for pre-trade waivers
+and post-trade deferrals.
+
+The thresholds of each sub-class depend on reference data: whether the sub-class is
+liquid and, for some, the band of its average daily notional amount (ADNA).  Rather
+than walk the ThresholdTable, PreTrade, PostTrade and SumOfMoney objects for every
+order, the four limits of each sub-class are worked out once into a flat table, a
+list indexed by the sub-class ID (see TaxonomyRoot.sub_class_id_for()).  Sub-classes
+first met after the table was built are added as they are met.  When the reference
+data changes, refresh() builds a new table and swaps it in with one assignment, so
+checks in progress never see a half-built table.
+
+    checker = SizeChecker(class_root, EUReferenceStore.load('eu_reference'))
+    checker.check_size(trade)                         # one of BELOW_SSTI, SSTI, LIS
+    checker.check_size(trade, post_trade=True)
+"""
+
+BELOW_SSTI = 'below_ssti'
+SSTI = 'ssti'
+LIS = 'lis'
+
+LIMIT_NAMES = ['ssti_pre_trade', 'lis_pre_trade', 'ssti_post_trade', 'lis_post_trade']
+
+
+def limits_for_table(table, calibrated=None):
+    """
+    I return the four limits of a ThresholdTable as EUR amounts, in the order of
+    LIMIT_NAMES.  Where a threshold is set by a trade or volume percentile, the
+    calibrated amount (see threshold_calibration) is used if it is above the floor.
+    """
+    limits = []
+    for name in LIMIT_NAMES:
+        limit = getattr(table, name).threshold_floor.amount
+        if calibrated and calibrated.get(name) is not None:
+            limit = max(limit, calibrated[name])
+        limits.append(limit)
+    return tuple(limits)
+
+
+class SizeLimitTable(object):
+    """
+    I hold the limits of each sub-class, indexed by sub-class ID.  An entry is None
+    for a sub-class not yet worked out, and NO_LIMITS for one with no thresholds.
+    """
+
+    NO_LIMITS = ()
+
+    def __init__(self, root, reference_data, calibrated=None):
+        self.root = root
+        self.reference_data = reference_data
+        self.calibrated = calibrated or {}
+        self.limits = [self.work_out_limits(sub_class_id) for sub_class_id in root.sub_class_ids()]
+
+    def work_out_limits(self, sub_class_id):
+        classification = self.root.sub_class_for_id(sub_class_id)
+        sub_class_key = classification.sub_class_key()
+        eu_data = self.reference_data.eu_data_for(sub_class_key)
+        is_liquid = eu_data is not None and eu_data.is_liquid
+        adna = self.reference_data.adna_for(sub_class_key) if is_liquid else None
+        try:
+            table = self.root.thresholds_for(classification, adna=adna, is_liquid=is_liquid)
+        except ValueError:
+            table = None  # Banded by ADNA but we have no ADNA
+        if table is None:
+            return self.NO_LIMITS
+        return limits_for_table(table, self.calibrated.get(sub_class_key))
+
+    def limits_for(self, sub_class_id):
+        limits = self.limits
+        if sub_class_id >= len(limits):
+            limits.extend([None] * (sub_class_id + 1 - len(limits)))
+        sub_class_limits = limits[sub_class_id]
+        if sub_class_limits is None:
+            sub_class_limits = limits[sub_class_id] = self.work_out_limits(sub_class_id)
+        return sub_class_limits
+
+
+class SizeChecker(object):
+    """
+    I check trade sizes against the limits of their sub-classes.  Trades must carry
+    eur_notional as well as the attributes needed for classification.  The reference
+    data answers eu_data_for() and adna_for() by sub-class key, as an EUReferenceStore
+    does.
+    """
+
+    def __init__(self, root, reference_data, calibrated=None):
+        self.root = root
+        self.table = SizeLimitTable(root, reference_data, calibrated)
+
+    def refresh(self, reference_data, calibrated=None):
+        self.table = SizeLimitTable(self.root, reference_data, calibrated)
+
+    def check_size(self, trade, post_trade=False):
+        """
+        I return BELOW_SSTI, SSTI or LIS for a trade, or None if it can't be classified
+        or its sub-class has no thresholds.
+        """
+        classification = self.root.classification_for(trade)
+        sub_class_id = self.root.sub_class_id_for(classification)
+        if sub_class_id is None:
+            return None
+        return self.check_size_for_id(sub_class_id, classification.subject_value('eur_notional'), post_trade)
+
+    def check_size_for_id(self, sub_class_id, eur_notional, post_trade=False):
+        """
+        I am the hot path for callers which already know the sub-class ID, for example
+        an order router which keeps it with the instrument.
+        """
+        limits = self.table.limits_for(sub_class_id)
+        if not limits:
+            return None
+        size = abs(eur_notional)
+        if post_trade:
+            if size >= limits[3]:
+                return LIS
+            return SSTI if size >= limits[2] else BELOW_SSTI
+        if size >= limits[1]:
+            return LIS
+        return SSTI if size >= limits[0] else BELOW_SSTI
@@ -0,0 +1,240 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+"""
+The taxonomy flattened, once, into a columnar catalog with one row per sub-asset
+class: its criteria, the attributes a trade needs, the maturity buckets, the liquidity
+criteria and the threshold bands.  The maturity buckets are those RTS 2 gives, and the
+rule for any extrapolated beyond them, not those a process has made so far, so the
+catalog is the same whatever has been classified.  Dashboards, data validation and the warehouse can
+query the catalog instead of walking the Python objects.
+
+IDs are integers: asset classes and sub-asset classes are numbered in taxonomy order.
+Lists, such as the ADNA floors of the liquid threshold bands, are list columns in
+Arrow and Parquet, and are joined with '|' in CSV.  For example:
+
+    python taxonomy_catalog.py catalog.arrow
+    ...
+    catalog = load_catalog('catalog.arrow')    # memory-mapped, so loading is immediate
+
+This needs pyarrow, which is only imported when a catalog is made or loaded.
+"""
+
+import argparse
+import datetime
+import os
+
+import rts2_annex3_model
+import taxonomy_export
+
+LIST_SEPARATOR = '|'
+
+# The catalog schema: (name, type), where a type in a list is a list of that type
+CATALOG_COLUMNS = [
+    ('sub_asset_class_id', int),
+    ('asset_class_id', int),
+    ('asset_class', str),
+    ('sub_asset_class', str),
+    ('ref', str),
+    ('criteria_count', int),
+    ('criterion_descriptions', [str]),
+    ('attributes', [str]),
+    ('attribute_types', [str]),
+    ('maturity_buckets', [str]),
+    ('liquidity_adna', float),
+    ('liquidity_average_daily_trades', float),
+    ('liquid_adna_floors', [int]),
+    ('liquid_ssti_pre_trade_floors', [int]),
+    ('liquid_lis_pre_trade_floors', [int]),
+    ('liquid_ssti_post_trade_floors', [int]),
+    ('liquid_lis_post_trade_floors', [int]),
+    ('non_liquid_ssti_pre_trade_floor', int),
+    ('non_liquid_lis_pre_trade_floor', int),
+    ('non_liquid_ssti_post_trade_floor', int),
+    ('non_liquid_lis_post_trade_floor', int),
+]
+
+TYPE_NAMES = {str: 'str', datetime.date: 'date'}
+
+
+def catalog_rows(root):
+    """
+    I generate the catalog as dicts keyed by the names of CATALOG_COLUMNS.
+    """
+    sub_asset_class_id = 0
+    for asset_class_id, asset_class in enumerate(root.asset_classes):
+        for sub_asset_class in asset_class.sub_asset_classes:
+            attributes = [attribute for attribute in sub_asset_class.subject_attributes()
+                          if attribute[0] not in ('asset_class_name', 'sub_asset_class_name')]
+            row = dict(
+                sub_asset_class_id=sub_asset_class_id,
+                asset_class_id=asset_class_id,
+                asset_class=asset_class.name,
+                sub_asset_class=sub_asset_class.name,
+                ref=sub_asset_class.ref,
+                criteria_count=len(sub_asset_class.criteria),
+                criterion_descriptions=[criterion.description for criterion in sub_asset_class.criteria],
+                attributes=[name for (name, _) in attributes],
+                attribute_types=[TYPE_NAMES.get(a_type, a_type.__name__) for (_, a_type) in attributes],
+                maturity_buckets=[
+                    (group_name + ': ' if group_name else '') + bucket_name
+                    for criterion in sub_asset_class.criteria
+                    for (group_name, root_option) in criterion.bucket_groups()
+                    for bucket_name in rts2_annex3_model.bucket_names_for_ceilings(
+                        root_option.parent.bucket_ceilings)],
+            )
+            thresholds = sub_asset_class.thresholds
+            liquidity_criteria = thresholds and thresholds.liquidity_criteria
+            row['liquidity_adna'] = liquidity_criteria and taxonomy_export.money_amount(
+                liquidity_criteria.average_daily_notional_amount)
+            row['liquidity_average_daily_trades'] = liquidity_criteria \
+                and liquidity_criteria.average_daily_number_of_trades
+            liquid_tables = thresholds.liquid_thresholds if thresholds else []
+            non_liquid_table = thresholds and thresholds.non_liquid_thresholds
+            row['liquid_adna_floors'] = [taxonomy_export.money_amount(table.adna_floor)
+                                         for table in liquid_tables]
+            for name in taxonomy_export.THRESHOLD_NAMES:
+                row['liquid_' + name + '_floors'] = [
+                    taxonomy_export.money_amount(getattr(table, name).threshold_floor)
+                    for table in liquid_tables]
+                row['non_liquid_' + name + '_floor'] = non_liquid_table and taxonomy_export.money_amount(
+                    getattr(non_liquid_table, name).threshold_floor)
+            yield row
+            sub_asset_class_id += 1
+
+
+def arrow_schema():
+    import pyarrow
+    arrow_types = {int: pyarrow.int64(), float: pyarrow.float64(), str: pyarrow.string()}
+    return pyarrow.schema([
+        (name, pyarrow.list_(arrow_types[a_type[0]]) if isinstance(a_type, list) else arrow_types[a_type])
+        for (name, a_type) in CATALOG_COLUMNS])
+
+
+def catalog_table(root):
+    """
+    I return the catalog as a pyarrow Table.
+    """
+    import pyarrow
+    rows = list(catalog_rows(root))
+    return pyarrow.Table.from_pylist(rows, schema=arrow_schema())
+
+
+def write_csv(table, path):
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.csv
+    columns = []
+    for field, column in zip(table.schema, table.columns):
+        if pyarrow.types.is_list(field.type):
+            column = pyarrow.compute.binary_join(pyarrow.compute.cast(column, pyarrow.list_(pyarrow.string())),
+                                                 LIST_SEPARATOR)
+        columns.append(column)
+    pyarrow.csv.write_csv(pyarrow.Table.from_arrays(columns, names=table.column_names), path)
+
+
+def write_parquet(table, path):
+    import pyarrow.parquet
+    pyarrow.parquet.write_table(table, path)
+
+
+def write_arrow(table, path):
+    import pyarrow
+    with pyarrow.OSFile(path, 'wb') as sink:
+        with pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def read_csv(path):
+    """
+    List columns come back as '|' joined strings.
+    """
+    import pyarrow.csv
+    return pyarrow.csv.read_csv(path)
+
+
+def read_parquet(path):
+    import pyarrow.parquet
+    return pyarrow.parquet.read_table(path, memory_map=True)
+
+
+def read_arrow(path):
+    """
+    The Arrow IPC file is memory-mapped, so the table's buffers are the file's pages.
+    """
+    import pyarrow
+    return pyarrow.ipc.open_file(pyarrow.memory_map(path, 'r')).read_all()
+
+
+WRITERS = {
+    '.csv': write_csv,
+    '.parquet': write_parquet,
+    '.arrow': write_arrow,
+}
+
+READERS = {
+    '.csv': read_csv,
+    '.parquet': read_parquet,
+    '.arrow': read_arrow,
+}
+
+
+def catalog_format_for(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError("Can't tell the catalog format of '{path}'.  Use one of: {extensions}.".format(
+            path=path,
+            extensions=", ".join(sorted(WRITERS)),
+        ))
+    return extension
+
+
+def write_catalog(root, path):
+    WRITERS[catalog_format_for(path)](catalog_table(root), path)
+
+
+def load_catalog(path):
+    return READERS[catalog_format_for(path)](path)
+
+
+if __name__ == "__main__":
+    import rts2_annex3
+    parser = argparse.ArgumentParser(description="Write the RTS 2 Annex III taxonomy catalog.")
+    parser.add_argument('paths', nargs='+', help="where to write the catalog (.csv, .parquet or .arrow)")
+    args = parser.parse_args()
+    for path in args.paths:
+        write_catalog(rts2_annex3.class_root, path)
@@ -0,0 +1,221 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+"""
+Exports of the whole taxonomy, thresholds included, written to any file-like object
+in one pass, one sub-asset class at a time, so time is linear in the size of the
+export and no more than one sub-asset class is held in memory.  For example:
+
+    python taxonomy_export.py taxonomy.csv
+    python taxonomy_export.py taxonomy.json
+    python taxonomy_export.py taxonomy.txt
+
+The text format is TaxonomyRoot.display() with the liquidity criteria and thresholds
+of each sub-asset class written after its criteria; like the display, it shows the
+maturity buckets extrapolated so far.  The JSON and CSV formats list the maturity
+buckets the ceilings give, and the rule for those beyond them, as the catalog does,
+so they don't depend on what has been classified.  The JSON format is an array
+with one object per sub-asset class.  The CSV format is a flat table with one row per
+criterion, maturity bucket, liquidity criterion and threshold, each row naming its
+asset class and sub-asset class.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+import rts2_annex3_model
+
+THRESHOLD_NAMES = ['ssti_pre_trade', 'lis_pre_trade', 'ssti_post_trade', 'lis_post_trade']
+
+CSV_COLUMNS = [
+    'asset_class', 'sub_asset_class', 'record', 'criterion_number', 'name', 'value',
+    'liquidity', 'adna_floor', 'trade_percentile', 'volume_percentile', 'threshold_floor',
+]
+
+
+def money_amount(sum_of_money):
+    return None if sum_of_money is None else sum_of_money.amount
+
+
+def threshold_dict(trade_threshold):
+    return dict(
+        trade_percentile=trade_threshold.trade_percentile,
+        volume_percentile=getattr(trade_threshold, 'volume_percentile', None),
+        threshold_floor=money_amount(trade_threshold.threshold_floor),
+    )
+
+
+def threshold_table_dict(table):
+    table_dict = dict(adna_floor=money_amount(table.adna_floor))
+    for name in THRESHOLD_NAMES:
+        table_dict[name] = threshold_dict(getattr(table, name))
+    return table_dict
+
+
+def threshold_tables(thresholds):
+    """
+    I answer (liquidity, table) pairs for the tables of a ThresholdSpecification.
+    """
+    if thresholds is None:
+        return []
+    tables = [('liquid', table) for table in thresholds.liquid_thresholds]
+    if thresholds.non_liquid_thresholds is not None:
+        tables.append(('non-liquid', thresholds.non_liquid_thresholds))
+    return tables
+
+
+def bucket_names(root_option):
+    """
+    I return the names of the maturity buckets of root_option as its ceilings give them,
+    not as extrapolated so far, so the export doesn't depend on what has been classified.
+    """
+    return rts2_annex3_model.bucket_names_for_ceilings(root_option.parent.bucket_ceilings)
+
+
+def sub_asset_class_dict(sub_asset_class):
+    criteria = []
+    for criterion in sub_asset_class.criteria:
+        criterion_dict = dict(
+            number=criterion.criterion_number,
+            description=criterion.description,
+            reads=[name for (name, _) in criterion.subject_attributes()],
+        )
+        bucket_groups = criterion.bucket_groups()
+        if bucket_groups:
+            criterion_dict['maturity_buckets'] = [
+                dict(group=group_name, buckets=bucket_names(root_option))
+                for (group_name, root_option) in bucket_groups]
+        criteria.append(criterion_dict)
+    thresholds = sub_asset_class.thresholds
+    liquidity_criteria = thresholds and thresholds.liquidity_criteria
+    return dict(
+        asset_class=sub_asset_class.parent.name,
+        sub_asset_class=sub_asset_class.name,
+        ref=sub_asset_class.ref,
+        criteria=criteria,
+        liquidity_criteria=liquidity_criteria and dict(
+            average_daily_notional_amount=money_amount(liquidity_criteria.average_daily_notional_amount),
+            average_daily_number_of_trades=liquidity_criteria.average_daily_number_of_trades,
+            qualitative_liquidity_criterion=liquidity_criteria.qualitative_liquidity_criterion,
+        ),
+        thresholds=[dict(liquidity=liquidity, **threshold_table_dict(table))
+                    for (liquidity, table) in threshold_tables(thresholds)],
+    )
+
+
+def write_text(root, stream):
+    root.write_display(stream, thresholds=True)
+    stream.write("\n")
+
+
+def write_json(root, stream):
+    stream.write("[")
+    separator = "\n"
+    for sub_asset_class in root.all_sub_asset_classes():
+        stream.write(separator)
+        json.dump(sub_asset_class_dict(sub_asset_class), stream)
+        separator = ",\n"
+    stream.write("\n]\n")
+
+
+def csv_rows(sub_asset_class):
+    """
+    I generate the flat rows of one sub-asset class, as dicts keyed by CSV_COLUMNS.
+    """
+    names = dict(asset_class=sub_asset_class.parent.name, sub_asset_class=sub_asset_class.name)
+    for criterion in sub_asset_class.criteria:
+        yield dict(names, record='criterion', criterion_number=criterion.criterion_number,
+                   name=criterion.criterion_name, value=criterion.description)
+        for (group_name, root_option) in criterion.bucket_groups():
+            for bucket_name in bucket_names(root_option):
+                yield dict(names, record='maturity_bucket', criterion_number=criterion.criterion_number,
+                           name=group_name, value=bucket_name)
+    thresholds = sub_asset_class.thresholds
+    liquidity_criteria = thresholds and thresholds.liquidity_criteria
+    if liquidity_criteria:
+        yield dict(names, record='liquidity_criterion', name='average_daily_notional_amount',
+                   value=money_amount(liquidity_criteria.average_daily_notional_amount))
+        yield dict(names, record='liquidity_criterion', name='average_daily_number_of_trades',
+                   value=liquidity_criteria.average_daily_number_of_trades)
+    for (liquidity, table) in threshold_tables(thresholds):
+        for name in THRESHOLD_NAMES:
+            row = dict(names, record='threshold', name=name, liquidity=liquidity,
+                       adna_floor=money_amount(table.adna_floor))
+            for (key, value) in threshold_dict(getattr(table, name)).items():
+                row[key] = json.dumps(value) if isinstance(value, dict) else value
+            yield row
+
+
+def write_csv(root, stream):
+    writer = csv.DictWriter(stream, CSV_COLUMNS)
+    writer.writeheader()
+    for sub_asset_class in root.all_sub_asset_classes():
+        writer.writerows(csv_rows(sub_asset_class))
+
+
+EXPORTERS = {
+    '.txt': write_text,
+    '.json': write_json,
+    '.csv': write_csv,
+}
+
+
+def export(root, path, export_format=None):
+    export_format = export_format or os.path.splitext(path)[1].lower()
+    if export_format not in EXPORTERS:
+        raise ValueError("Can't export to '{path}'.  Use one of: {extensions}.".format(
+            path=path,
+            extensions=", ".join(sorted(EXPORTERS)),
+        ))
+    with open(path, 'w', newline='') as stream:
+        EXPORTERS[export_format](root, stream)
+
+
+if __name__ == "__main__":
+    import rts2_annex3
+    parser = argparse.ArgumentParser(description="Export the RTS 2 Annex III taxonomy.")
+    parser.add_argument('path', help="where to write the export (.txt, .json or .csv), or - for stdout")
+    parser.add_argument('--format', choices=sorted(EXPORTERS), dest='export_format',
+                        help="the export format, if not given by the file extension")
+    args = parser.parse_args()
+    if args.path == '-':
+        EXPORTERS[args.export_format or '.txt'](rts2_annex3.class_root, sys.stdout)
+    else:
+        export(rts2_annex3.class_root, args.path, args.export_format)
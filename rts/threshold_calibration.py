@@ -0,0 +1,281 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+
+"""
+Calibration of the SSTI and LIS thresholds which RTS 2 sets by percentiles of the
+trades of a sub-class.
+
+PreTrade.trade_percentile and PostTrade.trade_percentile are percentiles of the
+trade sizes; PostTrade.volume_percentile is the size below which that percentage of
+the traded volume (the sum of the sizes) was done, which is a percentile of the
+sizes weighted by size.  The threshold is the highest of the percentiles given and
+the threshold floor.  Some trade percentiles depend on the phase-in stage, S1 to S4.
+
+The sizes of each sub-class are gathered in one pass over the classified trades into
+a QuantileSketch: sizes are counted in logarithmic buckets, so that any quantile is
+answered within a relative accuracy (1% by default), memory is bounded by the range of
+sizes rather than their number, and sketches of different shards can be merged.  An
+ExactQuantiles, which keeps every size, can be used instead to validate the sketches.
+
+    calibration = ThresholdCalibration(class_root)
+    calibration.add_trades(trades)
+    calibrated = calibration.calibrated_limits(EUReferenceStore.load('eu_reference'))
+    checker = SizeChecker(class_root, reference_data, calibrated)
+"""
+
+import math
+
+import size_check
+
+
+class QuantileSketch(object):
+    """
+    I count weighted positive values in buckets whose bounds grow by a factor of gamma,
+    so each value is known to within relative_accuracy.  If I would hold more than
+    max_buckets, the lowest buckets are folded together; only the lowest quantiles,
+    which thresholds don't use, then lose accuracy.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = dict()
+        self.zero_weight = 0
+        self.total_weight = 0
+
+    def add(self, value, weight=1):
+        self.total_weight += weight
+        if value <= 0:
+            self.zero_weight += weight
+            return
+        index = int(math.ceil(math.log(value) / self._log_gamma))
+        self.buckets[index] = self.buckets.get(index, 0) + weight
+        if len(self.buckets) > self.max_buckets:
+            self.collapse()
+
+    def collapse(self):
+        indexes = sorted(self.buckets)
+        folded = indexes[:len(indexes) - self.max_buckets + 1]
+        self.buckets[folded[-1]] = sum(self.buckets.pop(index) for index in folded[:-1]) \
+            + self.buckets[folded[-1]]
+
+    def merge(self, other):
+        """
+        I add other into myself, and return myself.  Both must have the same accuracy.
+        """
+        if other.gamma != self.gamma:
+            raise ValueError('Only sketches of the same accuracy can be merged')
+        for index, weight in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + weight
+        self.zero_weight += other.zero_weight
+        self.total_weight += other.total_weight
+        while len(self.buckets) > self.max_buckets:
+            self.collapse()
+        return self
+
+    def quantile(self, percentile):
+        """
+        I return the value below which percentile percent of the weight lies, or None
+        if I am empty.
+        """
+        if not self.total_weight:
+            return None
+        rank = self.total_weight * percentile / 100.0
+        cumulative = self.zero_weight
+        if cumulative >= rank:
+            return 0
+        for index in sorted(self.buckets):
+            cumulative += self.buckets[index]
+            if cumulative >= rank:
+                # The bucket holds (gamma ** (index - 1), gamma ** index]
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class ExactQuantiles(object):
+    """
+    I keep every value, for validating sketches and for small sub-classes.
+    """
+
+    def __init__(self):
+        self.values = []
+        self.total_weight = 0
+
+    def add(self, value, weight=1):
+        self.values.append((value, weight))
+        self.total_weight += weight
+
+    def merge(self, other):
+        self.values.extend(other.values)
+        self.total_weight += other.total_weight
+        return self
+
+    def quantile(self, percentile):
+        if not self.total_weight:
+            return None
+        rank = self.total_weight * percentile / 100.0
+        values = sorted(self.values)
+        cumulative = 0
+        for value, weight in values:
+            cumulative += weight
+            if cumulative >= rank:
+                return value
+        return values[-1][0]
+
+
+class SizeDistribution(object):
+    """
+    I hold the trade-size and volume distributions of one sub-class.
+    """
+
+    def __init__(self, make_sketch):
+        self.trades = make_sketch()
+        self.volume = make_sketch()
+
+    def add(self, size):
+        self.trades.add(size)
+        self.volume.add(size, weight=size)
+
+    def merge(self, other):
+        self.trades.merge(other.trades)
+        self.volume.merge(other.volume)
+        return self
+
+
+def percentile_for_stage(percentile, stage):
+    if isinstance(percentile, dict):
+        return percentile[stage]
+    return percentile
+
+
+class ThresholdCalibration(object):
+    """
+    I gather the size distributions of each sub-class, keyed by sub-class key so that
+    calibrations of different shards can be merged.  Trades must carry eur_notional as
+    well as the attributes needed for classification.
+    """
+
+    def __init__(self, root, exact=False, relative_accuracy=0.01):
+        self.root = root
+        self.exact = exact
+        self.relative_accuracy = relative_accuracy
+        self.distributions = dict()
+        self._distributions_by_id = dict()
+
+    def make_sketch(self):
+        if self.exact:
+            return ExactQuantiles()
+        return QuantileSketch(self.relative_accuracy)
+
+    def distribution_for(self, sub_class_key):
+        distribution = self.distributions.get(sub_class_key)
+        if distribution is None:
+            distribution = self.distributions[sub_class_key] = SizeDistribution(self.make_sketch)
+        return distribution
+
+    def add_trades(self, trades, accessor=None, names=None):
+        for classification in self.root.classify_many(trades, accessor=accessor, names=names):
+            sub_class_id = self.root.sub_class_id_for(classification)
+            if sub_class_id is None:
+                continue
+            distribution = self._distributions_by_id.get(sub_class_id)
+            if distribution is None:
+                distribution = self.distribution_for(classification.sub_class_key())
+                self._distributions_by_id[sub_class_id] = distribution
+            distribution.add(abs(classification.subject_value('eur_notional')))
+        return self
+
+    def merge(self, other):
+        """
+        I add other's distributions into my own, and return myself.  Other is left as it
+        was and shares nothing with me, so the calibrations of many shards can be merged
+        into one.
+        """
+        for sub_class_key, distribution in other.distributions.items():
+            self.distribution_for(sub_class_key).merge(distribution)
+        return self
+
+    def threshold(self, sub_class_key, trade_threshold, stage='S1'):
+        """
+        I return the calibrated threshold for a PreTrade or PostTrade: the highest of
+        its percentiles of the sub-class's sizes and its floor.  Only the floor applies
+        to a sub-class with no trades.
+        """
+        candidates = [trade_threshold.threshold_floor.amount]
+        distribution = self.distributions.get(sub_class_key)
+        if distribution is not None:
+            trade_percentile = percentile_for_stage(trade_threshold.trade_percentile, stage)
+            if trade_percentile is not None:
+                candidates.append(distribution.trades.quantile(trade_percentile))
+            volume_percentile = getattr(trade_threshold, 'volume_percentile', None)
+            if volume_percentile is not None:
+                candidates.append(distribution.volume.quantile(volume_percentile))
+        return max(candidate for candidate in candidates if candidate is not None)
+
+    def calibrated_limits(self, reference_data, stage='S1'):
+        """
+        I return a dict of sub-class key to a dict of the calibrated limits, by the
+        names of size_check.LIMIT_NAMES, of the table which applies to the sub-class
+        given the reference data (see size_check.SizeLimitTable).
+        """
+        calibrated = dict()
+        for sub_class_key in self.distributions:
+            eu_data = reference_data.eu_data_for(sub_class_key)
+            is_liquid = eu_data is not None and eu_data.is_liquid
+            adna = reference_data.adna_for(sub_class_key) if is_liquid else None
+            sub_asset_class = self.sub_asset_class_for_key(sub_class_key)
+            if sub_asset_class is None:
+                continue  # SFPs and securitised derivatives have no sub-asset classes
+            thresholds = sub_asset_class.thresholds
+            try:
+                table = thresholds.table_for(adna, is_liquid) if thresholds else None
+            except ValueError:
+                table = None  # Banded by ADNA but we have no ADNA
+            if table is not None:
+                calibrated[sub_class_key] = dict(
+                    (name, self.threshold(sub_class_key, getattr(table, name), stage))
+                    for name in size_check.LIMIT_NAMES)
+        return calibrated
+
+    def sub_asset_class_for_key(self, sub_class_key):
+        """
+        I return the sub-asset class of a sub-class key, or None for asset classes which
+        have no sub-asset classes.
+        """
+        return self.root.classification_for_key(sub_class_key).sub_asset_class
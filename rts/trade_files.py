@@ -0,0 +1,400 @@
+# Three clause BSD license: https://opensource.org/licenses/BSD-3-Clause
+
+# Copyright (c) 2017, Bruce Badger All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+__author__ = "Bruce Badger"
+__copyright__ = "Copyright (c) 2017-2018 Bruce Badger"
+__license__ = "BSD-3-Clause"
+
+
+"""
+Readers and writers which stream trades, typically generated sample trades, from and
+to CSV, JSON Lines or Parquet files.  Rows are read and written a chunk at a time,
+so files of any size can be handled without holding more than one chunk of trades
+in memory.
+
+The columns are derived from the taxonomy: every attribute which any criterion reads
+from a trade gets a column, in taxonomy order, so the schema is the same every time.
+Parquet support needs pyarrow.
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import os
+
+DEFAULT_CHUNK_SIZE = 10000
+
+CLASSIFICATION_COLUMNS = [
+    ('sub_class_key', str),
+    ('errors', str),
+]
+
+
+def columns_for(node):
+    """
+    I return the column schema, a list of (name, type) pairs, for trades of node, which
+    may be the taxonomy root, an asset class or a sub-asset class.
+    """
+    return node.subject_attributes()
+
+
+def parse_date(text):
+    """
+    I turn an ISO format date string (e.g. '2017-08-13') into a date.  This is much
+    quicker than strptime(), which matters when reading millions of rows.
+    """
+    if not text:
+        return None
+    return datetime.date(int(text[0:4]), int(text[5:7]), int(text[8:10]))
+
+
+def _json_default(value):
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+class TradeWriter(object):
+    """
+    I pick the values named by my columns from each trade I am given and pass them on
+    to my concrete subclass a chunk at a time.  Trades are never converted to
+    dictionaries with vars(), and only one chunk of rows is held at any time.
+
+    If I am given a taxonomy root I also write the classification of each trade, as
+    a sub-class key and a string of errors, after the trade's own columns.
+    """
+
+    def __init__(self, target, columns, chunk_size=DEFAULT_CHUNK_SIZE, root=None):
+        self._trade_columns = list(columns)
+        self._trade_names = [name for (name, _) in self._trade_columns]
+        self._root = root
+        self._chunk_size = chunk_size
+        self._rows = []
+        self._row_count = 0
+        self._owns_stream = not hasattr(target, 'write')
+        self._stream = self.open_stream(target)
+
+    @property
+    def columns(self):
+        if self.classified:
+            return self._trade_columns + CLASSIFICATION_COLUMNS
+        return self._trade_columns
+
+    @property
+    def names(self):
+        return [name for (name, _) in self.columns]
+
+    @property
+    def classified(self):
+        return self._root is not None
+
+    @property
+    def row_count(self):
+        return self._row_count
+
+    def open_stream(self, target):
+        if self._owns_stream:
+            return open(target, 'w', newline='')
+        return target
+
+    def write(self, trade, classification=None):
+        row = [getattr(trade, name, None) for name in self._trade_names]
+        if self.classified:
+            if classification is None:
+                classification = self._root.classification_for(trade)
+            row.append(classification.sub_class_key())
+            row.append('; '.join(classification.error_messages()))
+        self.write_row(row)
+
+    def write_row(self, row):
+        """
+        I accept a row which already holds a value for each of my columns.
+        """
+        self._rows.append(row)
+        if len(self._rows) >= self._chunk_size:
+            self.flush()
+
+    def write_all(self, trades):
+        for trade in trades:
+            self.write(trade)
+
+    def flush(self):
+        if self._rows:
+            self.write_chunk(self._rows)
+            self._row_count += len(self._rows)
+            self._rows = []
+
+    def write_chunk(self, rows):
+        raise NotImplementedError('write_chunk() must be implemented in concrete subclass {my_class}'
+                                  .format(my_class=type(self)))
+
+    def close(self):
+        self.flush()
+        if self._owns_stream:
+            self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CsvTradeWriter(TradeWriter):
+
+    def __init__(self, target, columns, chunk_size=DEFAULT_CHUNK_SIZE, root=None):
+        super(CsvTradeWriter, self).__init__(target, columns, chunk_size=chunk_size, root=root)
+        self._csv_writer = csv.writer(self._stream)
+        self._csv_writer.writerow(self.names)
+
+    def write_chunk(self, rows):
+        self._csv_writer.writerows(rows)
+
+
+class JsonLinesTradeWriter(TradeWriter):
+
+    def write_chunk(self, rows):
+        names = self.names
+        lines = [json.dumps(dict(zip(names, row)), default=_json_default) for row in rows]
+        lines.append('')
+        self._stream.write('\n'.join(lines))
+
+
+class ParquetTradeWriter(TradeWriter):
+    """
+    Each chunk I am given becomes a Parquet row group.  The Parquet schema is derived
+    from my columns: dates are date32, ints int64, floats float64, bools bool and
+    everything else is a string.
+    """
+
+    def open_stream(self, target):
+        import pyarrow
+        import pyarrow.parquet
+        self._pyarrow = pyarrow
+        arrow_types = {
+            datetime.date: pyarrow.date32(),
+            int: pyarrow.int64(),
+            float: pyarrow.float64(),
+            bool: pyarrow.bool_(),
+        }
+        self._schema = pyarrow.schema([
+            (name, arrow_types.get(a_type, pyarrow.string()))
+            for (name, a_type) in self.columns])
+        self._owns_stream = True  # The Parquet writer is mine to close, whatever the target
+        return pyarrow.parquet.ParquetWriter(target, self._schema)
+
+    def write_chunk(self, rows):
+        arrays = []
+        for index, field in enumerate(self._schema):
+            values = [row[index] for row in rows]
+            if field.type == self._pyarrow.string():
+                values = [None if value is None else str(value) for value in values]
+            arrays.append(self._pyarrow.array(values, type=field.type))
+        self._stream.write_table(self._pyarrow.Table.from_arrays(arrays, schema=self._schema))
+
+
+class TradeReader(object):
+    """
+    I read a file of trades and answer it as chunks of rows, each row a list of values
+    in the order of my names.  Columns which the taxonomy types as dates are turned
+    into dates; everything else is left as read.
+    """
+
+    def __init__(self, path, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self._path = path
+        self._column_types = dict(columns or [])
+        self._chunk_size = chunk_size
+        self._names = None
+
+    @property
+    def names(self):
+        """
+        The column names of the rows I answer.  These are known once the first chunk
+        has been read.
+        """
+        return self._names
+
+    @property
+    def columns(self):
+        return [(name, self._column_types.get(name, str)) for name in self.names]
+
+    def date_indexes(self):
+        return [index
+                for (index, name) in enumerate(self._names)
+                if self._column_types.get(name) is datetime.date]
+
+    def parse_dates(self, rows):
+        date_indexes = self.date_indexes()
+        if date_indexes:
+            for row in rows:
+                for index in date_indexes:
+                    row[index] = parse_date(row[index])
+        return rows
+
+    def chunks(self):
+        raise NotImplementedError('chunks() must be implemented in concrete subclass {my_class}'
+                                  .format(my_class=type(self)))
+
+    def __iter__(self):
+        return self.chunks()
+
+
+class CsvTradeReader(TradeReader):
+    """
+    My writer writes None as an empty field, so I read empty fields back as None.
+    """
+
+    def chunks(self):
+        with open(self._path, newline='') as stream:
+            csv_reader = csv.reader(stream)
+            self._names = next(csv_reader)
+            rows = []
+            for row in csv_reader:
+                rows.append([value or None for value in row])
+                if len(rows) >= self._chunk_size:
+                    yield self.parse_dates(rows)
+                    rows = []
+            if rows:
+                yield self.parse_dates(rows)
+
+
+class JsonLinesTradeReader(TradeReader):
+    """
+    The names of my columns are the keys of the first line in my file.
+    """
+
+    def chunks(self):
+        with open(self._path) as stream:
+            rows = []
+            for line in stream:
+                if not line.strip():
+                    continue
+                values = json.loads(line)
+                if self._names is None:
+                    self._names = list(values)
+                rows.append([values.get(name) for name in self._names])
+                if len(rows) >= self._chunk_size:
+                    yield self.parse_dates(rows)
+                    rows = []
+            if rows:
+                yield self.parse_dates(rows)
+
+
+class ParquetTradeReader(TradeReader):
+    """
+    Parquet carries its own types, so I have no dates to parse.
+    """
+
+    def chunks(self):
+        import pyarrow.parquet
+        parquet_file = pyarrow.parquet.ParquetFile(self._path)
+        self._names = list(parquet_file.schema_arrow.names)
+        for batch in parquet_file.iter_batches(batch_size=self._chunk_size):
+            columns = [batch.column(index).to_pylist() for index in range(batch.num_columns)]
+            yield [list(row) for row in zip(*columns)]
+
+
+READERS = {
+    '.csv': CsvTradeReader,
+    '.jsonl': JsonLinesTradeReader,
+    '.json': JsonLinesTradeReader,
+    '.parquet': ParquetTradeReader,
+}
+
+WRITERS = {
+    '.csv': CsvTradeWriter,
+    '.jsonl': JsonLinesTradeWriter,
+    '.json': JsonLinesTradeWriter,
+    '.parquet': ParquetTradeWriter,
+}
+
+
+def file_format_for(path):
+    """
+    I return the file format, a key of WRITERS, implied by the extension of path.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError("Can't tell the file format of '{path}'.  Use one of: {extensions}.".format(
+            path=path,
+            extensions=", ".join(sorted(WRITERS)),
+        ))
+    return extension
+
+
+def reader_for(path, columns=None, file_format=None, **kwargs):
+    """
+    I return a reader for path, choosing the file format from the extension of path
+    unless a file_format (e.g. '.csv') is given.  The columns, usually the taxonomy
+    schema, tell the reader which columns hold dates.
+    """
+    reader_class = READERS[file_format or file_format_for(path)]
+    return reader_class(path, columns=columns, **kwargs)
+
+
+def writer_for(path, columns, file_format=None, **kwargs):
+    """
+    I return a writer for path, choosing the file format from the extension of path
+    unless a file_format (e.g. '.csv') is given.
+    """
+    writer_class = WRITERS[file_format or file_format_for(path)]
+    return writer_class(path, columns, **kwargs)
+
+
+def write_test_samples(node, number, writer):
+    """
+    I generate number sample trades from node and stream them straight to writer.
+    """
+    node.make_test_samples(number, sink_function=writer.write)
+    writer.flush()
+    return writer.row_count
+
+
+if __name__ == "__main__":
+    import rts2_annex3
+
+    parser = argparse.ArgumentParser(description="Generate sample trades from the RTS 2 taxonomy into a file.")
+    parser.add_argument('path', help="the file to write; the extension sets the format (.csv, .jsonl or .parquet)")
+    parser.add_argument('number', type=int, help="the number of sample trades to generate")
+    parser.add_argument('--asset-class', help="generate trades for just this asset class")
+    parser.add_argument('--classified', action='store_true', help="add the classification of each trade")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    root = rts2_annex3.class_root
+    sample_node = root.asset_class_by_name(args.asset_class) if args.asset_class else root
+    with writer_for(args.path,
+                    columns_for(sample_node),
+                    chunk_size=args.chunk_size,
+                    root=root if args.classified else None) as sample_writer:
+        write_test_samples(sample_node, args.number, sample_writer)
+    print("Wrote {count} sample trades to {path}".format(count=sample_writer.row_count, path=args.path))
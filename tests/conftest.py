@@ -0,0 +1,83 @@
+import datetime
+import importlib.util
+import os
+import random
+import sys
+
+import pytest
+
+# The modules of this project import each other as top level modules from rts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'rts'))
+
+import rts2_annex3
+
+FIRST_DATE = datetime.date(2018, 1, 1)
+
+# The ways make_samples spoils trades, in turn, so they fail classification
+SPOILERS = [
+    lambda sample: setattr(sample, 'sub_asset_class_name', 'No such sub-asset class'),
+    lambda sample: setattr(sample, 'asset_class_name', 'No such asset class'),
+    lambda sample: setattr(sample, 'sub_asset_class_name', None),
+]
+
+
+@pytest.fixture(scope='session')
+def root():
+    return rts2_annex3.class_root
+
+
+@pytest.fixture
+def fresh_root():
+    """
+    I build the taxonomy again, for tests which need one whose caches and maturity
+    buckets haven't been grown by other tests classifying with the shared one.
+    """
+    spec = importlib.util.find_spec('rts2_annex3')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.class_root
+
+
+@pytest.fixture(scope='session')
+def make_samples(root):
+    """
+    I answer a function making number sample trades from the whole taxonomy or from
+    the named asset class, the same for the same seed.  The first spoiled of them are
+    spoiled in turn by each of SPOILERS.  The maturities of all of them can be moved
+    years_later, beyond the given maturity buckets, so that more are extrapolated.
+    """
+    def make(number, seed, asset_class=None, spoiled=0, years_later=0):
+        random.seed(seed)
+        node = root.asset_class_by_name(asset_class) if asset_class else root
+        samples = node.make_test_samples(number)
+        for index, sample in enumerate(samples[:spoiled]):
+            SPOILERS[index % len(SPOILERS)](sample)
+        if years_later:
+            for sample in samples:
+                for name, value in list(vars(sample).items()):
+                    if name.endswith('to_date') and value:
+                        setattr(sample, name, value + datetime.timedelta(days=365 * years_later))
+        return samples
+    return make
+
+
+@pytest.fixture(scope='session')
+def make_trades(make_samples):
+    """
+    I answer a function making sample trades, as make_samples does, with what the SI
+    calculation reads as well: a trade date in the days from FIRST_DATE, a MIC, the
+    own account and client order flags, a EUR notional and, if leis are given, a LEI.
+    """
+    def make(number, seed, asset_class=None, days=120, mics=('EEA1', 'OFF1', 'OFF2'),
+             notionals=(1e6, 2e6, 5e6), leis=None):
+        trades = make_samples(number, seed, asset_class=asset_class)
+        for trade in trades:
+            trade.trade_date = FIRST_DATE + datetime.timedelta(days=random.randrange(days))
+            trade.mic = random.choice(mics)
+            trade.own_account = random.random() < 0.5
+            trade.client_order = random.random() < 0.5
+            trade.eur_notional = random.choice(notionals)
+            if leis:
+                trade.lei = random.choice(leis)
+        return trades
+    return make
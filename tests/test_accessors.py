@@ -0,0 +1,72 @@
+import pytest
+
+import rts2_annex3
+import rts2_annex3_model
+
+NAMES = [name for name, _ in rts2_annex3.class_root.subject_attributes()]
+
+
+@pytest.fixture(scope='module')
+def samples(make_samples):
+    return make_samples(3000, seed=28, spoiled=150)
+
+
+def expected(samples):
+    return [(classification.as_json(), classification.error_messages())
+            for classification in map(rts2_annex3.class_root.classification_for, samples)]
+
+
+def results(classifications):
+    return [(classification.as_json(), classification.error_messages()) for classification in classifications]
+
+
+def test_mappings_classify_as_objects_do(samples):
+    mappings = [dict((name, getattr(sample, name)) for name in NAMES if hasattr(sample, name))
+                for sample in samples]
+    assert results(rts2_annex3.class_root.classify_many(mappings)) == expected(samples)
+
+
+def test_tuples_classify_as_objects_do(samples):
+    rows = [tuple(getattr(sample, name, None) for name in NAMES) for sample in samples]
+    assert results(rts2_annex3.class_root.classify_many(rows, names=NAMES)) == expected(samples)
+
+
+def test_objects_classify_through_the_attribute_accessor(samples):
+    assert rts2_annex3_model.accessor_for(samples[0]) is rts2_annex3_model.ATTRIBUTE_ACCESSOR
+    assert results(rts2_annex3.class_root.classify_many(samples)) == expected(samples)
+
+
+def test_no_subjects_classify_to_nothing():
+    assert list(rts2_annex3.class_root.classify_many([])) == []
+
+
+@pytest.fixture
+def discrete_samples(make_samples):
+    """
+    Samples, each with a discrete value criterion and the name of the value it reads.
+    """
+    samples = []
+    for sample in make_samples(2000, seed=128):
+        sub_asset_class = rts2_annex3.class_root.sub_asset_class_by_name(getattr(sample, 'sub_asset_class_name', None))
+        for criterion in sub_asset_class.criteria if sub_asset_class else []:
+            if isinstance(criterion, rts2_annex3_model.DescreteValueCriterion):
+                samples.append((sample, criterion))
+                break
+    assert samples
+    return samples
+
+
+def test_missing_and_none_values_are_both_no_value(discrete_samples):
+    root = rts2_annex3.class_root
+    for sample, criterion in discrete_samples:
+        expected = "{name} got no value.  Should be one of [{values}].".format(
+            name=type(criterion).__name__, values=", ".join(criterion.concrete_options))
+        setattr(sample, criterion.selector, None)
+        as_none = root.classification_for(sample)
+        mapping = dict(vars(sample))
+        del mapping[criterion.selector]
+        delattr(sample, criterion.selector)
+        assert expected in as_none.error_messages()
+        assert root.classification_for(sample).error_messages() == as_none.error_messages()
+        assert next(root.classify_many([mapping])).error_messages() == as_none.error_messages()
+        assert rts2_annex3_model.NO_VALUE in root.validate(sample)
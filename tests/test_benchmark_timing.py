@@ -0,0 +1,16 @@
+from benchmarks import timing
+
+
+def test_results_are_compared_on_seconds_per_op():
+    baseline = [timing.result('classify', 100, 1.0)]
+    assert timing.compare([timing.result('classify', 100, 1.05)], baseline)[0][4] is False
+    assert timing.compare([timing.result('classify', 100, 1.2)], baseline)[0][4] is True
+
+
+def test_memory_is_compared_on_its_bytes():
+    baseline = [timing.result('memory', 100, 1.0, bytes_per_classification=500, compared_on='bytes_per_classification')]
+    bigger = timing.result('memory', 100, 0.5, bytes_per_classification=800, compared_on='bytes_per_classification')
+    name, baseline_figure, figure, ratio, regressed = timing.compare([bigger], baseline)[0]
+    assert (baseline_figure, figure, regressed) == (500, 800, True)
+    slower = timing.result('memory', 100, 3.0, bytes_per_classification=500, compared_on='bytes_per_classification')
+    assert timing.compare([slower], baseline)[0][4] is False
@@ -0,0 +1,108 @@
+import collections
+import copy
+import datetime
+
+import pytest
+
+import rts2_annex3_model as model
+
+
+def value(trade, name):
+    return getattr(trade, name, None)
+
+
+def good_values(values):
+    return ", ".join(values)
+
+
+# The text each error had before errors were recorded as codes, made as it was made then
+BASELINE_MESSAGES = {
+    model.NO_ASSET_CLASS: lambda trade, node: "RTS 2 has no Asset Class named '{0}'.".format(
+        value(trade, 'asset_class_name')),
+    model.NO_SUB_ASSET_CLASS: lambda trade, node: "Asset class '{0}' has no Sub-asset Class named '{1}'.".format(
+        node.name, value(trade, 'sub_asset_class_name')),
+    model.NO_VALUE: lambda trade, node: '{0} got no value.  Should be one of [{1}].'.format(
+        type(node).__name__, good_values(node.concrete_options)),
+    model.BAD_VALUE: lambda trade, node: '{0} got bad value: {1}.  Should be one of [{2}].'.format(
+        type(node).__name__, value(trade, node.selector), good_values(node.concrete_options)),
+    model.BAD_TERM_BUCKET: lambda trade, node: 'Bad term bucket. Dates: from_date={0}, to_date={1}.'.format(
+        value(trade, 'term_from_date'), value(trade, 'term_to_date')),
+    model.BAD_SWAP_MATURITY_BUCKET: lambda trade, node:
+        'Bad swap maturity bucket. Dates: from_date={0}, to_date={1}.'.format(
+            value(trade, 'swap_from_date'), value(trade, 'swap_to_date')),
+    model.BAD_OPTION_MATURITY_BUCKET: lambda trade, node:
+        'Bad option maturity bucket. Dates: from_date={0}, to_date={1}.'.format(
+            value(trade, 'from_date'), value(trade, 'to_date')),
+    model.BAD_METALS_MATURITY_BUCKET: lambda trade, node:
+        'Bad metals maturity bucket.  Metal type: {0}. Dates: from_date={1}, to_date={2}.'.format(
+            value(trade, 'metal_type'), value(trade, 'from_date'), value(trade, 'to_date')),
+    model.NO_ENERGY_TYPE: lambda trade, node: 'Bad energy maturity bucket.  Subject has no energy type.',
+    model.BAD_ENERGY_MATURITY_BUCKET: lambda trade, node:
+        'Bad energy maturity bucket.  Energy type: {0}. Dates: from_date={1}, to_date={2}.'.format(
+            value(trade, 'energy_type'), value(trade, 'from_date'), value(trade, 'to_date')),
+    model.NO_EQUITY_PARAMETER_BUCKETING: lambda trade, node:
+        '{0} error - no bucketing for parameter: {1}.  Must be one of: [{2}].'.format(
+            type(node).__name__, value(trade, 'equity_parameter'), good_values(node._options.keys())),
+    model.BAD_MATURITY_BUCKET: lambda trade, node:
+        'Bad maturity bucket dates: from_date={0}, to_date={1}.'.format(
+            value(trade, 'from_date'), value(trade, 'to_date')),
+}
+
+NAMES = ('asset_class_name', 'sub_asset_class_name')
+
+
+def spoil_values(trade):
+    for name, attribute_value in list(vars(trade).items()):
+        if name not in NAMES and isinstance(attribute_value, str):
+            setattr(trade, name, 'ZZZ')
+
+
+def spoil_maturities(trade):
+    for name, attribute_value in list(vars(trade).items()):
+        if name.endswith('to_date') and attribute_value:
+            setattr(trade, name, datetime.date(1990, 1, 1))
+
+
+def clear_values(trade):
+    for name in list(vars(trade)):
+        if name not in NAMES:
+            setattr(trade, name, None)
+
+
+@pytest.fixture(scope='module')
+def bad_trades(make_samples):
+    trades = make_samples(300, seed=45, spoiled=30)
+    for spoil in (spoil_values, spoil_maturities, clear_values):
+        for sample in make_samples(1500, seed=145):
+            trade = copy.copy(sample)
+            spoil(trade)
+            trades.append(trade)
+    return trades
+
+
+def test_messages_are_those_of_the_baseline(root, bad_trades):
+    codes = set()
+    for trade in bad_trades:
+        for error in root.classification_for(trade).errors:
+            codes.add(error.code)
+            assert str(error) == BASELINE_MESSAGES[error.code](trade, error.node)
+    assert codes == set(BASELINE_MESSAGES)
+
+
+def test_error_messages_are_in_the_order_found(root, bad_trades):
+    for trade in bad_trades:
+        classification = root.classification_for(trade)
+        assert classification.error_messages() == [str(error) for error in classification.errors]
+        assert classification.has_errors() == bool(classification.errors)
+
+
+def test_error_counts(root, bad_trades):
+    classifications = list(root.classify_many(bad_trades))
+    by_code = collections.Counter(error.code for classification in classifications
+                                  for error in classification.errors)
+    by_node = collections.Counter((error.code, error.node) for classification in classifications
+                                  for error in classification.errors)
+    assert model.error_counts(classifications) == by_code
+    assert model.error_counts(classifications, by_node=True) == by_node
+    assert sum(by_code.values()) == sum(by_node.values()) > 0
+    assert model.error_counts([]) == collections.Counter()
@@ -0,0 +1,27 @@
+import json
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def samples(make_samples):
+    return make_samples(3000, seed=41, spoiled=300)
+
+
+def test_as_json_is_byte_identical_to_dumping_the_dict(root, samples):
+    with_errors = 0
+    for sample in samples:
+        classification = root.classification_for(sample)
+        with_errors += bool(classification.errors)
+        assert classification.as_json() == json.dumps(classification.classification_dict())
+        assert classification.as_json(indent=2) == json.dumps(classification.classification_dict(), indent=2)
+    assert with_errors >= 200
+
+
+def test_as_json_of_a_sub_class_id_matches_its_classification(root, samples):
+    for sample in samples[300:1000]:
+        classification = root.classification_for(sample)
+        sub_class_id = root.sub_class_id_for(classification)
+        if sub_class_id is None:
+            continue
+        assert root.sub_class_for_id(sub_class_id).as_json() == classification.as_json()
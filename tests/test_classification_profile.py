@@ -0,0 +1,71 @@
+import pytest
+
+import classification_profile
+
+
+@pytest.fixture
+def samples(make_samples):
+    return make_samples(3000, seed=47)
+
+
+def wrapped_nodes(root):
+    return [node for labels, node in classification_profile.profiled_nodes(root)
+            if 'extend_classification' in vars(node) or '_method_wrappers' in vars(node)]
+
+
+def test_disable_removes_every_wrapper(root, samples):
+    with classification_profile.ClassificationProfiler(root) as profiler:
+        assert wrapped_nodes(root)
+        list(root.classify_many(samples))
+    assert not profiler.enabled
+    assert not wrapped_nodes(root)
+
+
+def test_classifications_are_unchanged_by_profiling(root, samples):
+    plain = [classification.as_json() for classification in root.classify_many(samples)]
+    with classification_profile.ClassificationProfiler(root):
+        profiled = [classification.as_json() for classification in root.classify_many(samples)]
+    assert profiled == plain
+
+
+def test_counts_calls_and_errors(root, samples):
+    with classification_profile.ClassificationProfiler(root) as profiler:
+        classifications = list(root.classify_many(samples))
+    [(total_key, total)] = profiler.totals_by().items()
+    assert total.calls == sum(1 for classification in classifications if classification.sub_asset_class)
+    assert total.errors == sum(len(classification.errors) for classification in classifications)
+
+
+def test_delegated_criteria_are_not_counted_twice(root, samples):
+    ticks = iter(range(10 ** 9))
+    with classification_profile.ClassificationProfiler(root, clock=lambda: next(ticks)) as profiler:
+        list(root.classify_many(samples))
+    delegated = [labels for labels in profiler.counts if classification_profile.is_delegated(labels)]
+    assert delegated
+    by_type = profiler.totals_by('criterion_type')
+    assert not any(classification_profile.DELEGATION_SEPARATOR in (key[0] or '') for key in by_type)
+    composite_calls = sum(counts.calls for (type_name,), counts in by_type.items()
+                          if type_name in ('MetalsMaturityBucketCriterion', 'EnergyMaturityBucketCriterion',
+                                           'EquityParameterMaturityBucketCriterion'))
+    delegated_calls = sum(profiler.counts[labels].calls for labels in delegated)
+    assert 0 < delegated_calls <= composite_calls
+    assert sum(row['delegated'] for row in profiler.snapshot()['nodes']) == len(delegated)
+
+
+def test_profilers_can_be_disabled_in_any_order(root, samples):
+    first = classification_profile.ClassificationProfiler(root).enable()
+    second = classification_profile.ClassificationProfiler(root).enable()
+    first.disable()
+    list(root.classify_many(samples[:100]))
+    assert sum(counts.calls for counts in first.counts.values()) == 0
+    assert sum(counts.calls for counts in second.counts.values()) > 0
+    second.disable()
+    assert not wrapped_nodes(root)
+
+
+def test_prometheus_text(root, samples):
+    with classification_profile.ClassificationProfiler(root) as profiler:
+        list(root.classify_many(samples[:100]))
+    lines = profiler.prometheus_text().splitlines()
+    assert '# TYPE rts2_classification_calls_total counter' in lines
+    assert any(line.startswith('rts2_classification_seconds_total{asset_class="') for line in lines)
@@ -0,0 +1,111 @@
+import io
+import json
+
+import pytest
+
+import classification_profile
+import classification_trace
+
+
+@pytest.fixture
+def samples(make_samples):
+    return make_samples(2000, seed=50)
+
+
+def has_wrappers(root):
+    nodes = [root] + list(root.asset_classes) + [node for labels, node in classification_profile.profiled_nodes(root)]
+    return any('_method_wrappers' in vars(node) or 'extend_classification' in vars(node)
+               or 'classification_for' in vars(node) for node in nodes)
+
+
+def full_path_traced(root, samples):
+    tracer = classification_trace.ClassificationTracer(root, sample_every=1, capacity=10).enable()
+    try:
+        root.classification_for(samples[0])
+    finally:
+        tracer.disable()
+    [trace] = tracer.traces()
+    return trace
+
+
+def test_classifications_are_unchanged_by_tracing(root, samples):
+    plain = [classification.as_json() for classification in root.classify_many(samples)]
+    with classification_trace.ClassificationTracer(root, sample_every=7):
+        traced = [classification.as_json() for classification in root.classify_many(samples)]
+    assert traced == plain
+    assert not has_wrappers(root)
+
+
+def test_sampled_trace_has_the_full_path(root, samples):
+    trace = full_path_traced(root, samples)
+    assert trace['reason'] == 'sampled'
+    steps = trace['steps']
+    assert [step['step'] for step in steps[:2]] == ['asset class', 'sub-asset class']
+    assert steps[0]['name'] == samples[0].asset_class_name
+    assert steps[1]['name'] == samples[0].sub_asset_class_name
+    assert all(step['outcome'] for step in steps)
+
+
+def test_one_in_n_are_sampled(root, samples):
+    with classification_trace.ClassificationTracer(
+            root, sample_every=100, trace_errors=False, capacity=1000) as tracer:
+        list(root.classify_many(samples))
+    assert len(tracer.traces()) == len(samples) // 100
+
+
+def test_ring_buffer_is_bounded(root, samples):
+    with classification_trace.ClassificationTracer(root, sample_every=1, capacity=5) as tracer:
+        list(root.classify_many(samples[:50]))
+    assert len(tracer.traces()) == 5
+
+
+def test_failing_trades_are_traced(root, samples):
+    samples[3].sub_asset_class_name = 'No such sub-asset class'
+    with classification_trace.ClassificationTracer(root, sample_every=None, slow_seconds=None) as tracer:
+        classifications = list(root.classify_many(samples[:10]))
+    failed = [classification for classification in classifications if classification.errors]
+    assert len(tracer.traces()) == len(failed) >= 1
+    trace = next(trace for trace in tracer.traces() if trace['sub_asset_class_name'] == 'No such sub-asset class')
+    assert trace['reason'] == 'error'
+    assert trace['steps'][0]['outcome'].startswith('error: ')
+
+
+def test_slow_trades_are_traced_from_their_only_classification(root, samples):
+    with classification_profile.ClassificationProfiler(root) as profiler:
+        with classification_trace.ClassificationTracer(root, sample_every=None, slow_seconds=0.0) as tracer:
+            classifications = list(root.classify_many(samples[:20]))
+    assert len(tracer.traces()) == 20
+    assert all(trace['reason'] == 'slow' for trace in tracer.traces())
+    # Each trade was classified once, not again to record its path
+    [(key, total)] = profiler.totals_by().items()
+    assert total.calls == sum(1 for classification in classifications if classification.sub_asset_class)
+
+
+@pytest.mark.parametrize('profiler_first', [True, False])
+@pytest.mark.parametrize('profiler_disabled_first', [True, False])
+def test_tracer_and_profiler_in_either_order(root, samples, profiler_first, profiler_disabled_first):
+    expected_steps = len(full_path_traced(root, samples)['steps'])
+    profiler = classification_profile.ClassificationProfiler(root)
+    tracer = classification_trace.ClassificationTracer(root, sample_every=1, capacity=10)
+    for tool in ([profiler, tracer] if profiler_first else [tracer, profiler]):
+        tool.enable()
+    (profiler if profiler_disabled_first else tracer).disable()
+    root.classification_for(samples[0])
+    if profiler_disabled_first:
+        assert len(tracer.traces()[-1]['steps']) == expected_steps
+        assert sum(counts.calls for counts in profiler.counts.values()) == 0
+    else:
+        assert not tracer.traces()
+        assert sum(counts.calls for counts in profiler.counts.values()) > 0
+    (tracer if profiler_disabled_first else profiler).disable()
+    assert not has_wrappers(root)
+
+
+def test_dump_writes_json_lines(root, samples):
+    with classification_trace.ClassificationTracer(root, sample_every=10, capacity=100) as tracer:
+        list(root.classify_many(samples[:100]))
+    stream = io.StringIO()
+    tracer.dump(stream)
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == len(tracer.traces())
+    assert all(json.loads(line)['steps'] for line in lines)
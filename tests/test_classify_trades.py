@@ -0,0 +1,52 @@
+import pyarrow.parquet
+import pytest
+
+import classify_trades
+import trade_files
+
+
+@pytest.fixture
+def trades_path(root, make_samples, tmp_path):
+    path = str(tmp_path / 'trades.csv')
+    with trade_files.writer_for(path, trade_files.columns_for(root)) as writer:
+        writer.write_all(make_samples(300, seed=27, spoiled=30))
+    return path
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_cli_writes_each_trade_with_its_classification(root, trades_path, tmp_path, workers):
+    output_path = str(tmp_path / 'classified.parquet')
+    assert classify_trades.main([trades_path, output_path, '--workers', str(workers), '--chunk-size', '64']) == 0
+    table = pyarrow.parquet.read_table(output_path)
+    assert table.schema.field('sub_class_id').type == pyarrow.int64()
+    assert table.num_rows == 300
+    reader = trade_files.reader_for(trades_path, columns=trade_files.columns_for(root))
+    rows = [row for chunk in reader for row in chunk]
+    classified = table.to_pylist()
+    ids = dict()
+    for row, written in zip(rows, classified):
+        classification = next(root.classify_many([row], names=reader.names))
+        assert written['sub_class_key'] == classification.sub_class_key()
+        assert written['errors'] == '; '.join(classification.error_messages())
+        if written['sub_class_key'] is None:
+            assert written['sub_class_id'] is None
+        else:
+            # IDs are handed out in the order sub-classes are first met
+            assert written['sub_class_id'] == ids.setdefault(written['sub_class_key'], len(ids))
+    assert any(written['errors'] for written in classified)
+
+
+@pytest.mark.parametrize('input_name', ['empty.csv', 'empty.jsonl'])
+def test_empty_input_gives_an_empty_file_with_a_schema(root, tmp_path, input_name):
+    input_path = tmp_path / input_name
+    if input_name.endswith('.csv'):
+        input_path.write_text(','.join(name for name, _ in trade_files.columns_for(root)) + '\n')
+    else:
+        input_path.write_text('')
+    output_path = str(tmp_path / 'classified.parquet')
+    run = classify_trades.ClassificationRun(str(input_path), output_path).run()
+    assert run.row_count == 0
+    schema = pyarrow.parquet.read_schema(output_path)
+    assert schema.names[-3:] == ['sub_class_id', 'sub_class_key', 'errors']
+    assert schema.field('sub_class_id').type == pyarrow.int64()
+    assert pyarrow.parquet.read_table(output_path).num_rows == 0
@@ -0,0 +1,43 @@
+import rts2_annex3
+
+
+def all_criteria(root):
+    """
+    I generate every criterion, with the bucket criteria nested in composite criteria.
+    """
+    for sub_asset_class in root.all_sub_asset_classes():
+        for criterion in sub_asset_class.criteria:
+            yield criterion
+            for bucket_criterion in criterion.bucket_criteria():
+                yield bucket_criterion
+
+
+def computed_names(criterion):
+    number = criterion.parent.criterion_number_for(criterion)
+    name = 'Segmentation criterion {n}'.format(n=number)
+    return number, name, name + ' description'
+
+
+def frozen_names(criterion):
+    return criterion.criterion_number, criterion.criterion_name, criterion.description_name
+
+
+def test_frozen_names_are_those_worked_out_from_the_tree():
+    criteria = list(all_criteria(rts2_annex3.class_root))
+    assert any(criterion.parent in criteria for criterion in criteria)
+    for criterion in criteria:
+        assert criterion._criterion_number is not None
+        assert frozen_names(criterion) == computed_names(criterion)
+
+
+def test_nested_bucket_criteria_take_the_number_of_their_composite():
+    for criterion in all_criteria(rts2_annex3.class_root):
+        for bucket_criterion in criterion.bucket_criteria():
+            assert frozen_names(bucket_criterion) == frozen_names(criterion)
+
+
+def test_freeze_again_changes_nothing():
+    criteria = list(all_criteria(rts2_annex3.class_root))
+    before = [frozen_names(criterion) for criterion in criteria]
+    assert rts2_annex3.class_root.freeze() is rts2_annex3.class_root
+    assert [frozen_names(criterion) for criterion in criteria] == before
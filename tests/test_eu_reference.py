@@ -0,0 +1,89 @@
+import io
+
+import numpy
+import pytest
+
+import eu_reference
+
+
+@pytest.fixture(scope='module')
+def rows(root, make_samples):
+    sub_class_keys = []
+    for classification in root.classify_many(make_samples(500, seed=36)):
+        if not classification.errors and classification.sub_class_key() not in sub_class_keys:
+            sub_class_keys.append(classification.sub_class_key())
+    return [(sub_class_key, index % 3 == 0, index * 7, index * 1.5e6, index * 2.5e4)
+            for index, sub_class_key in enumerate(sub_class_keys)]
+
+
+def csv_text(rows):
+    # The columns in another order, with one which is ignored
+    lines = ['adna,sub_class_key,note,eu_notional_sum,is_liquid,eu_trade_count']
+    for sub_class_key, is_liquid, eu_trade_count, eu_notional_sum, adna in rows:
+        lines.append('{adna!r},"{key}",x,{eu_notional_sum!r},{is_liquid},{eu_trade_count}'.format(
+            adna=adna, key=sub_class_key.replace('"', '""'), eu_notional_sum=eu_notional_sum,
+            is_liquid='Yes' if is_liquid else 'No', eu_trade_count=eu_trade_count))
+    return '\n'.join(lines) + '\n'
+
+
+def assert_has_rows(store, rows):
+    assert len(store) == len(rows)
+    for sub_class_key, is_liquid, eu_trade_count, eu_notional_sum, adna in rows:
+        eu_data = store.eu_data_for(sub_class_key)
+        assert (eu_data.is_liquid, eu_data.eu_trade_count, eu_data.eu_notional_sum) \
+            == (is_liquid, eu_trade_count, eu_notional_sum)
+        assert store.adna_for(sub_class_key) == adna
+
+
+def test_from_rows(rows):
+    assert_has_rows(eu_reference.EUReferenceStore.from_rows(rows), rows)
+
+
+def test_from_rows_with_no_rows():
+    store = eu_reference.EUReferenceStore.from_rows([])
+    assert len(store) == 0
+    assert store.join(['{}'])['found'].tolist() == [False]
+
+
+def test_from_csv(rows, tmp_path):
+    assert_has_rows(eu_reference.EUReferenceStore.from_csv(io.StringIO(csv_text(rows))), rows)
+    path = tmp_path / 'eu_sub_classes.csv'
+    path.write_text(csv_text(rows))
+    assert_has_rows(eu_reference.EUReferenceStore.from_csv(str(path)), rows)
+
+
+def test_duplicate_keys_are_refused(rows):
+    with pytest.raises(ValueError):
+        eu_reference.EUReferenceStore.from_rows(rows + rows[:1])
+
+
+def test_save_then_load_memory_mapped(rows, tmp_path):
+    directory = str(tmp_path / 'eu_reference')
+    eu_reference.EUReferenceStore.from_rows(rows).save(directory)
+    store = eu_reference.EUReferenceStore.load(directory)
+    for name, dtype in eu_reference.COLUMNS:
+        assert isinstance(store.arrays[name], numpy.memmap)
+        assert store.arrays[name].dtype == dtype
+    assert_has_rows(store, rows)
+    assert_has_rows(eu_reference.EUReferenceStore.load(directory, mmap_mode=None), rows)
+
+
+def test_join_leaves_missing_ids_with_zero_figures(rows):
+    store = eu_reference.EUReferenceStore.from_rows(rows[1:])
+    missing = rows[0][0]
+    sub_class_keys = [rows[2][0], missing, rows[1][0], 'not a sub-class key', rows[2][0]]
+    joined = store.join(sub_class_keys)
+    assert joined['found'].tolist() == [True, False, True, False, True]
+    assert store.eu_data_for(missing) is None
+    assert store.adna_for(missing) is None
+    for name, dtype in eu_reference.COLUMNS:
+        column = joined[name]
+        assert column.dtype == dtype
+        assert column[1] == 0 and column[3] == 0
+    for index, sub_class_key in enumerate(sub_class_keys):
+        if joined['found'][index]:
+            eu_data = store.eu_data_for(sub_class_key)
+            assert joined['is_liquid'][index] == eu_data.is_liquid
+            assert joined['eu_trade_count'][index] == eu_data.eu_trade_count
+            assert joined['eu_notional_sum'][index] == eu_data.eu_notional_sum
+            assert joined['adna'][index] == store.adna_for(sub_class_key)
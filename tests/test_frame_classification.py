@@ -0,0 +1,56 @@
+import datetime
+
+import pandas
+import pytest
+
+import rts2_annex3
+import frame_classification
+
+
+def frame_of(samples):
+    names = [name for name, _ in rts2_annex3.class_root.subject_attributes()]
+    return pandas.DataFrame.from_records([[getattr(sample, name, None) for name in names] for sample in samples],
+                                         columns=names)
+
+
+def assert_frame_matches_classification_for(samples):
+    result = frame_classification.classify_frame(frame_of(samples))
+    root = rts2_annex3.class_root
+    for sample, (sub_class_id, sub_class_key, errors) in zip(
+            samples, result[['sub_class_id', 'sub_class_key', 'errors']].itertuples(index=False)):
+        classification = root.classification_for(sample)
+        assert errors == '; '.join(classification.error_messages())
+        assert (sub_class_key if isinstance(sub_class_key, str) else None) == classification.sub_class_key()
+        expected_id = root.sub_class_id_for(classification)
+        assert sub_class_id == (-1 if expected_id is None else expected_id)
+
+
+@pytest.fixture
+def samples(make_samples):
+    return make_samples(4000, seed=29)
+
+
+def test_frame_classification_matches_classification_for(samples):
+    for index, sample in enumerate(samples[:400]):
+        if index % 4 == 0:
+            sample.sub_asset_class_name = 'No such sub-asset class'
+        elif index % 4 == 1:
+            sample.asset_class_name = 'No such asset class'
+        else:
+            for name in list(vars(sample)):
+                if name.endswith('to_date'):
+                    setattr(sample, name, getattr(sample, name) + datetime.timedelta(days=(index % 4 - 2.5) * 8000))
+    assert_frame_matches_classification_for(samples)
+
+
+def test_missing_values_are_none_not_nan(samples):
+    energy = [sample for sample in samples if getattr(sample, 'energy_type', None)]
+    assert energy
+    for sample in energy[::2]:
+        sample.energy_type = None
+    for index, sample in enumerate(samples):
+        if index % 7 == 0 and getattr(sample, 'notional_currency', None):
+            sample.notional_currency = None
+    assert_frame_matches_classification_for(samples)
+    result = frame_classification.classify_frame(frame_of(samples))
+    assert not result['errors'].str.contains('nan').any()
@@ -0,0 +1,104 @@
+import copy
+import datetime
+
+import pytest
+
+import liquidity
+from conftest import FIRST_DATE
+
+# Two weeks of trading days, from Monday 1 January 2018
+TRADING_DAYS = liquidity.trading_days(FIRST_DATE, FIRST_DATE + datetime.timedelta(days=13))
+
+
+@pytest.fixture(scope='module')
+def trades_by_day(root, make_trades):
+    trades = make_trades(3000, seed=40, days=14)
+    # One bond futures/forwards sub-class trades well above its criteria every day
+    liquid_trade = next(trade for trade in trades if getattr(trade, 'sub_asset_class_name', None) == 'Bond futures/forwards')
+    liquid_trade.eur_notional = 1e6
+    trades_by_day = dict((day, []) for day in TRADING_DAYS)
+    for trade in trades:
+        if trade.trade_date in trades_by_day:
+            trades_by_day[trade.trade_date].append(trade)
+    for day in TRADING_DAYS:
+        trades_by_day[day].extend(copy.copy(liquid_trade) for _ in range(12))
+    return sorted(trades_by_day.items())
+
+
+@pytest.fixture(scope='module')
+def assessment(root, trades_by_day):
+    assessment = liquidity.LiquidityAssessment(root, TRADING_DAYS)
+    for trade_date, trades in trades_by_day:
+        assessment.add_day(trade_date, trades)
+    return assessment
+
+
+def expected_totals(root, trades_by_day):
+    totals = dict()
+    for trade_date, trades in trades_by_day:
+        for trade in trades:
+            classification = root.classification_for(trade)
+            if root.sub_class_id_for(classification) is not None:
+                count, notional = totals.get(classification.sub_class_key(), (0, 0))
+                totals[classification.sub_class_key()] = (count + 1, notional + abs(trade.eur_notional))
+    return totals
+
+
+def test_trading_days_are_weekdays_which_are_not_holidays():
+    days = liquidity.trading_days(FIRST_DATE, FIRST_DATE + datetime.timedelta(days=13), holidays=[FIRST_DATE])
+    assert days == TRADING_DAYS[1:]
+    assert len(TRADING_DAYS) == 10
+
+
+def test_add_day_totals_each_sub_class(root, trades_by_day, assessment):
+    totals = expected_totals(root, trades_by_day)
+    assert sorted(totals) == sorted(assessment.sub_class_keys)
+    for (sub_class_key, is_liquid, trade_count, notional_sum, adna) in assessment.reference_rows():
+        assert (trade_count, notional_sum) == totals[sub_class_key]
+        assert adna == pytest.approx(notional_sum / len(TRADING_DAYS))
+    assert assessment.number_of_trading_days() == len(TRADING_DAYS)
+
+
+def test_add_day_refuses_earlier_days(root, trades_by_day):
+    assessment = liquidity.LiquidityAssessment(root, TRADING_DAYS)
+    assessment.add_day(TRADING_DAYS[1], trades_by_day[1][1])
+    with pytest.raises(ValueError):
+        assessment.add_day(TRADING_DAYS[0], trades_by_day[0][1])
+
+
+def test_assess_against_the_liquidity_criteria(assessment):
+    statuses = assessment.assess()
+    assert any(status.is_liquid for status in statuses.values())
+    assert not all(status.is_liquid for status in statuses.values())
+    for sub_class_key, status in statuses.items():
+        criteria = assessment._criteria_by_key[sub_class_key]
+        expected = True
+        if criteria.average_daily_notional_amount is not None:
+            expected = expected and status.adna >= criteria.average_daily_notional_amount.amount
+        if criteria.average_daily_number_of_trades is not None:
+            expected = expected and status.average_daily_trades >= criteria.average_daily_number_of_trades
+        assert status.is_liquid == expected
+
+
+def test_assess_as_of_an_earlier_day(assessment):
+    as_of = TRADING_DAYS[4]
+    assert assessment.number_of_trading_days(as_of) == 5
+    for sub_class_key, status in assessment.assess(as_of).items():
+        assert status.adna == pytest.approx(assessment.notional_sums[assessment.sub_class_keys.index(sub_class_key)] / 5)
+
+
+def test_sub_classes_without_liquidity_criteria_are_not_assessable(root, assessment):
+    without_sub_asset_class = [sub_class_key for sub_class_key in assessment.sub_class_keys
+                               if root.classification_for_key(sub_class_key).sub_asset_class is None]
+    assert without_sub_asset_class
+    statuses = assessment.assess()
+    rows = dict((row[0], row) for row in assessment.reference_rows())
+    for sub_class_key in assessment.sub_class_keys:
+        criteria = assessment._criteria_by_key[sub_class_key]
+        if criteria and (criteria.average_daily_notional_amount is not None
+                         or criteria.average_daily_number_of_trades is not None):
+            assert sub_class_key in statuses
+        else:
+            assert sub_class_key not in statuses
+            assert rows[sub_class_key][1] is False
+    assert not set(without_sub_asset_class) & set(statuses)
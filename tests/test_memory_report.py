@@ -0,0 +1,64 @@
+COLUMNS = ['component', 'asset_class', 'sub_asset_class', 'criterion', 'items', 'bytes']
+CACHES = ['sub-class ID cache', 'sub-class identity cache', 'sub-class key cache', 'validation index']
+
+
+def totals(report, component):
+    rows = [row for row in report if row['component'] == component]
+    return sum(row['items'] for row in rows), sum(row['bytes'] for row in rows)
+
+
+def test_report_structure(fresh_root):
+    report = fresh_root.memory_report()
+    assert all(list(row) == COLUMNS for row in report)
+    assert [row['bytes'] for row in report] == sorted((row['bytes'] for row in report), reverse=True)
+    for row in report:
+        assert isinstance(row['items'], int) and row['items'] >= 0
+        assert isinstance(row['bytes'], int) and row['bytes'] >= 0
+        if row['component'] in CACHES:
+            assert (row['asset_class'], row['sub_asset_class'], row['criterion']) == (None, None, None)
+        else:
+            sub_asset_class = fresh_root.sub_asset_class_by_name(row['sub_asset_class'])
+            assert sub_asset_class.parent.name == row['asset_class']
+    assert sorted(row['component'] for row in report if row['component'] in CACHES) == sorted(CACHES)
+    # Maturity buckets are only made when first needed
+    assert totals(report, 'maturity buckets') == (0, 0)
+    assert totals(report, 'extrapolated maturity buckets') == (0, 0)
+    assert totals(report, 'thresholds')[0] == sum(
+        1 for sub_asset_class in fresh_root.all_sub_asset_classes() if sub_asset_class.thresholds is not None)
+
+
+def test_criterion_rows_are_those_of_retained_memory(fresh_root):
+    report = fresh_root.memory_report()
+    for sub_asset_class in fresh_root.all_sub_asset_classes():
+        for criterion in sub_asset_class.criteria:
+            rows = [(row['component'], row['items'], row['bytes']) for row in report
+                    if row['sub_asset_class'] == sub_asset_class.name and row['criterion'] == criterion.full_name()]
+            assert sorted(rows) == sorted(criterion.retained_memory())
+
+
+def classify(root, samples):
+    for classification in root.classify_many(samples):
+        root.sub_class_id_for(classification)
+
+
+def test_counts_grow_after_extrapolation(fresh_root, make_samples):
+    classify(fresh_root, make_samples(500, seed=49))
+    before = fresh_root.memory_report()
+    assert totals(before, 'maturity buckets')[0] > 0
+    classify(fresh_root, make_samples(500, seed=49, years_later=40))
+    after = fresh_root.memory_report()
+    assert totals(after, 'maturity buckets') == totals(before, 'maturity buckets')
+    assert totals(after, 'extrapolated maturity buckets')[0] > totals(before, 'extrapolated maturity buckets')[0]
+    assert totals(after, 'extrapolated maturity buckets')[1] > totals(before, 'extrapolated maturity buckets')[1]
+    for cache in CACHES[:2]:
+        assert totals(after, cache)[0] > totals(before, cache)[0]
+
+
+def test_key_cache_grows_with_keys(fresh_root, make_samples):
+    classifications = [classification for classification in fresh_root.classify_many(make_samples(200, seed=149))
+                       if not classification.errors]
+    before = totals(fresh_root.memory_report(), 'sub-class key cache')
+    for classification in classifications:
+        fresh_root.sub_class_id_for_key(classification.sub_class_key())
+    after = totals(fresh_root.memory_report(), 'sub-class key cache')
+    assert after[0] > before[0] and after[1] > before[1]
@@ -0,0 +1,111 @@
+import datetime
+import itertools
+
+import pytest
+
+import eu_reference
+import rts2_annex3
+import si_calculation
+from conftest import FIRST_DATE
+
+EEA_MICS = ['EEA1']
+
+
+class WindowEUData(object):
+    """
+    EU data which depends on the aggregates of the period, as synthetic EU data does, and
+    not in proportion to them, so that stale EU data changes statuses.
+    """
+
+    def __init__(self, scale=40):
+        self.scale = scale
+
+    def eu_data_for(self, sub_class_key, aggregate=None):
+        return si_calculation.EUSubClassData(
+            is_liquid=sum(map(ord, sub_class_key)) % 2 == 0,
+            eu_trade_count=aggregate.trade_count ** 2 * self.scale,
+            eu_notional_sum=aggregate.notional_sum * self.scale)
+
+
+@pytest.fixture(scope='module')
+def trades(make_trades):
+    return make_trades(6000, seed=31, asset_class='Credit Derivatives')
+
+
+def window_statuses(trades, last_date, window_weeks, eu_data):
+    first_week = si_calculation.week_number(last_date) - window_weeks + 1
+    window = [trade for trade in trades
+              if first_week <= si_calculation.week_number(trade.trade_date) and trade.trade_date <= last_date]
+    return si_calculation.SICalculation(rts2_annex3.class_root, EEA_MICS, eu_data).add_trades(window).si_statuses()
+
+
+def test_rolling_statuses_follow_eu_data_of_the_window(trades):
+    by_date = dict()
+    for trade in trades:
+        by_date.setdefault(trade.trade_date, []).append(trade)
+    eu_data = WindowEUData()
+    rolling = si_calculation.RollingSICalculation(rts2_annex3.class_root, EEA_MICS, eu_data, window_weeks=4)
+    for day in range(120):
+        trade_date = FIRST_DATE + datetime.timedelta(days=day)
+        rolling.add_day(by_date.get(trade_date, []), trade_date)
+        assert rolling.si_statuses() == window_statuses(trades, trade_date, 4, eu_data)
+
+
+def test_replacing_eu_data_recomputes_statuses(trades):
+    last_date = FIRST_DATE + datetime.timedelta(days=119)
+    rolling = si_calculation.RollingSICalculation(rts2_annex3.class_root, EEA_MICS, WindowEUData(), window_weeks=30)
+    rolling.add_day(trades, last_date)
+    rolling.si_statuses()
+    rolling.eu_data = WindowEUData(scale=0.001)
+    assert rolling.si_statuses() == window_statuses(trades, last_date, 30, WindowEUData(scale=0.001))
+
+
+def test_eu_data_is_looked_up_once_per_period(trades):
+    class CountingEUData(WindowEUData):
+        lookups = 0
+
+        def eu_data_for(self, sub_class_key, aggregate=None):
+            CountingEUData.lookups += 1
+            return super(CountingEUData, self).eu_data_for(sub_class_key, aggregate)
+
+    calculation = si_calculation.SICalculation(rts2_annex3.class_root, EEA_MICS, CountingEUData())
+    calculation.add_trades(trades[:3000])
+    calculation.si_statuses()
+    calculation.si_statuses()
+    assert CountingEUData.lookups == len(calculation.aggregates)
+
+
+def edge_calculation(trades):
+    """
+    I return a calculation whose aggregates and EU data are made to lie on, just below
+    and just above each threshold of the SI tests, in every combination, and the rows
+    of that EU data.  The last sub-class has no EU data.
+    """
+    calculation = si_calculation.SICalculation(rts2_annex3.class_root, EEA_MICS, None).add_trades(trades)
+    weeks = calculation.number_of_weeks
+    edges = list(itertools.product([True, False], [-1, 0, 1], [-1, 0, 1], [-1, 0, 1], [-1, 0, 1]))
+    sub_class_ids = list(calculation.aggregates)
+    assert len(sub_class_ids) > len(edges)
+    rows = []
+    for sub_class_id, (is_liquid, weekly, eu_trades, lei_notional, eu_notional) in zip(sub_class_ids, edges):
+        aggregate = calculation.aggregates[sub_class_id]
+        aggregate.trade_count = weeks + weekly
+        aggregate.notional_sum = 1e6 * (sub_class_id + 1)
+        aggregate.lei_notional_sum = aggregate.notional_sum * 4 + lei_notional
+        rows.append((calculation.sub_class_key(sub_class_id), is_liquid,
+                     aggregate.trade_count * 40 + eu_trades, aggregate.notional_sum * 100 + eu_notional, 0.0))
+    return calculation, rows
+
+
+@pytest.mark.parametrize('make_eu_data', [
+    lambda rows: si_calculation.EUDataTable((row[0], si_calculation.EUSubClassData(*row[1:4])) for row in rows),
+    eu_reference.EUReferenceStore.from_rows,
+], ids=['eu_data_for', 'join'])
+def test_status_codes_agree_with_statuses_across_threshold_edges(make_trades, make_eu_data):
+    calculation, rows = edge_calculation(make_trades(4000, seed=34))
+    calculation.eu_data = make_eu_data(rows)
+    sub_class_ids, codes = calculation.si_status_code_array()
+    assert sorted(sub_class_ids) == sorted(calculation.aggregates)
+    for sub_class_id, code in zip(sub_class_ids, codes):
+        assert si_calculation.SI_STATUSES[code] == calculation.si_status(sub_class_id)
+    assert set(codes) == set(range(len(si_calculation.SI_STATUSES)))
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+import rts2_annex3
+import si_calculation
+import si_shards
+
+EEA_MICS = ['XLON', 'XPAR']
+
+
+class FixedEUData(object):
+    """
+    EU data which depends only on the sub-class key, so that every run sees the same.
+    """
+
+    def eu_data_for(self, sub_class_key, aggregate=None):
+        seed = sum(map(ord, sub_class_key))
+        return si_calculation.EUSubClassData(seed % 2 == 0, seed % 100, 1e8 + seed)
+
+
+@pytest.fixture(scope='module')
+def trades(make_trades):
+    return make_trades(5000, seed=42, days=180, mics=('XLON', 'XPAR', 'XOFF'), leis=('LEI_A', 'LEI_B', 'LEI_C'))
+
+
+def report(report_items):
+    return sorted(json.dumps(item, sort_keys=True) for item in report_items)
+
+
+def single_pass(trades):
+    calculation = si_calculation.SICalculation(rts2_annex3.class_root, EEA_MICS, FixedEUData())
+    return calculation.add_trades(trades)
+
+
+@pytest.mark.parametrize('shard_of', [
+    lambda trade: trade.trade_date,
+    lambda trade: id(trade) % 7,
+], ids=['by_date', 'by_desk'])
+def test_sharded_calculation_reports_as_a_single_pass(trades, shard_of):
+    shards = dict()
+    for trade in trades:
+        shards.setdefault(shard_of(trade), []).append(trade)
+    sharded = si_shards.sharded_calculation(
+        rts2_annex3.class_root, list(shards.values()), EEA_MICS, FixedEUData(), workers=2)
+    expected = single_pass(trades)
+    assert report(sharded.report_items()) == report(expected.report_items())
+    assert sharded.trade_count == expected.trade_count
+    assert sharded.unclassified_count == expected.unclassified_count
+
+
+def test_multi_lei_reports_as_a_pass_per_lei(trades):
+    multi_lei = si_calculation.MultiLEISICalculation(rts2_annex3.class_root, EEA_MICS, FixedEUData())
+    multi_lei.add_trades(trades)
+    reports = si_shards.lei_reports(multi_lei, workers=2)
+    assert sorted(reports) == ['LEI_A', 'LEI_B', 'LEI_C']
+    for lei in multi_lei.leis():
+        expected = single_pass(trade for trade in trades if trade.lei == lei)
+        assert report(reports[lei]) == report(expected.report_items())
+
+
+def test_added_partials_use_the_roots_sub_class_ids(trades):
+    half = len(trades) // 2
+    calculation = single_pass(trades[:half])
+    calculation.add_partial(single_pass(trades[half:]).partial())
+    for sub_class_id in calculation.aggregates:
+        sub_class_key = calculation.sub_class_key(sub_class_id)
+        assert rts2_annex3.class_root.sub_class_for_id(sub_class_id).sub_class_key() == sub_class_key
+    assert report(calculation.report_items()) == report(single_pass(trades).report_items())
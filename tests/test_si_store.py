@@ -0,0 +1,106 @@
+import datetime
+
+import pytest
+
+import si_calculation
+import si_store
+from conftest import FIRST_DATE
+
+EEA_MICS = ['EEA1']
+
+# Eight weeks of trading days, from Monday 1 January 2018
+DAYS = [FIRST_DATE + datetime.timedelta(days=day) for day in range(56)]
+
+
+class KeyedEUData(object):
+    """
+    EU data which depends only on the sub-class key and the aggregate, so that the
+    store and an in-memory calculation over the same trades get the same EU data.
+    """
+
+    def eu_data_for(self, sub_class_key, aggregate=None):
+        return si_calculation.EUSubClassData(
+            is_liquid=sum(map(ord, sub_class_key)) % 2 == 0,
+            eu_trade_count=aggregate.trade_count * 30,
+            eu_notional_sum=aggregate.notional_sum * 60)
+
+
+@pytest.fixture(scope='module')
+def trades_by_day(make_trades):
+    trades_by_day = dict((day, []) for day in DAYS)
+    for trade in make_trades(4000, seed=32, asset_class='Credit Derivatives', days=len(DAYS)):
+        trades_by_day[trade.trade_date].append(trade)
+    return trades_by_day
+
+
+def aggregates_by_key(calculation):
+    return dict(
+        (calculation.sub_class_key(sub_class_id),
+         (aggregate.trade_count, aggregate.notional_sum, aggregate.lei_trade_count, aggregate.lei_notional_sum))
+        for sub_class_id, aggregate in calculation.aggregates.items())
+
+
+def statuses_by_key(calculation):
+    return dict((calculation.sub_class_key(sub_class_id), status)
+                for sub_class_id, status in calculation.si_statuses().items())
+
+
+def in_memory(root, trades, eu_data=None):
+    return si_calculation.SICalculation(root, EEA_MICS, eu_data).add_trades(trades)
+
+
+def test_days_of_one_week_are_merged_into_one_row(root, trades_by_day):
+    with si_store.SIAggregateStore(':memory:', root, EEA_MICS) as store:
+        for day in DAYS[:7]:
+            store.ingest_day(day, trades_by_day[day])
+        week = si_calculation.week_number(DAYS[0])
+        rows = store.connection.execute(
+            'SELECT sub_class_id, count(*) FROM weekly_aggregate WHERE week = ? GROUP BY sub_class_id',
+            (week,)).fetchall()
+        assert rows and all(count == 1 for sub_class_id, count in rows)
+        calculation = store.calculation(None, week, week)
+        week_trades = [trade for day in DAYS[:7] for trade in trades_by_day[day]]
+        assert aggregates_by_key(calculation) == aggregates_by_key(in_memory(root, week_trades))
+
+
+def test_a_day_is_ingested_only_once(root, trades_by_day):
+    with si_store.SIAggregateStore(':memory:', root, EEA_MICS) as store:
+        assert store.ingest_day(DAYS[0], trades_by_day[DAYS[0]]) == len(trades_by_day[DAYS[0]])
+        assert store.is_ingested(DAYS[0])
+        assert not store.is_ingested(DAYS[1])
+        week = si_calculation.week_number(DAYS[0])
+        before = aggregates_by_key(store.calculation(None, week, week))
+        with pytest.raises(ValueError):
+            store.ingest_day(DAYS[0], trades_by_day[DAYS[0]])
+        assert aggregates_by_key(store.calculation(None, week, week)) == before
+        assert store.ingested_dates() == [DAYS[0].isoformat()]
+
+
+def test_reloaded_store_reproduces_the_in_memory_statuses(root, trades_by_day, tmp_path):
+    path = str(tmp_path / 'si.sqlite')
+    for day in DAYS:
+        # A new process each day, as a daily job would be
+        with si_store.SIAggregateStore(path, root, EEA_MICS) as store:
+            store.ingest_day(day, trades_by_day[day])
+    eu_data = KeyedEUData()
+    with si_store.SIAggregateStore(path, root, EEA_MICS) as store:
+        assert len(store.ingested_dates()) == len(DAYS)
+        for window_weeks in (1, 4, 8):
+            first_week = si_calculation.week_number(DAYS[-1]) - window_weeks + 1
+            window = [trade for day in DAYS if si_calculation.week_number(day) >= first_week
+                      for trade in trades_by_day[day]]
+            expected = in_memory(root, window, eu_data)
+            stored = store.window_calculation(eu_data, DAYS[-1], window_weeks=window_weeks)
+            assert aggregates_by_key(stored) == aggregates_by_key(expected)
+            assert statuses_by_key(stored) == statuses_by_key(expected)
+            assert statuses_by_key(stored)
+
+
+def test_expired_weeks_are_deleted(root, trades_by_day):
+    with si_store.SIAggregateStore(':memory:', root, EEA_MICS) as store:
+        for day in DAYS:
+            store.ingest_day(day, trades_by_day[day])
+        last_week = si_calculation.week_number(DAYS[-1])
+        store.expire_weeks_before(last_week)
+        weeks = [row[0] for row in store.connection.execute('SELECT DISTINCT week FROM weekly_aggregate')]
+        assert weeks == [last_week]
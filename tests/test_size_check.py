@@ -0,0 +1,116 @@
+import copy
+
+import pytest
+
+import eu_reference
+import size_check
+
+
+@pytest.fixture(scope='module')
+def trades(root, make_samples):
+    trades = make_samples(1500, seed=38, spoiled=15)
+    for trade in trades:
+        trade.eur_notional = 1e6
+    return trades
+
+
+@pytest.fixture(scope='module')
+def reference_data(root, trades):
+    """
+    EU reference data in which every other sub-class is liquid, with an ADNA in the
+    top band of any banded thresholds.
+    """
+    sub_class_keys = sorted(set(classification.sub_class_key() for classification in root.classify_many(trades)
+                                if root.sub_class_id_for(classification) is not None))
+    return eu_reference.EUReferenceStore.from_rows(
+        (sub_class_key, index % 2 == 0, 1000, 1e9, 1e12) for index, sub_class_key in enumerate(sub_class_keys))
+
+
+def expected_size(table, size, post_trade):
+    if post_trade:
+        ssti, lis = table.ssti_post_trade, table.lis_post_trade
+    else:
+        ssti, lis = table.ssti_pre_trade, table.lis_pre_trade
+    if size >= lis.threshold_floor.amount:
+        return size_check.LIS
+    if size >= ssti.threshold_floor.amount:
+        return size_check.SSTI
+    return size_check.BELOW_SSTI
+
+
+def table_for(root, reference_data, classification):
+    eu_data = reference_data.eu_data_for(classification.sub_class_key())
+    if eu_data is None:
+        return None
+    return root.thresholds_for(classification, adna=reference_data.adna_for(classification.sub_class_key()),
+                               is_liquid=eu_data.is_liquid)
+
+
+@pytest.mark.parametrize('post_trade', [False, True])
+def test_trades_either_side_of_each_limit(root, trades, reference_data, post_trade):
+    checker = size_check.SizeChecker(root, reference_data)
+    checked = set()
+    for trade in trades:
+        classification = root.classification_for(trade)
+        if root.sub_class_id_for(classification) is None:
+            assert checker.check_size(trade, post_trade=post_trade) is None
+            continue
+        table = table_for(root, reference_data, classification)
+        if table is None:
+            assert checker.check_size(trade, post_trade=post_trade) is None
+            continue
+        limits = size_check.limits_for_table(table)
+        for limit in limits:
+            for size in (limit - 1, limit, -limit, limit + 1):
+                sized = copy.copy(trade)
+                sized.eur_notional = size
+                expected = expected_size(table, abs(size), post_trade)
+                assert checker.check_size(sized, post_trade=post_trade) == expected
+                checked.add(expected)
+    assert checked == set([size_check.BELOW_SSTI, size_check.SSTI, size_check.LIS])
+
+
+def test_liquidity_picks_the_table(root, trades, reference_data):
+    table = size_check.SizeLimitTable(root, reference_data)
+    for classification in root.classify_many(trades):
+        sub_class_id = root.sub_class_id_for(classification)
+        if sub_class_id is None:
+            continue
+        expected = table_for(root, reference_data, classification)
+        if expected is None:
+            assert table.limits_for(sub_class_id) == size_check.SizeLimitTable.NO_LIMITS
+        else:
+            assert table.limits_for(sub_class_id) == size_check.limits_for_table(expected)
+
+
+def test_calibrated_limits_above_the_floor_replace_it(root, trades, reference_data):
+    checker = size_check.SizeChecker(root, reference_data)
+    trade = next(trade for trade in trades
+                 if root.sub_class_id_for(root.classification_for(trade)) is not None
+                 and checker.table.limits_for(root.sub_class_id_for(root.classification_for(trade))))
+    classification = root.classification_for(trade)
+    sub_class_id = root.sub_class_id_for(classification)
+    floors = checker.table.limits_for(sub_class_id)
+    ssti, lis = floors[1] * 2 + 2, floors[1] * 4 + 4
+    checker.refresh(reference_data, calibrated={classification.sub_class_key(): dict(
+        ssti_pre_trade=ssti, lis_pre_trade=lis, ssti_post_trade=floors[2] - 1, lis_post_trade=None)})
+    # A calibrated amount below the floor, or none, leaves the floor
+    assert checker.table.limits_for(sub_class_id) == (ssti, lis) + floors[2:]
+    sized = copy.copy(trade)
+    for size, expected in [(ssti - 1, size_check.BELOW_SSTI), (ssti, size_check.SSTI),
+                           (lis - 1, size_check.SSTI), (lis, size_check.LIS)]:
+        sized.eur_notional = size
+        assert checker.check_size(sized) == expected
+    assert size_check.SizeChecker(root, reference_data).table.limits_for(sub_class_id) == floors
+
+
+def test_sub_classes_met_after_the_table_was_built(root, make_samples, reference_data):
+    table = size_check.SizeLimitTable(root, reference_data)
+    built = len(table.limits)
+    met_later = 0
+    for classification in root.classify_many(make_samples(300, seed=138, years_later=61)):
+        sub_class_id = root.sub_class_id_for(classification)
+        if sub_class_id is not None:
+            met_later += sub_class_id >= built
+            assert table.limits_for(sub_class_id) == table.work_out_limits(sub_class_id)
+    assert met_later
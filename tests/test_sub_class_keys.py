@@ -0,0 +1,72 @@
+import datetime
+import json
+
+import pytest
+
+import rts2_annex3_model
+
+
+@pytest.fixture
+def classifications(root, make_samples):
+    samples = make_samples(2500, seed=33) + make_samples(500, seed=34, years_later=20)
+    return [classification for classification in root.classify_many(samples)
+            if not classification.errors]
+
+
+def test_classification_for_key_rebuilds_the_sub_class(root, classifications):
+    for classification in classifications:
+        rebuilt = root.classification_for_key(classification.sub_class_key())
+        assert rebuilt.sub_class_identity() == classification.sub_class_identity()
+
+
+def test_sub_class_id_for_key_agrees_with_sub_class_id_for(root, classifications):
+    for classification in classifications:
+        assert root.sub_class_id_for_key(classification.sub_class_key()) == root.sub_class_id_for(classification)
+
+
+def test_foreign_keys_are_refused(root, classifications):
+    key = json.loads(classifications[0].sub_class_key())
+    key['Sub-asset class'] = 'No such sub-asset class'
+    with pytest.raises(ValueError):
+        root.classification_for_key(json.dumps(key))
+
+
+
+def maturity_bucket(classification):
+    return next((option for option in classification.options if hasattr(option, 'bucket_number')), None)
+
+
+def bucket_options(bucket):
+    while bucket.previous_bucket_option is not None:
+        bucket = bucket.previous_bucket_option
+    buckets = []
+    while bucket is not None:
+        buckets.append(bucket)
+        bucket = bucket.next_bucket_option
+    return buckets
+
+
+def test_keys_naming_far_out_buckets_are_refused(root, classifications):
+    classification = next(classification for classification in classifications if maturity_bucket(classification))
+    bucket = maturity_bucket(classification)
+    key = json.loads(classification.sub_class_key())
+    criterion_name = next(name for name, value in key.items() if value == bucket.name())
+    key[criterion_name] = bucket.name().replace(
+        'Maturity bucket {number}:'.format(number=bucket.bucket_number), 'Maturity bucket 10000000:')
+    with pytest.raises(ValueError):
+        root.classification_for_key(json.dumps(key))
+    # Buckets are only extrapolated as far as the horizon, and no further when asked again
+    today = datetime.date.today()
+    horizon = rts2_annex3_model.YearBucketCeiling(rts2_annex3_model.MAX_KEYED_MATURITY_YEARS).end_date_from(today)
+    buckets = bucket_options(bucket)
+    assert buckets[-2].ceiling.end_date_from(today) < horizon
+    with pytest.raises(ValueError):
+        root.classification_for_key(json.dumps(key))
+    assert bucket_options(bucket) == buckets
+
+
+def test_keys_naming_extrapolated_buckets_are_found(classifications):
+    classification = next(classification for classification in classifications if maturity_bucket(classification))
+    buckets = bucket_options(maturity_bucket(classification))
+    for bucket in buckets:
+        assert buckets[0].option_for_name(bucket.name()) is bucket
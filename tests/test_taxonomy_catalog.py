@@ -0,0 +1,26 @@
+import rts2_annex3
+import rts2_annex3_model
+import taxonomy_catalog
+
+
+def bucket_criteria(root):
+    for sub_asset_class in root.all_sub_asset_classes():
+        for criterion in sub_asset_class.criteria:
+            for group_name, root_option in criterion.bucket_groups():
+                yield root_option.parent
+
+
+def test_bucket_names_are_those_the_buckets_give_themselves():
+    for criterion in bucket_criteria(rts2_annex3.class_root):
+        ceilings = criterion.bucket_ceilings
+        names = rts2_annex3_model.bucket_names_for_ceilings(ceilings)
+        fresh_option = rts2_annex3_model.DateBucketOption(parent=criterion, bucket_ceilings=ceilings)
+        given_names = [bucket_option.name() for bucket_option in fresh_option.bucket_options()]
+        assert names[:len(ceilings)] == given_names
+        assert len(names) - len(ceilings) in (0, 1)
+
+
+def test_catalog_does_not_depend_on_what_has_been_classified(root, make_samples):
+    before = list(taxonomy_catalog.catalog_rows(root))
+    list(root.classify_many(make_samples(2000, seed=44, years_later=60)))
+    assert list(taxonomy_catalog.catalog_rows(root)) == before
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+import os
+
+import rts2_annex3
+import taxonomy_export
+
+# The dump display() gave before it was written to a stream
+DISPLAY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'taxonomy_display.txt')
+
+
+def export(writer):
+    stream = io.StringIO()
+    writer(rts2_annex3.class_root, stream)
+    return stream.getvalue()
+
+
+def threshold_lines(sub_asset_class):
+    stream = io.StringIO()
+    sub_asset_class.write_thresholds(stream, prefix='- - - ')
+    return stream.getvalue().splitlines()[1:]
+
+
+def test_display_is_unchanged(fresh_root):
+    with open(DISPLAY_PATH) as display_file:
+        expected = display_file.read()
+    assert fresh_root.display() == expected
+    stream = io.StringIO()
+    fresh_root.write_display(stream)
+    assert stream.getvalue() == expected
+
+
+def test_text_is_the_display_with_thresholds():
+    display_lines = rts2_annex3.class_root.display().splitlines()
+    text_lines = export(taxonomy_export.write_text).splitlines()
+    # The display is the text with the threshold lines of each sub-asset class taken out
+    extra_lines = []
+    remaining = iter(display_lines)
+    expected = next(remaining)
+    for line in text_lines:
+        if line == expected:
+            expected = next(remaining, None)
+        else:
+            extra_lines.append(line)
+    assert expected is None
+    assert extra_lines == [line
+                           for sub_asset_class in rts2_annex3.class_root.all_sub_asset_classes()
+                           for line in threshold_lines(sub_asset_class)]
+    assert any('ThresholdTable' in line for line in extra_lines)
+
+
+def test_json_has_one_object_per_sub_asset_class():
+    exported = json.loads(export(taxonomy_export.write_json))
+    sub_asset_classes = rts2_annex3.class_root.all_sub_asset_classes()
+    assert [entry['sub_asset_class'] for entry in exported] == [s.name for s in sub_asset_classes]
+    assert [len(entry['thresholds']) for entry in exported] == \
+        [len(taxonomy_export.threshold_tables(s.thresholds)) for s in sub_asset_classes]
+
+
+def test_csv_rows_name_their_sub_asset_class():
+    rows = list(csv.DictReader(io.StringIO(export(taxonomy_export.write_csv))))
+    names = set(s.name for s in rts2_annex3.class_root.all_sub_asset_classes())
+    assert rows and all(row['sub_asset_class'] in names for row in rows)
+    assert set(row['record'] for row in rows) == {'criterion', 'maturity_bucket', 'liquidity_criterion', 'threshold'}
+
+
+def test_json_and_csv_do_not_depend_on_what_has_been_classified(root, make_samples):
+    before = [export(taxonomy_export.write_json), export(taxonomy_export.write_csv)]
+    list(root.classify_many(make_samples(2000, seed=143, years_later=60)))
+    assert [export(taxonomy_export.write_json), export(taxonomy_export.write_csv)] == before
+    buckets = [row['value'] for row in csv.DictReader(io.StringIO(before[1])) if row['record'] == 'maturity_bucket']
+    assert any(' onwards: ' in bucket for bucket in buckets)
@@ -0,0 +1,84 @@
+import pytest
+
+import rts2_annex3_model
+
+
+def sub_asset_classes(root):
+    return [sub_asset_class for asset_class in root.asset_classes
+            for sub_asset_class in asset_class.sub_asset_classes]
+
+
+def banded(root):
+    return [sub_asset_class for sub_asset_class in sub_asset_classes(root)
+            if sub_asset_class.thresholds and sub_asset_class.thresholds.banding()[0]]
+
+
+def test_some_thresholds_are_banded_from_above_zero(root):
+    assert banded(root)
+    assert any(sub_asset_class.thresholds.banding()[0][0] > 0 for sub_asset_class in banded(root))
+
+
+def test_adna_exactly_on_a_floor_gets_that_band(root):
+    for sub_asset_class in banded(root):
+        thresholds = sub_asset_class.thresholds
+        adna_floors, tables = thresholds.banding()
+        for floor, table in zip(adna_floors, tables):
+            assert table.adna_floor.amount == floor
+            assert thresholds.table_for(floor) is table
+            assert thresholds.table_for(rts2_annex3_model.SumOfMoney('EUR', str(floor))) is table
+            assert thresholds.table_for(floor + 0.5) is table
+
+
+def test_adna_just_below_a_floor_gets_the_band_below(root):
+    for sub_asset_class in banded(root):
+        thresholds = sub_asset_class.thresholds
+        adna_floors, tables = thresholds.banding()
+        for index, floor in enumerate(adna_floors[1:]):
+            assert thresholds.table_for(floor - 0.5) is tables[index]
+        assert thresholds.table_for(adna_floors[-1] * 10) is tables[-1]
+
+
+def test_adna_below_the_lowest_floor_gets_no_table(root):
+    for sub_asset_class in banded(root):
+        thresholds = sub_asset_class.thresholds
+        lowest = thresholds.banding()[0][0]
+        assert thresholds.table_for(lowest - 0.5) is None
+        assert thresholds.table_for(-1) is None
+
+
+def test_banded_thresholds_need_an_adna(root):
+    for sub_asset_class in banded(root):
+        with pytest.raises(ValueError):
+            sub_asset_class.thresholds.table_for(None)
+        assert sub_asset_class.thresholds.table_for(None, is_liquid=False) \
+            is sub_asset_class.thresholds.non_liquid_thresholds
+
+
+def test_unbanded_thresholds_ignore_the_adna(root):
+    unbanded = [sub_asset_class for sub_asset_class in sub_asset_classes(root)
+                if sub_asset_class.thresholds and sub_asset_class.thresholds.liquid_thresholds
+                and not sub_asset_class.thresholds.banding()[0]]
+    assert unbanded
+    for sub_asset_class in unbanded:
+        thresholds = sub_asset_class.thresholds
+        assert thresholds.table_for(None) is thresholds.liquid_thresholds[0]
+        assert thresholds.table_for(-1) is thresholds.liquid_thresholds[0]
+
+
+def test_thresholds_for_a_classification(root, make_samples):
+    classifications = root.classify_many(make_samples(1000, seed=37, spoiled=30))
+    checked = 0
+    for classification in classifications:
+        sub_asset_class = classification.sub_asset_class
+        if sub_asset_class is None or sub_asset_class.thresholds is None:
+            assert root.thresholds_for(classification, adna=1e12) is None
+            continue
+        thresholds = sub_asset_class.thresholds
+        assert root.thresholds_for(classification, is_liquid=False) is thresholds.non_liquid_thresholds
+        if thresholds.banding()[0]:
+            floor = thresholds.banding()[0][-1]
+            assert root.thresholds_for(classification, adna=floor) is thresholds.banding()[1][-1]
+            with pytest.raises(ValueError):
+                root.thresholds_for(classification)
+            checked += 1
+    assert checked
@@ -0,0 +1,68 @@
+import json
+import random
+
+import pytest
+
+import eu_reference
+import rts2_annex3
+import size_check
+import threshold_calibration
+
+
+@pytest.fixture(scope='module')
+def shards(make_samples):
+    shards = []
+    for seed in (39, 40, 41):
+        trades = make_samples(600, seed=seed, asset_class='Credit Derivatives')
+        for trade in trades:
+            trade.eur_notional = random.lognormvariate(15, 1.5)
+        shards.append(trades)
+    return shards
+
+
+def calibration(trades, exact=False):
+    return threshold_calibration.ThresholdCalibration(rts2_annex3.class_root, exact=exact).add_trades(trades)
+
+
+def quantiles(a_calibration):
+    return dict((key, (distribution.trades.total_weight, distribution.trades.quantile(90),
+                       distribution.volume.quantile(70)))
+                for key, distribution in a_calibration.distributions.items())
+
+
+@pytest.mark.parametrize('exact', [False, True])
+def test_merging_shards_leaves_them_unchanged(shards, exact):
+    shard_calibrations = [calibration(trades, exact) for trades in shards]
+    before = [quantiles(shard_calibration) for shard_calibration in shard_calibrations]
+    merged = threshold_calibration.ThresholdCalibration(rts2_annex3.class_root, exact=exact)
+    for shard_calibration in shard_calibrations:
+        merged.merge(shard_calibration)
+    assert [quantiles(shard_calibration) for shard_calibration in shard_calibrations] == before
+    assert quantiles(merged) == quantiles(calibration([trade for trades in shards for trade in trades], exact))
+
+
+def test_sketch_is_within_its_accuracy(shards):
+    trades = [trade for trades in shards for trade in trades]
+    sketched = calibration(trades)
+    exact = calibration(trades, exact=True)
+    for key, distribution in exact.distributions.items():
+        for percentile in (50, 90, 99):
+            expected = distribution.trades.quantile(percentile)
+            assert sketched.distributions[key].trades.quantile(percentile) == pytest.approx(expected, rel=0.011)
+
+
+def test_calibrated_limits_over_the_whole_taxonomy(root, make_samples):
+    trades = make_samples(3000, seed=139)
+    for trade in trades:
+        trade.eur_notional = random.lognormvariate(15, 1.5)
+    calibration = threshold_calibration.ThresholdCalibration(root).add_trades(trades)
+    keys = list(calibration.distributions)
+    without_sub_asset_class = [key for key in keys if 'Sub-asset class' not in json.loads(key)]
+    assert without_sub_asset_class
+    reference_data = eu_reference.EUReferenceStore.from_rows(
+        (key, index % 2 == 0, 1000, 1e9, 1e8) for index, key in enumerate(keys))
+    calibrated = calibration.calibrated_limits(reference_data)
+    assert calibrated
+    assert not set(calibrated) & set(without_sub_asset_class)
+    for limits in calibrated.values():
+        assert sorted(limits) == sorted(size_check.LIMIT_NAMES)
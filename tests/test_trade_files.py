@@ -0,0 +1,66 @@
+import datetime
+
+import pyarrow
+import pyarrow.parquet
+import pytest
+
+import trade_files
+
+
+def read_rows(path, columns):
+    reader = trade_files.reader_for(path, columns=columns)
+    return reader, [row for chunk in reader for row in chunk]
+
+
+def test_parquet_keeps_the_types_of_the_columns(tmp_path):
+    columns = [('trade_date', datetime.date), ('count', int), ('size', float), ('flag', bool), ('name', str)]
+    rows = [
+        [datetime.date(2018, 1, 2), 1, 2.5, True, 'one'],
+        [None, None, None, None, None],
+        [datetime.date(2018, 12, 31), 2 ** 40, -1.0, False, '2'],
+    ]
+    path = str(tmp_path / 'typed.parquet')
+    with trade_files.writer_for(path, columns, chunk_size=2) as writer:
+        for row in rows:
+            writer.write_row(list(row))
+    schema = pyarrow.parquet.read_schema(path)
+    assert [field.type for field in schema] == [
+        pyarrow.date32(), pyarrow.int64(), pyarrow.float64(), pyarrow.bool_(), pyarrow.string()]
+    reader, read = read_rows(path, columns)
+    assert reader.names == [name for name, _ in columns]
+    assert read == rows
+
+
+@pytest.mark.parametrize('extension', ['.csv', '.jsonl', '.parquet'])
+def test_sample_trades_round_trip(root, make_samples, tmp_path, extension):
+    columns = trade_files.columns_for(root)
+    samples = make_samples(500, seed=26, spoiled=20)
+    path = str(tmp_path / ('samples' + extension))
+    with trade_files.writer_for(path, columns, chunk_size=64, root=root) as writer:
+        writer.write_all(samples)
+    assert writer.row_count == len(samples)
+    reader, read = read_rows(path, columns)
+    names = [name for name, _ in columns]
+    assert reader.names == names + ['sub_class_key', 'errors']
+    for sample, row in zip(samples, read):
+        classification = root.classification_for(sample)
+        errors = '; '.join(classification.error_messages())
+        if extension == '.csv':
+            errors = errors or None  # CSV can't tell an empty string from no value
+        assert row == [getattr(sample, name, None) for name in names] + [classification.sub_class_key(), errors]
+    assert len(read) == len(samples)
+    # Every trade leaves some columns empty, and some columns hold dates
+    assert all(None in row for row in read)
+    assert any(isinstance(value, datetime.date) for row in read for value in row)
+
+
+def test_chunks_are_read_in_order(root, make_samples, tmp_path):
+    columns = trade_files.columns_for(root)
+    path = str(tmp_path / 'samples.csv')
+    samples = make_samples(250, seed=126)
+    with trade_files.writer_for(path, columns) as writer:
+        writer.write_all(samples)
+    reader = trade_files.reader_for(path, columns=columns, chunk_size=100)
+    chunks = list(reader)
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    assert [row[0] for chunk in chunks for row in chunk] == [sample.asset_class_name for sample in samples]
@@ -0,0 +1,61 @@
+import datetime
+
+import pytest
+
+import rts2_annex3_model
+
+CLASS_NAMES = ('asset_class_name', 'sub_asset_class_name')
+
+
+@pytest.fixture(scope='module')
+def samples(make_samples):
+    """
+    Samples, some spoiled by make_samples and more with a value which is wrong, missing
+    or of the wrong type, or with dates out of order.
+    """
+    samples = make_samples(3000, seed=46, spoiled=150)
+    for index, sample in enumerate(samples[150:1350]):
+        names = sorted(name for name in vars(sample) if name not in CLASS_NAMES)
+        if not names:
+            continue
+        name = names[index % len(names)]
+        value = getattr(sample, name)
+        if index % 4 == 0 and name.endswith('to_date'):
+            setattr(sample, name, value - datetime.timedelta(days=365 * 200))
+        elif index % 4 == 1:
+            setattr(sample, name, 'No such value')
+        elif index % 4 == 2:
+            setattr(sample, name, None)
+        elif index % 4 == 3:
+            delattr(sample, name)
+    return samples
+
+
+def test_validate_many_agrees_with_validate(root, samples):
+    expected = [root.validate(sample) for sample in samples]
+    assert [codes for passed, codes in root.validate_many(samples)] == expected
+    assert [passed for passed, codes in root.validate_many(samples)] == [not codes for codes in expected]
+    assert sum(1 for codes in expected if codes) > 300
+
+
+def test_validate_many_agrees_with_validate_for_mappings_and_tuples(root, samples):
+    names = [name for name, _ in root.subject_attributes()]
+    mappings = [dict(vars(sample)) for sample in samples]
+    rows = [tuple(getattr(sample, name, None) for name in names) for sample in samples]
+    expected = [(not codes, codes) for codes in map(root.validate, samples)]
+    assert list(root.validate_many(mappings)) == expected
+    assert list(root.validate_many(rows, names=names)) == expected
+    accessor = rts2_annex3_model.accessor_for(mappings[0])
+    assert list(root.validate_many(mappings, accessor=accessor)) \
+        == [(not codes, codes) for codes in (root.validate(mapping, accessor) for mapping in mappings)]
+
+
+def test_valid_samples_classify_without_errors(root, samples):
+    # Not the other way round: validation is stricter, and rejects dates which aren't dates
+    for sample, (passed, codes) in zip(samples, root.validate_many(samples)):
+        if passed:
+            assert not root.classification_for(sample).errors
+
+
+def test_no_subjects_validate_to_nothing(root):
+    assert list(root.validate_many([])) == []